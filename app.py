@@ -4,6 +4,7 @@
 
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from starlette.middleware.cors import CORSMiddleware
 
@@ -16,12 +17,18 @@ from src.api.router.ingredients import router as ingredients_router
 from src.api.router.worksteps import router as worksteps_router
 from src.api.router.tags import router as tag_router
 from src.api.router.receipt_tag_link import router as receipt_tag_link_router
+from src.api.router.search import router as search_router
+from src.api.router.autocomplete import router as autocomplete_router
+from src.api.router.shopping_list import router as shopping_list_router
+from src.pdf.render_service import pdf_renderer
+from src.database.query_metrics import DatabaseStatsMiddleware
 
 
 app = FastAPI(
     title=settings.FA_APP_NAME,
     version=settings.FA_APP_VERSION,
     docs_url="/api",
+    default_response_class=ORJSONResponse,
     terms_of_service="not available",
     openapi_url="/openapi.json",
     contact={
@@ -42,12 +49,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(DatabaseStatsMiddleware, headers=settings.DATABASE_STATS_HEADERS)
+
 app.include_router(system_router)
 app.include_router(receipts_router)
 app.include_router(ingredients_router)
 app.include_router(worksteps_router)
 app.include_router(tag_router)
 app.include_router(receipt_tag_link_router)
+app.include_router(search_router)
+app.include_router(autocomplete_router)
+app.include_router(shopping_list_router)
+
+app.add_event_handler("shutdown", pdf_renderer.shutdown)
 
 
 def init_app():
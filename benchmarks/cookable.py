@@ -0,0 +1,93 @@
+"""
+    Benchmark: "what can I cook?" with the inverted ingredient index
+
+Ranks 100k receipts of one user (10 ingredients each, Zipf distributed names) by the coverage with the ingredients
+on hand. Compares the inverted index (matches counted with bitwise operations over the posting lists) with a scan of
+the ingredient rows per request.
+No database required, the rows are generated. Run from the project root:
+
+    python -m benchmarks.cookable
+"""
+import heapq
+import random
+import statistics
+import time
+
+from collections import defaultdict
+from typing import List, Tuple
+from uuid import UUID, uuid4
+
+from src.search.ingredient_index import IngredientIndex, normalize_ingredient
+
+
+RECEIPTS = 100_000
+INGREDIENTS_PER_RECEIPT = 10
+VOCABULARY = 5_000
+PANTRY_SIZES = (5, 20, 100)
+MAX_MISSING = (0, 2)
+LIMIT = 20
+REPEAT = 5
+
+
+def _rows() -> List[Tuple[UUID, str]]:
+    rng = random.Random(42)
+    names = [f'Ingredient {i}' for i in range(VOCABULARY)]
+    weights = [1 / (i + 1) for i in range(VOCABULARY)]
+
+    return [(receipt_id, name)
+            for receipt_id in (uuid4() for _ in range(RECEIPTS))
+            for name in rng.choices(names, weights=weights, k=INGREDIENTS_PER_RECEIPT)]
+
+
+def _scan(rows: List[Tuple[UUID, str]], on_hand: List[str], max_missing: int, limit: int) -> List[UUID]:
+    # Per request: group the ingredient rows by receipt and compare every receipt with the ingredients on hand
+    terms = {normalize_ingredient(name) for name in on_hand}
+    receipt_terms = defaultdict(set)
+    for receipt_id, name in rows:
+        receipt_terms[receipt_id].add(normalize_ingredient(name))
+
+    ranked = []
+    for receipt_id, needed in receipt_terms.items():
+        matched = len(needed & terms)
+        if matched and len(needed) - matched <= max_missing:
+            ranked.append((len(needed) - matched, -matched / len(needed), -matched, str(receipt_id), receipt_id))
+
+    return [receipt_id for *_, receipt_id in heapq.nsmallest(limit, ranked)]
+
+
+def _median_ms(function) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def main():
+    rows = _rows()
+    user_id = uuid4()
+    index = IngredientIndex(max_users=1, ttl=3600)
+
+    start = time.perf_counter()
+    index.match(user_id, ['warm up'], 0, LIMIT, load=lambda: rows)
+    print(f'{RECEIPTS:,} receipts, {len(rows):,} ingredients, index built in {time.perf_counter() - start:.2f}s')
+
+    rng = random.Random(7)
+    print(f'{"on hand":>8} {"missing":>8} {"scan ms":>9} {"index ms":>9} {"speedup":>8}')
+    for pantry_size in PANTRY_SIZES:
+        # Ingredients on hand are mostly common ones
+        on_hand = [f'Ingredient {i}' for i in rng.sample(range(pantry_size * 3), pantry_size)]
+        for max_missing in MAX_MISSING:
+            expected = _scan(rows, on_hand, max_missing, LIMIT)
+            found = [receipt_id for receipt_id, _, _ in index.match(user_id, on_hand, max_missing, LIMIT, load=None)]
+            assert found == expected
+
+            scan = _median_ms(lambda: _scan(rows, on_hand, max_missing, LIMIT))
+            indexed = _median_ms(lambda: index.match(user_id, on_hand, max_missing, LIMIT, load=None))
+            print(f'{pantry_size:>8} {max_missing:>8} {scan:>9.2f} {indexed:>9.2f} {scan / indexed:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+    Microbenchmark: ORM row -> API model conversion of the read paths
+
+    Compares the old two-pass conversion (XReadInDB.model_validate + XRead(**dict)) with the single-pass
+    XRead.model_validate for 10k rows per entity. Run from the project root:
+
+        python -m benchmarks.serialization
+"""
+import time
+
+from types import SimpleNamespace
+from typing import Callable, List
+from uuid import uuid4
+
+from src.api.models.ingredients import IngredientRead, IngredientReadInDB
+from src.api.models.receipts import ReceiptRead, ReceiptReadInDB
+from src.api.models.tags import TagRead, TagReadInDB
+from src.api.models.worksteps import WorkstepRead, WorkstepReadInDB
+
+
+ROWS = 10_000
+REPEAT = 5
+
+
+def _rows() -> dict:
+    # Attribute objects behave like loaded ORM rows for from_attributes validation
+    receipt_id = uuid4()
+    return {
+        'receipts': [SimpleNamespace(id=uuid4(), title=f'Receipt {i}', description='Lorem ipsum dolor sit amet',
+                                     created_at=None, user_id=uuid4()) for i in range(ROWS)],
+        'ingredients': [SimpleNamespace(id=uuid4(), amount=i, unit='g', ingredient=f'Ingredient {i}',
+                                        receipt_id=receipt_id) for i in range(ROWS)],
+        'worksteps': [SimpleNamespace(id=uuid4(), order_number=i, workstep=f'Workstep {i}',
+                                      receipt_id=receipt_id) for i in range(ROWS)],
+        'tags': [SimpleNamespace(id=uuid4(), tag=f'TAG{i}') for i in range(ROWS)],
+    }
+
+
+def _rows_per_second(convert: Callable[[object], object], rows: List[object]) -> float:
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for row in rows:
+            convert(row)
+        best = min(best, time.perf_counter() - start)
+
+    return len(rows) / best
+
+
+def main():
+    rows = _rows()
+
+    cases = [
+        ('receipts', ReceiptReadInDB, ReceiptRead),
+        ('ingredients', IngredientReadInDB, IngredientRead),
+        ('worksteps', WorkstepReadInDB, WorkstepRead),
+        ('tags', TagReadInDB, TagRead),
+    ]
+
+    print(f'{"entity":<12} {"two-pass rows/s":>16} {"single-pass rows/s":>19} {"speedup":>8}')
+    for name, in_db_model, read_model in cases:
+        before = _rows_per_second(lambda row: read_model(**in_db_model.model_validate(row).dict()), rows[name])
+        after = _rows_per_second(read_model.model_validate, rows[name])
+        print(f'{name:<12} {before:>16,.0f} {after:>19,.0f} {after / before:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+    Benchmark: concurrent workstep appends
+
+    Appends worksteps to one receipt from several threads (one session each) and checks that no order number was
+    given twice, then measures the append latency for growing recipes, which should stay flat. Needs a migrated
+    database (DATABASE_URI), the rows are removed afterwards. Run from the project root:
+
+        python -m benchmarks.workstep_append
+"""
+import statistics
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, func, select
+
+from src.api.models.auth import User
+from src.api.models.worksteps import WorkstepCreate
+from src.crud.worksteps import WORKSTEP_ORDER_GAP
+from src.database.database import SessionLocal
+from src.database.models.receipts import ReceiptDB
+from src.database.models.worksteps import WorkstepDB
+from src.service.worksteps import serv_create_workstep
+
+
+THREADS = 8
+APPENDS_PER_THREAD = 25
+RECIPE_SIZES = (10, 100, 1_000, 10_000)
+TIMED_APPENDS = 50
+
+_REQUEST = SimpleNamespace(method='POST')
+
+
+def _append(receipt_id: UUID, user: User) -> float:
+    with SessionLocal() as db_session:
+        start = time.perf_counter()
+        serv_create_workstep(request=_REQUEST, db_session=db_session,
+                             body=WorkstepCreate(workstep='Benchmark step', receipt_id=receipt_id), user=user)
+        # Services only flush, get_db commits; the commit releases the receipt lock and runs the deferred checks
+        db_session.commit()
+
+        return time.perf_counter() - start
+
+
+def _order_numbers(receipt_id: UUID) -> List[int]:
+    with SessionLocal() as db_session:
+        return db_session.execute(select(WorkstepDB.order_number)
+                                  .where(WorkstepDB.receipt_id == receipt_id)).scalars().all()
+
+
+def _fill(receipt_id: UUID, size: int):
+    # Bulk insert up to the recipe size without going through the service
+    with SessionLocal() as db_session:
+        count, max_order_number = db_session.execute(select(func.count(),
+                                                            func.coalesce(func.max(WorkstepDB.order_number), 0))
+                                                     .where(WorkstepDB.receipt_id == receipt_id)).one()
+        db_session.add_all([WorkstepDB(id=uuid4(), receipt_id=receipt_id, workstep='Filler step',
+                                       order_number=max_order_number + WORKSTEP_ORDER_GAP * (i + 1))
+                            for i in range(size - count)])
+        db_session.commit()
+
+
+def main():
+    user = User(id=uuid4(), username='benchmark', realm_roles=[], client_roles=[])
+    receipt_id = uuid4()
+
+    with SessionLocal() as db_session:
+        db_session.add(ReceiptDB(id=receipt_id, title='Benchmark', description='Workstep appends', user_id=user.id))
+        db_session.commit()
+
+    try:
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(lambda _: _append(receipt_id, user), range(THREADS * APPENDS_PER_THREAD)))
+
+        order_numbers = _order_numbers(receipt_id)
+        duplicates = len(order_numbers) - len(set(order_numbers))
+        print(f'{THREADS} threads, {len(order_numbers)} appends, {duplicates} duplicate order numbers')
+        assert len(order_numbers) == THREADS * APPENDS_PER_THREAD and duplicates == 0
+
+        print(f'{"worksteps":>10} {"median ms":>10} {"p95 ms":>8}')
+        for size in RECIPE_SIZES:
+            _fill(receipt_id, size)
+            timings = sorted(_append(receipt_id, user) * 1000 for _ in range(TIMED_APPENDS))
+            print(f'{size:>10,} {statistics.median(timings):>10.2f} {timings[int(len(timings) * 0.95)]:>8.2f}')
+
+    finally:
+        with SessionLocal() as db_session:
+            db_session.execute(delete(WorkstepDB).where(WorkstepDB.receipt_id == receipt_id))
+            db_session.execute(delete(ReceiptDB).where(ReceiptDB.id == receipt_id))
+            db_session.commit()
+
+
+if __name__ == '__main__':
+    main()
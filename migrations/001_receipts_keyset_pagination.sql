@@ -0,0 +1,11 @@
+-- Creation time and composite indexes for the keyset pagination of GET /api/receipts
+-- Existing receipts get the time of the migration, the id keeps their order stable.
+
+ALTER TABLE public.receipts
+    ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now();
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_receipts_user_id_title_id
+    ON public.receipts (user_id, title, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_receipts_user_id_created_at_id
+    ON public.receipts (user_id, created_at, id);
@@ -0,0 +1,8 @@
+-- Spread the order numbers of the worksteps to multiples of 1024 (WORKSTEP_ORDER_GAP)
+-- Moved worksteps take the middle of the gap between their new neighbours, the order is kept.
+
+UPDATE public.worksteps AS w
+SET order_number = p.position * 1024
+FROM (SELECT id, row_number() OVER (PARTITION BY receipt_id ORDER BY order_number, id) AS position
+      FROM public.worksteps) AS p
+WHERE w.id = p.id;
@@ -0,0 +1,11 @@
+-- One order number per receipt, guards the appends of concurrent requests
+-- Deferrable, the rebalancing UPDATE of the order numbers is checked at commit.
+-- Requires 002 (which made the order numbers of every receipt unique).
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_worksteps_receipt_id_order_number
+    ON public.worksteps (receipt_id, order_number);
+
+ALTER TABLE public.worksteps
+    ADD CONSTRAINT uq_worksteps_receipt_id_order_number
+    UNIQUE USING INDEX uq_worksteps_receipt_id_order_number
+    DEFERRABLE INITIALLY IMMEDIATE;
@@ -0,0 +1,46 @@
+-- Ingredients, worksteps and tag links are deleted together with their receipt (ON DELETE CASCADE)
+-- The foreign keys are replaced with NOT VALID constraints and validated afterwards, the validation
+-- does not block writes. The indexes are used by the cascade and by the removal of unused tags.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ingredients_receipt_id
+    ON public.ingredients (receipt_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_receipt_tag_links_tag_id
+    ON public.receipt_tag_links (tag_id);
+
+BEGIN;
+
+-- The names of the existing foreign keys depend on how the tables were created
+DO $$
+DECLARE
+    fk record;
+BEGIN
+    FOR fk IN SELECT conrelid::regclass AS table_name, conname
+              FROM pg_constraint
+              WHERE contype = 'f'
+                AND confrelid = 'public.receipts'::regclass
+                AND conrelid IN ('public.ingredients'::regclass,
+                                 'public.worksteps'::regclass,
+                                 'public.receipt_tag_links'::regclass)
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.table_name, fk.conname);
+    END LOOP;
+END $$;
+
+ALTER TABLE public.ingredients
+    ADD CONSTRAINT fk_ingredients_receipt_id FOREIGN KEY (receipt_id)
+    REFERENCES public.receipts (id) ON DELETE CASCADE NOT VALID;
+
+ALTER TABLE public.worksteps
+    ADD CONSTRAINT fk_worksteps_receipt_id FOREIGN KEY (receipt_id)
+    REFERENCES public.receipts (id) ON DELETE CASCADE NOT VALID;
+
+ALTER TABLE public.receipt_tag_links
+    ADD CONSTRAINT fk_receipt_tag_links_receipt_id FOREIGN KEY (receipt_id)
+    REFERENCES public.receipts (id) ON DELETE CASCADE NOT VALID;
+
+COMMIT;
+
+ALTER TABLE public.ingredients VALIDATE CONSTRAINT fk_ingredients_receipt_id;
+ALTER TABLE public.worksteps VALIDATE CONSTRAINT fk_worksteps_receipt_id;
+ALTER TABLE public.receipt_tag_links VALIDATE CONSTRAINT fk_receipt_tag_links_receipt_id;
@@ -0,0 +1,33 @@
+-- Every tag name exists once: duplicates are merged into the tag with the smallest id, their receipt links
+-- are moved to it. The tags table is small, the unique constraint is created inside the transaction.
+
+BEGIN;
+
+-- No tags are created while the duplicates are merged
+LOCK TABLE public.tags IN SHARE ROW EXCLUSIVE MODE;
+
+UPDATE public.tags SET tag = upper(tag) WHERE tag <> upper(tag);
+
+CREATE TEMPORARY TABLE tag_merge ON COMMIT DROP AS
+    SELECT id, first_value(id) OVER (PARTITION BY tag ORDER BY id) AS keep_id
+    FROM public.tags;
+
+DELETE FROM tag_merge WHERE id = keep_id;
+
+INSERT INTO public.receipt_tag_links (receipt_id, tag_id)
+    SELECT link.receipt_id, merge.keep_id
+    FROM public.receipt_tag_links link
+    JOIN tag_merge merge ON merge.id = link.tag_id
+    ON CONFLICT DO NOTHING;
+
+DELETE FROM public.receipt_tag_links link
+    USING tag_merge merge
+    WHERE link.tag_id = merge.id;
+
+DELETE FROM public.tags tag
+    USING tag_merge merge
+    WHERE tag.id = merge.id;
+
+ALTER TABLE public.tags ADD CONSTRAINT uq_tags_tag UNIQUE (tag);
+
+COMMIT;
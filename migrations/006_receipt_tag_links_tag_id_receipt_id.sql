@@ -0,0 +1,7 @@
+-- Receipts of a set of tags: the (tag_id, receipt_id) index answers the tag filter of the receipt listing
+-- with an index only scan and replaces the tag_id index of 004.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_receipt_tag_links_tag_id_receipt_id
+    ON public.receipt_tag_links (tag_id, receipt_id);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_receipt_tag_links_tag_id;
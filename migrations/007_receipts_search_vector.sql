@@ -0,0 +1,116 @@
+-- Full text search over the receipts: receipts.search_vector holds the title (weight A), description (B),
+-- ingredients (C) and worksteps (D) of a receipt. It is maintained by triggers, writes of ingredients and
+-- worksteps refresh the vectors of their receipts once per statement.
+-- The 'simple' configuration lower cases the words without stemming (receipts are written in any language),
+-- src/crud/search.py parses the queries with the same configuration. Requires PostgreSQL 14 (CREATE OR REPLACE TRIGGER).
+
+ALTER TABLE public.receipts ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION public.receipt_search_vector(search_receipt_id uuid, search_title text,
+                                                        search_description text)
+    RETURNS tsvector
+    LANGUAGE sql STABLE
+AS $$
+    SELECT setweight(to_tsvector('simple', coalesce(search_title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(search_description, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce((SELECT string_agg(ingredient, ' ')
+                                                     FROM public.ingredients
+                                                     WHERE receipt_id = search_receipt_id), '')), 'C')
+        || setweight(to_tsvector('simple', coalesce((SELECT string_agg(workstep, ' ')
+                                                     FROM public.worksteps
+                                                     WHERE receipt_id = search_receipt_id), '')), 'D')
+$$;
+
+CREATE OR REPLACE FUNCTION public.receipts_set_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.search_vector := public.receipt_search_vector(NEW.id, NEW.title, NEW.description);
+    RETURN NEW;
+END
+$$;
+
+-- Uses the transition table "changed_rows" of the statement (new rows of inserts and updates, old rows of deletes)
+CREATE OR REPLACE FUNCTION public.receipts_refresh_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.receipts
+    SET search_vector = public.receipt_search_vector(id, title, description)
+    WHERE id IN (SELECT DISTINCT receipt_id FROM changed_rows);
+    RETURN NULL;
+END
+$$;
+
+-- Updates only refresh the receipts whose text changed, moves of worksteps change only the order number
+CREATE OR REPLACE FUNCTION public.ingredients_refresh_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.receipts
+    SET search_vector = public.receipt_search_vector(id, title, description)
+    WHERE id IN (SELECT DISTINCT changed_rows.receipt_id
+                 FROM changed_rows
+                 JOIN previous_rows ON previous_rows.id = changed_rows.id
+                 WHERE changed_rows.ingredient IS DISTINCT FROM previous_rows.ingredient);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.worksteps_refresh_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.receipts
+    SET search_vector = public.receipt_search_vector(id, title, description)
+    WHERE id IN (SELECT DISTINCT changed_rows.receipt_id
+                 FROM changed_rows
+                 JOIN previous_rows ON previous_rows.id = changed_rows.id
+                 WHERE changed_rows.workstep IS DISTINCT FROM previous_rows.workstep);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER receipts_search_vector
+    BEFORE INSERT OR UPDATE OF title, description ON public.receipts
+    FOR EACH ROW EXECUTE FUNCTION public.receipts_set_search_vector();
+
+CREATE OR REPLACE TRIGGER ingredients_search_vector_insert
+    AFTER INSERT ON public.ingredients
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.receipts_refresh_search_vector();
+
+CREATE OR REPLACE TRIGGER ingredients_search_vector_update
+    AFTER UPDATE ON public.ingredients
+    REFERENCING OLD TABLE AS previous_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.ingredients_refresh_search_vector();
+
+CREATE OR REPLACE TRIGGER ingredients_search_vector_delete
+    AFTER DELETE ON public.ingredients
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.receipts_refresh_search_vector();
+
+CREATE OR REPLACE TRIGGER worksteps_search_vector_insert
+    AFTER INSERT ON public.worksteps
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.receipts_refresh_search_vector();
+
+CREATE OR REPLACE TRIGGER worksteps_search_vector_update
+    AFTER UPDATE ON public.worksteps
+    REFERENCING OLD TABLE AS previous_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.worksteps_refresh_search_vector();
+
+CREATE OR REPLACE TRIGGER worksteps_search_vector_delete
+    AFTER DELETE ON public.worksteps
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.receipts_refresh_search_vector();
+
+-- Backfill, one statement (run it in batches of ids on large tables)
+UPDATE public.receipts SET search_vector = public.receipt_search_vector(id, title, description);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_receipts_search_vector
+    ON public.receipts USING gin (search_vector);
@@ -0,0 +1,8 @@
+-- Prefix indexes of the autocomplete (LIKE 'prefix%'). The pattern operator classes compare byte-wise, so the
+-- indexes serve prefix matches with any database collation. Ingredient names are matched case insensitive.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ingredients_ingredient_pattern
+    ON public.ingredients (lower(ingredient) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tags_tag_pattern
+    ON public.tags (tag varchar_pattern_ops);
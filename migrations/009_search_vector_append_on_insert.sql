@@ -0,0 +1,47 @@
+-- Inserts of ingredients and worksteps append the words of the new rows to receipts.search_vector instead of
+-- aggregating all children of the receipt again (007), an append costs the same for small and large receipts.
+-- Rows without words do not touch the receipt. The appended words are positioned after the existing ones, phrases
+-- within one ingredient or workstep still match; the next update or delete of a child rebuilds the vector in field
+-- order. Updates and deletes are unchanged.
+
+CREATE OR REPLACE FUNCTION public.ingredients_append_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.receipts
+    SET search_vector = receipts.search_vector || added.search_vector
+    FROM (SELECT receipt_id, setweight(to_tsvector('simple', string_agg(ingredient, ' ')), 'C') AS search_vector
+          FROM changed_rows
+          GROUP BY receipt_id) AS added
+    WHERE receipts.id = added.receipt_id
+      AND added.search_vector <> ''::tsvector;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.worksteps_append_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE public.receipts
+    SET search_vector = receipts.search_vector || added.search_vector
+    FROM (SELECT receipt_id, setweight(to_tsvector('simple', string_agg(workstep, ' ')), 'D') AS search_vector
+          FROM changed_rows
+          GROUP BY receipt_id) AS added
+    WHERE receipts.id = added.receipt_id
+      AND added.search_vector <> ''::tsvector;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER ingredients_search_vector_insert
+    AFTER INSERT ON public.ingredients
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.ingredients_append_search_vector();
+
+CREATE OR REPLACE TRIGGER worksteps_search_vector_insert
+    AFTER INSERT ON public.worksteps
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.worksteps_append_search_vector();
@@ -0,0 +1,26 @@
+"""
+	Autocomplete endpoints
+"""
+from pydantic import BaseModel, Field
+
+from typing import List
+
+from src.api.models.general import APIHeader
+
+
+class Completion(BaseModel):
+    value: str = Field(alias='value')
+    # Number of uses (ingredients) or linked receipts (tags)
+    frequency: int = Field(alias='frequency', default=0)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class CompletionResponse(APIHeader):
+    items: List[Completion] = Field(alias='items')
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
@@ -1,6 +1,8 @@
 """
 General api model
 """
+from enum import Enum
+
 from pydantic import BaseModel, Field
 
 from src.settings import FA_APP_VERSION
@@ -16,3 +18,11 @@ class APIHeader(BaseModel):
     class Config:
         # Allows to use field and alias name
         allow_population_by_field_name = True
+
+
+class SortOrder(str, Enum):
+    """
+    Sort direction of list endpoints
+    """
+    asc = 'asc'
+    desc = 'desc'
@@ -42,6 +42,30 @@ class IngredientCreate(IngredientBase):
         allow_population_by_field_name = True
 
 
+class IngredientBatchCreate(IngredientBase):
+    """
+    Ingredient of a batch, the receipt is given by the path
+    """
+    amount: int = Field(alias='amount')
+    unit: str = Field(alias='unit', max_length=50)
+    ingredient: str = Field(alias='ingredientName', max_length=200)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class IngredientFullUpdate(IngredientBatchCreate):
+    """
+    Ingredient of a replaced receipt, new ingredients have no id
+    """
+    id: Optional[UUID] = Field(alias='id', default=None)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
 class IngredientUpdate(IngredientBase):
     pass
 
@@ -66,6 +90,8 @@ class IngredientRead(IngredientBase):
     class Config:
         # Allows to use field and alias name
         allow_population_by_field_name = True
+        # Allow orm mapping
+        from_attributes = True
 
 
 class IngredientResponse(APIHeader):
@@ -1,12 +1,17 @@
 """
 	Receipt endpoints
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, StringConstraints
 
-from typing import Optional, List
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, Optional, List
 from uuid import UUID
 
 from src.api.models.general import APIHeader
+from src.api.models.ingredients import IngredientRead, IngredientFullUpdate
+from src.api.models.worksteps import WorkstepRead, WorkstepFullUpdate
+from src.api.models.tags import TagRead
 
 
 class ReceiptBase(BaseModel):
@@ -18,8 +23,33 @@ class ReceiptBase(BaseModel):
         allow_population_by_field_name = True
 
 
+class ReceiptSort(str, Enum):
+    """
+    Sort keys of the receipt listing
+    """
+    title = 'title'
+    created_at = 'createdAt'
+
+
+class TagMatch(str, Enum):
+    """
+    Semantics of the tags filter of the receipt listing
+    """
+    all = 'all'
+    any = 'any'
+
+
+class ExportFormat(str, Enum):
+    """
+    Output of the receipt export
+    """
+    pdf = 'pdf'
+    zip = 'zip'
+
+
 class ReceiptInDBBase(ReceiptBase):
     id: UUID = Field(alias='id', default=None)
+    created_at: Optional[datetime] = Field(alias='createdAt', validation_alias='created_at', default=None)
 
     class Config:
         # Allows to use field and alias name
@@ -57,10 +87,13 @@ class ReceiptReadInDB(ReceiptInDBBase):
 
 class ReceiptRead(ReceiptBase):
     id: UUID = Field(alias='id', default=None)
+    created_at: Optional[datetime] = Field(alias='createdAt', validation_alias='created_at', default=None)
 
     class Config:
         # Allows to use field and alias name
         allow_population_by_field_name = True
+        # Allow orm mapping
+        from_attributes = True
 
 
 class ReceiptResponse(APIHeader):
@@ -69,3 +102,110 @@ class ReceiptResponse(APIHeader):
     class Config:
         # Allows to use field and alias name
         allow_population_by_field_name = True
+
+
+class ReceiptListRead(ReceiptRead):
+    tags: List[TagRead] = Field(alias='tags', default=[])
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ReceiptPageResponse(ReceiptResponse):
+    items: List[ReceiptListRead] = Field(alias='items')
+    next_cursor: Optional[str] = Field(alias='nextCursor', validation_alias='next_cursor', default=None)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ReceiptFullRead(ReceiptRead):
+    ingredients: List[IngredientRead] = Field(alias='ingredients', default=[])
+    worksteps: List[WorkstepRead] = Field(alias='worksteps', default=[])
+    tags: List[TagRead] = Field(alias='tags', default=[])
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ReceiptFullUpdate(ReceiptBase):
+    """
+    Complete receipt replacing the stored one, worksteps in their order and tags by name
+    """
+    title: str = Field(alias='title', max_length=50)
+    ingredients: List[IngredientFullUpdate] = Field(alias='ingredients', default=[])
+    worksteps: List[WorkstepFullUpdate] = Field(alias='worksteps', default=[])
+    tags: List[str] = Field(alias='tags', default=[])
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ReceiptFullResponse(APIHeader):
+    items: List[ReceiptFullRead] = Field(alias='items')
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ReceiptExport(BaseModel):
+    """
+    Selection of the receipt export, either receipt ids or a tag
+    """
+    ids: Optional[List[UUID]] = Field(alias='ids', default=None, min_length=1, max_length=1000)
+    tag: Optional[str] = Field(alias='tag', default=None, max_length=20)
+    format: ExportFormat = Field(alias='format', default=ExportFormat.pdf)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class CookableQuery(BaseModel):
+    """
+    Ingredients on hand, receipts missing at most max_missing of their ingredients are returned
+    """
+    ingredients: List[Annotated[str, StringConstraints(max_length=200)]] = Field(alias='ingredients', min_length=1,
+                                                                               max_length=500)
+    max_missing: int = Field(alias='maxMissing', default=0, ge=0, le=50)
+    limit: int = Field(alias='limit', default=20, ge=1, le=100)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class CookableReceipt(ReceiptRead):
+    # Number of the (normalized) ingredients of the receipt that are on hand
+    matched: int = Field(alias='matched', default=0)
+    missing: List[str] = Field(alias='missingIngredients', validation_alias='missing', default=[])
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+        # Allow orm mapping
+        from_attributes = True
+
+
+class CookableResponse(APIHeader):
+    items: List[CookableReceipt] = Field(alias='items')
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ReceiptDelete(BaseModel):
+    """
+    Receipts deleted together in one transaction
+    """
+    ids: List[UUID] = Field(alias='ids', min_length=1, max_length=1000)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
@@ -0,0 +1,30 @@
+"""
+	Search endpoints
+"""
+from pydantic import Field
+
+from typing import Optional, List
+
+from src.api.models.general import APIHeader
+from src.api.models.receipts import ReceiptRead
+
+
+class SearchHit(ReceiptRead):
+    rank: float = Field(alias='rank', default=0.0)
+    # Excerpt of the receipt, matched words are enclosed in <b></b> (the receipt text itself is not escaped)
+    headline: Optional[str] = Field(alias='headline', default=None)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+        # Allow orm mapping
+        from_attributes = True
+
+
+class SearchResponse(APIHeader):
+    items: List[SearchHit] = Field(alias='items')
+    next_cursor: Optional[str] = Field(alias='nextCursor', validation_alias='next_cursor', default=None)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
@@ -0,0 +1,47 @@
+"""
+	Shopping list endpoints
+"""
+from pydantic import BaseModel, Field
+
+from typing import List
+from uuid import UUID
+
+from src.api.models.general import APIHeader
+
+
+class ShoppingListReceipt(BaseModel):
+    receipt_id: UUID = Field(alias='receiptId')
+    # Multiplier of the amounts (e.g. 2 for a double portion), receipts given twice are added up
+    servings: float = Field(alias='servings', default=1.0, gt=0, le=100)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ShoppingListCreate(BaseModel):
+    receipts: List[ShoppingListReceipt] = Field(alias='receipts', min_length=1, max_length=200)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ShoppingListItem(BaseModel):
+    ingredient: str = Field(alias='ingredientName', validation_alias='ingredient')
+    amount: float = Field(alias='amount')
+    unit: str = Field(alias='unit')
+    # Number of receipts using the ingredient
+    receipt_count: int = Field(alias='receiptCount', validation_alias='receipt_count', default=0)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class ShoppingListResponse(APIHeader):
+    items: List[ShoppingListItem] = Field(alias='items')
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
@@ -51,6 +51,8 @@ class TagRead(TagBase):
     class Config:
         # Allows to use field and alias name
         allow_population_by_field_name = True
+        # Allow orm mapping
+        from_attributes = True
 
 
 class TagResponse(APIHeader):
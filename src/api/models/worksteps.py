@@ -38,6 +38,28 @@ class WorkstepCreate(WorkstepBase):
         allow_population_by_field_name = True
 
 
+class WorkstepBatchCreate(WorkstepBase):
+    """
+    Workstep of a replaced list, the receipt is given by the path and the order by the position
+    """
+    workstep: str = Field(alias='workstep', max_length=500)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
+class WorkstepFullUpdate(WorkstepBatchCreate):
+    """
+    Workstep of a replaced receipt in its position, new worksteps have no id
+    """
+    id: Optional[UUID] = Field(alias='id', default=None)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
 class WorkstepUpdate(WorkstepBase):
     pass
 
@@ -46,6 +68,17 @@ class WorkstepUpdate(WorkstepBase):
         allow_population_by_field_name = True
 
 
+class WorkstepMove(BaseModel):
+    """
+    Target position of a moved workstep, no afterId moves the workstep to the start
+    """
+    after_id: Optional[UUID] = Field(alias='afterId', default=None)
+
+    class Config:
+        # Allows to use field and alias name
+        allow_population_by_field_name = True
+
+
 class WorkstepReadInDB(WorkstepInDBBase):
     pass
 
@@ -62,6 +95,8 @@ class WorkstepRead(WorkstepBase):
     class Config:
         # Allows to use field and alias name
         allow_population_by_field_name = True
+        # Allow orm mapping
+        from_attributes = True
 
 
 class WorkstepResponse(APIHeader):
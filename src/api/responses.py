@@ -0,0 +1,28 @@
+"""
+    Response helpers of the api
+"""
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from typing import Union
+
+
+def model_response(content: Union[BaseModel, Response], status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Serialize an already validated API response model with orjson
+
+    Returning a Response skips the response_model validation of FastAPI, the response_model of the route is
+    only used for the documentation. Responses returned by a service (e.g. 204, pdf) are passed through.
+    UUIDs and datetimes are converted by pydantic-core (json mode), asyncpg returns its own UUID subclass
+    which orjson does not serialize.
+
+    :param content: API response model or response of the service
+    :param status_code: HTTP status code of the response
+    :return: HTTP response
+    """
+    if isinstance(content, Response):
+        return content
+
+    return ORJSONResponse(content=content.model_dump(mode='json', by_alias=True), status_code=status_code)
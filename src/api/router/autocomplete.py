@@ -0,0 +1,79 @@
+"""
+Autocomplete endpoints
+"""
+
+from fastapi import APIRouter, Depends, status, Query
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
+
+from src.api.models.auth import User
+from src.api.models.autocomplete import CompletionResponse
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
+from src.search.autocomplete import MAX_COMPLETIONS
+from src.service.autocomplete import serv_autocomplete_ingredients, serv_autocomplete_tags
+from src.authentication.auth import get_user_info
+
+
+router = APIRouter(prefix="/api/autocomplete",
+                   dependencies=[Depends(get_user_info)])
+
+
+@router.get(
+    "/ingredients",
+    tags=["autocomplete"],
+    response_class=ORJSONResponse,
+    response_model=CompletionResponse,
+    description="Endpoint to complete ingredient names of the receipts of the user, most used first",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_autocomplete_ingredients(request: Request,
+                                        db_session: AnySession = Depends(get_db),
+                                        prefix: str = Query(alias='prefix', min_length=1, max_length=200,
+                                                            title='Typed prefix of the ingredient name'),
+                                        limit: int = Query(alias='limit', default=10, ge=1, le=MAX_COMPLETIONS,
+                                                           title='Maximum number of names'),
+                                        user: User = Depends(get_user_info)):
+    """
+    # GET Endpoint to complete ingredient names, case insensitive
+
+    :param request: General request information
+    :param db_session: database session
+    :param prefix: Typed prefix
+    :param limit: Maximum number of names
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_autocomplete_ingredients, request=request, db_session=db_session, user=user,
+                                 prefix=prefix, limit=limit)
+    return model_response(response)
+
+
+@router.get(
+    "/tags",
+    tags=["autocomplete"],
+    response_class=ORJSONResponse,
+    response_model=CompletionResponse,
+    description="Endpoint to complete tags, most linked first",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_autocomplete_tags(request: Request,
+                                 db_session: AnySession = Depends(get_db),
+                                 prefix: str = Query(alias='prefix', min_length=1, max_length=20,
+                                                     title='Typed prefix of the tag'),
+                                 limit: int = Query(alias='limit', default=10, ge=1, le=MAX_COMPLETIONS,
+                                                    title='Maximum number of tags')):
+    """
+    # GET Endpoint to complete tags, case insensitive
+
+    :param request: General request information
+    :param db_session: database session
+    :param prefix: Typed prefix
+    :param limit: Maximum number of tags
+    :return: API response model
+    """
+    response = await run_service(serv_autocomplete_tags, request=request, db_session=db_session,
+                                 prefix=prefix, limit=limit)
+    return model_response(response)
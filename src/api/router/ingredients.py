@@ -3,22 +3,25 @@ Ingredient endpoints
 """
 
 from fastapi import APIRouter, Depends, status, Path, Body
-from sqlalchemy.orm import Session
-from starlette.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
 from starlette.requests import Request
 
 from src.api.models.auth import User
 from src.authentication.auth import get_user_info
-from src.database.database import get_db
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
 from src.service.ingredients import (
     serv_get_ingredient,
     serv_create_ingredient,
     serv_update_ingredient,
     serv_get_ingredients_by_receipt,
     serv_delete_ingredient,
+    serv_create_ingredients_batch,
 )
+from typing import List
 from uuid import UUID
-from src.api.models.ingredients import IngredientCreate, IngredientUpdate, IngredientResponse
+from src.api.models.ingredients import IngredientCreate, IngredientBatchCreate, IngredientUpdate, IngredientResponse
 
 router = APIRouter(prefix="/api",
                    dependencies=[Depends(get_user_info)])
@@ -27,17 +30,17 @@ router = APIRouter(prefix="/api",
 @router.post(
     "/ingredients",
     tags=["ingredients"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=IngredientResponse,
     description="Endpoint to create a ingredient ",
     status_code=status.HTTP_201_CREATED,
     deprecated=False,
 )
-def endp_create_ingredient(request: Request,
-                           db_session: Session = Depends(get_db),
-                           body: IngredientCreate = Body(alias='ingredientCreate',
-                                                         title='Ingredient Post Model'),
-                           user: User = Depends(get_user_info)):
+async def endp_create_ingredient(request: Request,
+                                 db_session: AnySession = Depends(get_db),
+                                 body: IngredientCreate = Body(alias='ingredientCreate',
+                                                               title='Ingredient Post Model'),
+                                 user: User = Depends(get_user_info)):
     """
     # POST Endpoint to create ingredient
 
@@ -47,23 +50,24 @@ def endp_create_ingredient(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_create_ingredient(request=request, db_session=db_session, body=body, user=user)
+    response = await run_service(serv_create_ingredient, request=request, db_session=db_session, body=body, user=user)
+    return model_response(response, status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
     "/ingredients/{uuid}",
     tags=["ingredients"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=IngredientResponse,
     description="Endpoint to get a ingredient by id",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_get_ingredient_by_id(request: Request,
-                              db_session: Session = Depends(get_db),
-                              uuid: UUID = Path(alias='uuid',
-                                                title='UUID of ingredient'),
-                              user: User = Depends(get_user_info)):
+async def endp_get_ingredient_by_id(request: Request,
+                                    db_session: AnySession = Depends(get_db),
+                                    uuid: UUID = Path(alias='uuid',
+                                                      title='UUID of ingredient'),
+                                    user: User = Depends(get_user_info)):
     """
     # GET Endpoint to fetch ingredient by id
 
@@ -73,24 +77,56 @@ def endp_get_ingredient_by_id(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_get_ingredient(request=request, db_session=db_session, uuid=uuid, user=user)
+    response = await run_service(serv_get_ingredient, request=request, db_session=db_session, uuid=uuid, user=user)
+    return model_response(response)
+
+
+@router.post(
+    "/receipts/{receipt_id}/ingredients:batch",
+    tags=["ingredients"],
+    response_class=ORJSONResponse,
+    response_model=IngredientResponse,
+    description="Endpoint to create several ingredients of a receipt",
+    status_code=status.HTTP_201_CREATED,
+    deprecated=False,
+)
+async def endp_create_ingredients_batch(request: Request,
+                                        db_session: AnySession = Depends(get_db),
+                                        receipt_id: UUID = Path(alias='receipt_id',
+                                                                title='UUID of receipt'),
+                                        body: List[IngredientBatchCreate] = Body(alias='ingredientBatchCreate',
+                                                                                 title='Ingredient Create Models'),
+                                        user: User = Depends(get_user_info)):
+    """
+    POST Endpoint to create several ingredients of a receipt in one transaction
+
+    :param receipt_id: UUID of receipt
+    :param body: API post models
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_create_ingredients_batch, request=request, db_session=db_session,
+                                 receipt_id=receipt_id, body=body, user=user)
+    return model_response(response, status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
     "/receipts/{receipt_id}/ingredients",
     tags=["ingredients"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=IngredientResponse,
     description="Endpoint to get ingredients by receipt",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_get_ingredients_by_receipt(request: Request,
-                                    db_session: Session = Depends(get_db),
-                                    receipt_id: UUID = Path(alias='receipt_id',
-                                                            title='UUID of receipt'),
-                                    user: User = Depends(get_user_info)
-                                    ):
+async def endp_get_ingredients_by_receipt(request: Request,
+                                          db_session: AnySession = Depends(get_db),
+                                          receipt_id: UUID = Path(alias='receipt_id',
+                                                                  title='UUID of receipt'),
+                                          user: User = Depends(get_user_info)
+                                          ):
     """
     GET Endpoint to fetch ingredient by receipt
 
@@ -100,25 +136,27 @@ def endp_get_ingredients_by_receipt(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_get_ingredients_by_receipt(request=request, db_session=db_session, receipt_id=receipt_id, user=user)
+    response = await run_service(serv_get_ingredients_by_receipt, request=request, db_session=db_session,
+                                 receipt_id=receipt_id, user=user)
+    return model_response(response)
 
 
 @router.patch(
     "/ingredients/{uuid}",
     tags=["ingredients"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=IngredientResponse,
     description="Endpoint to update ingredient",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_update_ingredient(request: Request,
-                           db_session: Session = Depends(get_db),
-                           uuid: UUID = Path(alias='uuid',
-                                             title='UUID of ingredient'),
-                           body: IngredientUpdate = Body(alias='ingredientUpdate',
-                                                         title='Ingredient Patch Model'),
-                           user: User = Depends(get_user_info)):
+async def endp_update_ingredient(request: Request,
+                                 db_session: AnySession = Depends(get_db),
+                                 uuid: UUID = Path(alias='uuid',
+                                                   title='UUID of ingredient'),
+                                 body: IngredientUpdate = Body(alias='ingredientUpdate',
+                                                               title='Ingredient Patch Model'),
+                                 user: User = Depends(get_user_info)):
     """
     PATCH Endpoint to update ingredient
 
@@ -129,7 +167,9 @@ def endp_update_ingredient(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_update_ingredient(request=request, db_session=db_session, uuid=uuid, body=body, user=user)
+    response = await run_service(serv_update_ingredient, request=request, db_session=db_session, uuid=uuid, body=body,
+                                 user=user)
+    return model_response(response)
 
 
 @router.delete(
@@ -140,11 +180,11 @@ def endp_update_ingredient(request: Request,
     status_code=status.HTTP_204_NO_CONTENT,
     deprecated=False,
 )
-def endp_delete_ingredient(request: Request,
-                           db_session: Session = Depends(get_db),
-                           uuid: UUID = Path(alias='uuid',
-                                             title='UUID of ingredient'),
-                           user: User = Depends(get_user_info)):
+async def endp_delete_ingredient(request: Request,
+                                 db_session: AnySession = Depends(get_db),
+                                 uuid: UUID = Path(alias='uuid',
+                                                   title='UUID of ingredient'),
+                                 user: User = Depends(get_user_info)):
     """
     DELETE Endpoint to remove ingredient
 
@@ -154,4 +194,4 @@ def endp_delete_ingredient(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_delete_ingredient(request=request, db_session=db_session, uuid=uuid, user=user)
+    return await run_service(serv_delete_ingredient, request=request, db_session=db_session, uuid=uuid, user=user)
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, status, Path
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, status, Body, Path
+from typing import List
 from uuid import UUID
-from starlette.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
 from starlette.requests import Request
 
 from src.api.models.auth import User
 from src.api.models.tags import TagResponse
-from src.database.database import get_db
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
 
 from src.service.receipt_tag_link import (serv_create_receipt_tag_link,
                                           serv_delete_receipt_tag_link,
-                                          serv_read_tags_by_receipt)
+                                          serv_read_tags_by_receipt,
+                                          serv_set_receipt_tags)
 
 from src.authentication.auth import get_user_info
 
@@ -27,13 +30,13 @@ router = APIRouter(prefix="/api",
     status_code=status.HTTP_201_CREATED,
     deprecated=False
 )
-def endp_create_receipt_tag_link(request: Request,
-                                 db_session: Session = Depends(get_db),
-                                 receipt_id: UUID = Path(alias='receipt_id',
-                                                         title='UUID of receipt'),
-                                 tag_id: UUID = Path(alias='tag_id',
-                                                     title='UUID of tag'),
-                                 user: User = Depends(get_user_info)):
+async def endp_create_receipt_tag_link(request: Request,
+                                       db_session: AnySession = Depends(get_db),
+                                       receipt_id: UUID = Path(alias='receipt_id',
+                                                               title='UUID of receipt'),
+                                       tag_id: UUID = Path(alias='tag_id',
+                                                           title='UUID of tag'),
+                                       user: User = Depends(get_user_info)):
     """
     POST Endpoint to create a receipt tag link
 
@@ -44,8 +47,8 @@ def endp_create_receipt_tag_link(request: Request,
     :param user: User information
     :return: HTTP Respone
     """
-    return serv_create_receipt_tag_link(request=request, db_session=db_session, receipt_id=receipt_id, tag_id=tag_id,
-                                        user=user)
+    return await run_service(serv_create_receipt_tag_link, request=request, db_session=db_session,
+                             receipt_id=receipt_id, tag_id=tag_id, user=user)
 
 
 @router.delete(
@@ -56,13 +59,13 @@ def endp_create_receipt_tag_link(request: Request,
     status_code=status.HTTP_204_NO_CONTENT,
     deprecated=False
 )
-def endp_delete_receipt_tag_link(request: Request,
-                                 db_session: Session = Depends(get_db),
-                                 receipt_id: UUID = Path(alias='receipt_id',
-                                                         title='UUID of receipt'),
-                                 tag_id: UUID = Path(alias='tag_id',
-                                                     title='UUID of tag'),
-                                 user: User = Depends(get_user_info)):
+async def endp_delete_receipt_tag_link(request: Request,
+                                       db_session: AnySession = Depends(get_db),
+                                       receipt_id: UUID = Path(alias='receipt_id',
+                                                               title='UUID of receipt'),
+                                       tag_id: UUID = Path(alias='tag_id',
+                                                           title='UUID of tag'),
+                                       user: User = Depends(get_user_info)):
     """
     Delete Endpoint to remove a receipt tag link
 
@@ -73,24 +76,24 @@ def endp_delete_receipt_tag_link(request: Request,
     :param user: User information
     :return: HTTP Respone
     """
-    return serv_delete_receipt_tag_link(request=request, db_session=db_session, receipt_id=receipt_id, tag_id=tag_id,
-                                        user=user)
+    return await run_service(serv_delete_receipt_tag_link, request=request, db_session=db_session,
+                             receipt_id=receipt_id, tag_id=tag_id, user=user)
 
 
 @router.get(
     "/receipts/{receipt_id}/tags",
     tags=['receipt-tag-links'],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=TagResponse,
     description="Get all links by a receipt",
     status_code=status.HTTP_200_OK,
     deprecated=False
 )
-def endp_get_tags_by_receipt(request: Request,
-                             db_session: Session = Depends(get_db),
-                             receipt_id: UUID = Path(alias='receipt_id',
-                                                     title='UUID of receipt'),
-                             user: User = Depends(get_user_info)):
+async def endp_get_tags_by_receipt(request: Request,
+                                   db_session: AnySession = Depends(get_db),
+                                   receipt_id: UUID = Path(alias='receipt_id',
+                                                           title='UUID of receipt'),
+                                   user: User = Depends(get_user_info)):
     """
     GET Endpoint to fetch all links by receipt
 
@@ -100,4 +103,38 @@ def endp_get_tags_by_receipt(request: Request,
     :param user: User information
     :return: HTTP Respone
     """
-    return serv_read_tags_by_receipt(request=request, db_session=db_session, receipt_id=receipt_id, user=user)
+    response = await run_service(serv_read_tags_by_receipt, request=request, db_session=db_session,
+                                 receipt_id=receipt_id, user=user)
+    return model_response(response)
+
+
+@router.put(
+    "/receipts/{receipt_id}/tags",
+    tags=['receipt-tag-links'],
+    response_class=ORJSONResponse,
+    response_model=TagResponse,
+    description="Sets the tags of a receipt by name",
+    status_code=status.HTTP_200_OK,
+    deprecated=False
+)
+async def endp_set_receipt_tags(request: Request,
+                                db_session: AnySession = Depends(get_db),
+                                receipt_id: UUID = Path(alias='receipt_id',
+                                                        title='UUID of receipt'),
+                                body: List[str] = Body(alias='tags',
+                                                       title='Tag names',
+                                                       max_length=100),
+                                user: User = Depends(get_user_info)):
+    """
+    PUT Endpoint to replace the tags of a receipt, unknown tags are created and unused tags are removed
+
+    :param request: General request information
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param body: Tag names
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_set_receipt_tags, request=request, db_session=db_session,
+                                 receipt_id=receipt_id, body=body, user=user)
+    return model_response(response)
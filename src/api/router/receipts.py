@@ -2,23 +2,42 @@
 Receipt endpoints
 """
 
-from fastapi import APIRouter, Depends, status, Body, Path
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, status, Body, Path, Query
+from typing import Optional
 from uuid import UUID
-from starlette.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
 from starlette.requests import Request
 
 from src.api.models.auth import User
-from src.database.database import get_db
-from src.api.models.receipts import ReceiptCreate, ReceiptUpdate, ReceiptResponse
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
+from src.api.models.general import SortOrder
+from src.api.models.receipts import (ReceiptCreate,
+                                     ReceiptUpdate,
+                                     ReceiptResponse,
+                                     ReceiptFullResponse,
+                                     ReceiptFullUpdate,
+                                     ReceiptPageResponse,
+                                     ReceiptSort,
+                                     TagMatch,
+                                     ReceiptExport,
+                                     ReceiptDelete,
+                                     CookableQuery,
+                                     CookableResponse)
 from src.service.receipts import (
     serv_create_receipt,
     serv_delete_receipt,
+    serv_delete_receipts,
     serv_update_receipt,
     serv_get_receipts,
     serv_get_receipt,
-    serv_get_receipt_pdf
+    serv_get_receipt_full,
+    serv_get_receipt_pdf,
+    serv_replace_receipt_full
 )
+from src.service.receipt_export import serv_export_receipts
+from src.service.cookable import serv_get_cookable_receipts
 from src.authentication.auth import get_user_info
 
 
@@ -29,17 +48,17 @@ router = APIRouter(prefix="/api",
 @router.post(
     "/receipts",
     tags=["receipts"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=ReceiptResponse,
     description="Endpoint to create receipt",
     status_code=status.HTTP_201_CREATED,
     deprecated=False,
 )
-def endp_create_receipt(request: Request,
-                        db_session: Session = Depends(get_db),
-                        body: ReceiptCreate = Body(alias='receiptCreate',
-                                                   title='Receipt Create Model'),
-                        user: User = Depends(get_user_info)):
+async def endp_create_receipt(request: Request,
+                              db_session: AnySession = Depends(get_db),
+                              body: ReceiptCreate = Body(alias='receiptCreate',
+                                                         title='Receipt Create Model'),
+                              user: User = Depends(get_user_info)):
     """
     POST Endpoint to create a receipt
 
@@ -49,44 +68,126 @@ def endp_create_receipt(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_create_receipt(request=request, db_session=db_session, body=body, user=user)
+    response = await run_service(serv_create_receipt, request=request, db_session=db_session, body=body, user=user)
+    return model_response(response, status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    "/receipts/export",
+    tags=["receipts"],
+    description="Endpoint to export receipts as one pdf or as a zip of pdfs",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_export_receipts(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               body: ReceiptExport = Body(alias='receiptExport',
+                                                          title='Receipt Export Model'),
+                               user: User = Depends(get_user_info)):
+    """
+    POST Endpoint to export receipts selected by ids or by a tag
+
+    :param body: API export model
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: Streamed pdf or zip
+    """
+    return await serv_export_receipts(request=request, db_session=db_session, body=body, user=user)
+
+
+@router.post(
+    "/receipts/cookable",
+    tags=["receipts"],
+    response_class=ORJSONResponse,
+    response_model=CookableResponse,
+    description="Endpoint to find the receipts that can be cooked with the ingredients on hand",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_get_cookable_receipts(request: Request,
+                                     db_session: AnySession = Depends(get_db),
+                                     body: CookableQuery = Body(alias='cookableQuery',
+                                                                title='Cookable Query Model'),
+                                     user: User = Depends(get_user_info)):
+    """
+    POST Endpoint to rank the receipts of the user by the coverage of their ingredients with the ingredients on hand
+
+    :param body: API query model
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_get_cookable_receipts, request=request, db_session=db_session, body=body,
+                                 user=user)
+    return model_response(response)
 
 
 @router.get(
     "/receipts",
     tags=["receipts"],
-    response_class=JSONResponse,
-    response_model=ReceiptResponse,
-    description="Endpoint to get all receipts",
+    response_class=ORJSONResponse,
+    response_model=ReceiptPageResponse,
+    description="Endpoint to get the receipts page by page",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_get_receipts(request: Request, db_session: Session = Depends(get_db), user: User = Depends(get_user_info)):
+async def endp_get_receipts(request: Request,
+                            db_session: AnySession = Depends(get_db),
+                            limit: int = Query(alias='limit', default=50, ge=1, le=500,
+                                               title='Maximum number of receipts'),
+                            cursor: Optional[str] = Query(alias='cursor', default=None,
+                                                          title='nextCursor of the previous page'),
+                            sort: ReceiptSort = Query(alias='sort', default=ReceiptSort.title,
+                                                      title='Sort key'),
+                            order: SortOrder = Query(alias='order', default=SortOrder.asc,
+                                                     title='Sort direction'),
+                            title_prefix: Optional[str] = Query(alias='titlePrefix', default=None, max_length=50,
+                                                                title='Prefix of the receipt title'),
+                            tag: Optional[str] = Query(alias='tag', default=None, max_length=20,
+                                                       title='Tag of the receipts'),
+                            tags: Optional[str] = Query(alias='tags', default=None, max_length=500,
+                                                        title='Comma separated tags of the receipts'),
+                            match: TagMatch = Query(alias='match', default=TagMatch.all,
+                                                    title='Receipts with all or any of the tags'),
+                            user: User = Depends(get_user_info)):
     """
-    # GET Endpoint to fetch all receipts
+    # GET Endpoint to fetch the receipts page by page
 
     :param request: General request information
     :param db_session: database session
+    :param limit: Maximum number of receipts
+    :param cursor: Cursor of the previous page
+    :param sort: Sort key
+    :param order: Sort direction
+    :param title_prefix: Prefix of the receipt title
+    :param tag: Tag of the receipts
+    :param tags: Comma separated tags of the receipts
+    :param match: Receipts with all or any of the tags
     :param user: User information
     :return: API response model
     """
-    return serv_get_receipts(request=request, db_session=db_session, user=user)
+    response = await run_service(serv_get_receipts, request=request, db_session=db_session, user=user, limit=limit,
+                                 cursor=cursor, sort=sort, order=order, title_prefix=title_prefix, tag=tag,
+                                 tags=tags, match=match)
+    return model_response(response)
 
 
 @router.get(
     "/receipts/{uuid}",
     tags=["receipts"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=ReceiptResponse,
     description="Endpoint to get a receipt by id",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_get_receipt(request: Request,
-                     db_session: Session = Depends(get_db),
-                     uuid: UUID = Path(alias='uuid',
-                                       title='UUID of receipt'),
-                     user: User = Depends(get_user_info)):
+async def endp_get_receipt(request: Request,
+                           db_session: AnySession = Depends(get_db),
+                           uuid: UUID = Path(alias='uuid',
+                                             title='UUID of receipt'),
+                           user: User = Depends(get_user_info)):
     """
     # GET Endpoint to fetch a receipt by id
 
@@ -96,7 +197,67 @@ def endp_get_receipt(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_get_receipt(request=request, db_session=db_session, uuid=uuid, user=user)
+    response = await run_service(serv_get_receipt, request=request, db_session=db_session, uuid=uuid, user=user)
+    return model_response(response)
+
+
+@router.get(
+    "/receipts/{uuid}/full",
+    tags=["receipts"],
+    response_class=ORJSONResponse,
+    response_model=ReceiptFullResponse,
+    description="Endpoint to get a receipt with ingredients, worksteps (ordered by orderNumber) and tags",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_get_receipt_full(request: Request,
+                                db_session: AnySession = Depends(get_db),
+                                uuid: UUID = Path(alias='uuid',
+                                                  title='UUID of receipt'),
+                                user: User = Depends(get_user_info)):
+    """
+    # GET Endpoint to fetch a receipt with all ingredients, worksteps and tags in one request
+
+    :param uuid: UUID of receipt
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_get_receipt_full, request=request, db_session=db_session, uuid=uuid, user=user)
+    return model_response(response)
+
+
+@router.put(
+    "/receipts/{uuid}/full",
+    tags=["receipts"],
+    response_class=ORJSONResponse,
+    response_model=ReceiptFullResponse,
+    description="Endpoint to replace a receipt with its ingredients, worksteps and tags, the worksteps in the order of "
+                "the list",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_replace_receipt_full(request: Request,
+                                    db_session: AnySession = Depends(get_db),
+                                    uuid: UUID = Path(alias='uuid',
+                                                      title='UUID of receipt'),
+                                    body: ReceiptFullUpdate = Body(alias='receiptFullUpdate',
+                                                                   title='Receipt Full Update Model'),
+                                    user: User = Depends(get_user_info)):
+    """
+    PUT Endpoint to replace a whole receipt in one transaction
+
+    :param uuid: UUID of receipt
+    :param body: API put model
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_replace_receipt_full, request=request, db_session=db_session, uuid=uuid,
+                                 body=body, user=user)
+    return model_response(response)
 
 
 @router.get(
@@ -106,30 +267,30 @@ def endp_get_receipt(request: Request,
     status_code=status.HTTP_200_OK,
     deprecated=False
 )
-def endp_get_receipt_pdf(request: Request,
-                         db_session: Session = Depends(get_db),
-                         uuid: UUID = Path(alias='uuid',
-                                           title='UUID of receipt'),
-                         user: User = Depends(get_user_info)):
-    return serv_get_receipt_pdf(request=request, db_session=db_session, uuid=uuid, user=user)
+async def endp_get_receipt_pdf(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               uuid: UUID = Path(alias='uuid',
+                                                 title='UUID of receipt'),
+                               user: User = Depends(get_user_info)):
+    return await serv_get_receipt_pdf(request=request, db_session=db_session, uuid=uuid, user=user)
 
 
 @router.patch(
     "/receipts/{uuid}",
     tags=["receipts"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=ReceiptResponse,
     description="Endpoint to update a receipt",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_update_receipt(request: Request,
-                        db_session: Session = Depends(get_db),
-                        uuid: UUID = Path(alias='uuid',
-                                          title='UUID of receipt'),
-                        body: ReceiptUpdate = Body(alias='receiptUpdate',
-                                                   title='Receipt Patch Model'),
-                        user: User = Depends(get_user_info)):
+async def endp_update_receipt(request: Request,
+                              db_session: AnySession = Depends(get_db),
+                              uuid: UUID = Path(alias='uuid',
+                                                title='UUID of receipt'),
+                              body: ReceiptUpdate = Body(alias='receiptUpdate',
+                                                         title='Receipt Patch Model'),
+                              user: User = Depends(get_user_info)):
     """
     PATCH Endpoint to update a receipt
 
@@ -140,7 +301,9 @@ def endp_update_receipt(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_update_receipt(request=request, db_session=db_session, uuid=uuid, body=body, user=user)
+    response = await run_service(serv_update_receipt, request=request, db_session=db_session, uuid=uuid, body=body,
+                                 user=user)
+    return model_response(response)
 
 
 @router.delete(
@@ -151,11 +314,11 @@ def endp_update_receipt(request: Request,
     status_code=status.HTTP_204_NO_CONTENT,
     deprecated=False,
 )
-def endp_delete_receipt(request: Request,
-                        db_session: Session = Depends(get_db),
-                        uuid: UUID = Path(alias='uuid',
-                                          title='UUID of receipt'),
-                        user: User = Depends(get_user_info)):
+async def endp_delete_receipt(request: Request,
+                              db_session: AnySession = Depends(get_db),
+                              uuid: UUID = Path(alias='uuid',
+                                                title='UUID of receipt'),
+                              user: User = Depends(get_user_info)):
     """
     # DELETE Endpoint to remove a receipt
 
@@ -165,4 +328,29 @@ def endp_delete_receipt(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_delete_receipt(request=request, db_session=db_session, uuid=uuid, user=user)
+    return await run_service(serv_delete_receipt, request=request, db_session=db_session, uuid=uuid, user=user)
+
+
+@router.delete(
+    "/receipts",
+    tags=["receipts"],
+    response_class=Response,
+    description="Endpoint to delete several receipts",
+    status_code=status.HTTP_204_NO_CONTENT,
+    deprecated=False,
+)
+async def endp_delete_receipts(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               body: ReceiptDelete = Body(alias='receiptDelete',
+                                                          title='Receipt Delete Model'),
+                               user: User = Depends(get_user_info)):
+    """
+    # DELETE Endpoint to remove several receipts with their ingredients, worksteps and tag links
+
+    :param body: API delete model
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: API response model
+    """
+    return await run_service(serv_delete_receipts, request=request, db_session=db_session, body=body, user=user)
@@ -0,0 +1,53 @@
+"""
+Search endpoints
+"""
+
+from fastapi import APIRouter, Depends, status, Query
+from typing import Optional
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
+
+from src.api.models.auth import User
+from src.api.models.search import SearchResponse
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
+from src.service.search import serv_search_receipts
+from src.authentication.auth import get_user_info
+
+
+router = APIRouter(prefix="/api",
+                   dependencies=[Depends(get_user_info)])
+
+
+@router.get(
+    "/search",
+    tags=["search"],
+    response_class=ORJSONResponse,
+    response_model=SearchResponse,
+    description="Endpoint to search the receipts by title, description, ingredients and worksteps",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_search_receipts(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               query: str = Query(alias='q', min_length=1, max_length=200,
+                                                  title='Search query'),
+                               limit: int = Query(alias='limit', default=20, ge=1, le=100,
+                                                  title='Maximum number of receipts'),
+                               cursor: Optional[str] = Query(alias='cursor', default=None,
+                                                             title='nextCursor of the previous page'),
+                               user: User = Depends(get_user_info)):
+    """
+    # GET Endpoint to search the receipts of the user, best matches first
+
+    :param request: General request information
+    :param db_session: database session
+    :param query: Search query
+    :param limit: Maximum number of receipts
+    :param cursor: Cursor of the previous page
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_search_receipts, request=request, db_session=db_session, user=user,
+                                 query=query, limit=limit, cursor=cursor)
+    return model_response(response)
@@ -0,0 +1,46 @@
+"""
+Shopping list endpoints
+"""
+
+from fastapi import APIRouter, Depends, status, Body
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
+
+from src.api.models.auth import User
+from src.api.models.shopping_list import ShoppingListCreate, ShoppingListResponse
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
+from src.service.shopping_list import serv_create_shopping_list
+from src.authentication.auth import get_user_info
+
+
+router = APIRouter(prefix="/api",
+                   dependencies=[Depends(get_user_info)])
+
+
+@router.post(
+    "/shopping-list",
+    tags=["shopping list"],
+    response_class=ORJSONResponse,
+    response_model=ShoppingListResponse,
+    description="Endpoint to combine the ingredients of several receipts into one shopping list",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_create_shopping_list(request: Request,
+                                    db_session: AnySession = Depends(get_db),
+                                    body: ShoppingListCreate = Body(alias='shoppingListCreate',
+                                                                    title='Shopping List Create Model'),
+                                    user: User = Depends(get_user_info)):
+    """
+    POST Endpoint to sum the ingredients of receipts with serving multipliers
+
+    :param body: API post model
+    :param request: General request information
+    :param db_session: database session
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_create_shopping_list, request=request, db_session=db_session, body=body,
+                                 user=user)
+    return model_response(response)
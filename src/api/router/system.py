@@ -5,7 +5,8 @@
 
 from fastapi import APIRouter, status
 
-from starlette.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.responses import JSONResponse, Response
 
 from src import settings
 
@@ -47,3 +48,16 @@ async def version() -> JSONResponse:
     return JSONResponse(
         status_code=status.HTTP_200_OK, content={"version": settings.FA_APP_VERSION}
     )
+
+
+@router.get(
+    "/metrics",
+    tags=["system"],
+    status_code=status.HTTP_200_OK,
+)
+async def metrics() -> Response:
+    """
+    Prometheus metrics of this worker process (e.g. database pool usage)
+    :return: Response with HTTP 200 status code and the metrics in the prometheus text format
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -3,12 +3,13 @@
 """
 
 from fastapi import APIRouter, Depends, status, Body, Path
-from sqlalchemy.orm import Session
 from uuid import UUID
-from starlette.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
 from starlette.requests import Request
 
-from src.database.database import get_db
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
 
 from src.api.models.tags import TagResponse, TagCreate
 from src.service.tags import serv_get_tag, serv_get_tags, serv_create_tag, serv_delete_tag
@@ -24,15 +25,15 @@ router = APIRouter(prefix="/api",
     "/tags",
     tags=["tags"],
     response_model=TagResponse,
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     description="Endpoint to create a tag",
     status_code=status.HTTP_201_CREATED,
     deprecated=False
 )
-def endp_create_tag(request: Request,
-                    db_session: Session = Depends(get_db),
-                    body: TagCreate = Body(alias='tagCreate',
-                                           title='Tag Create Model')):
+async def endp_create_tag(request: Request,
+                          db_session: AnySession = Depends(get_db),
+                          body: TagCreate = Body(alias='tagCreate',
+                                                 title='Tag Create Model')):
     """
     POST Endpoint to create a tag
 
@@ -41,19 +42,20 @@ def endp_create_tag(request: Request,
     :param body: API post model
     :return: API response model
     """
-    return serv_create_tag(request=request, db_session=db_session, body=body)
+    response = await run_service(serv_create_tag, request=request, db_session=db_session, body=body)
+    return model_response(response, status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
     "/tags",
     tags=["tags"],
     response_model=TagResponse,
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     description="Endpoint to get all tags",
     status_code=status.HTTP_200_OK,
     deprecated=False
 )
-def endp_get_tags(request: Request, db_session: Session = Depends(get_db)):
+async def endp_get_tags(request: Request, db_session: AnySession = Depends(get_db)):
     """
     GET Endpoint to fetch all tags
 
@@ -61,22 +63,23 @@ def endp_get_tags(request: Request, db_session: Session = Depends(get_db)):
     :param db_session: Database session
     :return: API response model
     """
-    return serv_get_tags(request=request, db_session=db_session)
+    response = await run_service(serv_get_tags, request=request, db_session=db_session)
+    return model_response(response)
 
 
 @router.get(
     "/tags/{uuid}",
     tags=["tags"],
     response_model=TagResponse,
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     description="Endpoint to get a tag by id",
     status_code=status.HTTP_200_OK,
     deprecated=False
 )
-def endp_get_tag(request: Request,
-                 db_session: Session = Depends(get_db),
-                 uuid: UUID = Path(alias='uuid',
-                                   title='UUID of tag')):
+async def endp_get_tag(request: Request,
+                       db_session: AnySession = Depends(get_db),
+                       uuid: UUID = Path(alias='uuid',
+                                         title='UUID of tag')):
     """
     GET Endpoint to fetch a tag by id
 
@@ -85,7 +88,8 @@ def endp_get_tag(request: Request,
     :param uuid: UUID of tag
     :return: API response model
     """
-    return serv_get_tag(request=request, db_session=db_session, tag_id=uuid)
+    response = await run_service(serv_get_tag, request=request, db_session=db_session, tag_id=uuid)
+    return model_response(response)
 
 
 @router.delete(
@@ -96,10 +100,10 @@ def endp_get_tag(request: Request,
     status_code=status.HTTP_204_NO_CONTENT,
     deprecated=False
 )
-def endp_delete_tag(request: Request,
-                    db_session: Session = Depends(get_db),
-                    uuid: UUID = Path(alias='uuid',
-                                      title='UUID of tag')):
+async def endp_delete_tag(request: Request,
+                          db_session: AnySession = Depends(get_db),
+                          uuid: UUID = Path(alias='uuid',
+                                            title='UUID of tag')):
     """
     DELETE Endpoint to delete a tag by id
 
@@ -108,4 +112,4 @@ def endp_delete_tag(request: Request,
     :param uuid: UUID of tag
     :return: HTTP Response
     """
-    return serv_delete_tag(request=request, db_session=db_session, tag_id=uuid)
+    return await run_service(serv_delete_tag, request=request, db_session=db_session, tag_id=uuid)
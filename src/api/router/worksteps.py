@@ -3,24 +3,30 @@ Workstep endpoints
 """
 
 from fastapi import APIRouter, Depends, status, Body, Path
-from sqlalchemy.orm import Session
-from starlette.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
 from starlette.requests import Request
+from typing import List
 from uuid import UUID
 
 from src.api.models.auth import User
 from src.authentication.auth import get_user_info
-from src.database.database import get_db
+from src.api.responses import model_response
+from src.database.database import AnySession, get_db, run_service
 from src.service.worksteps import (
     serv_get_worksteps_by_receipt,
     serv_update_workstep,
     serv_delete_workstep,
     serv_create_workstep,
     serv_get_workstep_by_id,
+    serv_move_workstep,
+    serv_replace_worksteps,
 )
 
 from src.api.models.worksteps import (WorkstepCreate,
                                       WorkstepUpdate,
+                                      WorkstepMove,
+                                      WorkstepBatchCreate,
                                       WorkstepResponse)
 
 router = APIRouter(prefix="/api",
@@ -30,17 +36,18 @@ router = APIRouter(prefix="/api",
 @router.post(
     "/worksteps",
     tags=["worksteps"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=WorkstepResponse,
-    description="Endpoint to create a workstep",
+    description="Endpoint to append a workstep to its receipt. orderNumber is a sort key with gaps (1024, 2048, ...), "
+                "not the position",
     status_code=status.HTTP_201_CREATED,
     deprecated=False,
 )
-def endp_create_workstep(request: Request,
-                         db_session: Session = Depends(get_db),
-                         body: WorkstepCreate = Body(alias='workstepCreate',
-                                                     title='Workstep Create Model'),
-                         user: User = Depends(get_user_info)):
+async def endp_create_workstep(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               body: WorkstepCreate = Body(alias='workstepCreate',
+                                                           title='Workstep Create Model'),
+                               user: User = Depends(get_user_info)):
     """
     # POST Endpoint to create workstep
 
@@ -50,23 +57,25 @@ def endp_create_workstep(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_create_workstep(request=request, db_session=db_session, body=body, user=user)
+    response = await run_service(serv_create_workstep, request=request, db_session=db_session, body=body, user=user)
+    return model_response(response, status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
     "/receipts/{receipt_id}/worksteps",
     tags=["worksteps"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=WorkstepResponse,
-    description="Endpoint to get worksteps by receipt",
+    description="Endpoint to get worksteps by receipt ordered by orderNumber, the position of a workstep is its index "
+                "in the list",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_get_worksteps_by_receipt(request: Request,
-                                  db_session: Session = Depends(get_db),
-                                  receipt_id: UUID = Path(alias='receipt_id',
-                                                          title='UUID of receipt'),
-                                  user: User = Depends(get_user_info)):
+async def endp_get_worksteps_by_receipt(request: Request,
+                                        db_session: AnySession = Depends(get_db),
+                                        receipt_id: UUID = Path(alias='receipt_id',
+                                                                title='UUID of receipt'),
+                                        user: User = Depends(get_user_info)):
     """
     # GET Endpoint to request all worksteps of a receipt
 
@@ -77,23 +86,57 @@ def endp_get_worksteps_by_receipt(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_get_worksteps_by_receipt(request=request, db_session=db_session, receipt_id=receipt_id, user=user)
+    response = await run_service(serv_get_worksteps_by_receipt, request=request, db_session=db_session,
+                                 receipt_id=receipt_id, user=user)
+    return model_response(response)
+
+
+@router.put(
+    "/receipts/{receipt_id}/worksteps",
+    tags=["worksteps"],
+    response_class=ORJSONResponse,
+    response_model=WorkstepResponse,
+    description="Endpoint to replace all worksteps of a receipt, the order is the order of the list (orderNumber is "
+                "ignored)",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_replace_worksteps(request: Request,
+                                 db_session: AnySession = Depends(get_db),
+                                 receipt_id: UUID = Path(alias='receipt_id',
+                                                         title='UUID of receipt'),
+                                 body: List[WorkstepBatchCreate] = Body(alias='workstepBatchCreate',
+                                                                        title='Workstep Create Models'),
+                                 user: User = Depends(get_user_info)):
+    """
+    # PUT Endpoint to replace all worksteps of a receipt in one transaction
+
+    :param receipt_id: UUID of receipt
+    :param request: General request information
+    :param db_session: database session
+    :param body: API models of the worksteps in their order
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_replace_worksteps, request=request, db_session=db_session,
+                                 receipt_id=receipt_id, body=body, user=user)
+    return model_response(response)
 
 
 @router.get(
     "/worksteps/{uuid}",
     tags=["worksteps"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=WorkstepResponse,
-    description="Endpoint to get a workstep by id",
+    description="Endpoint to get a workstep by id (orderNumber is a sort key, not the position)",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_get_workstep_by_id(request: Request,
-                            db_session: Session = Depends(get_db),
-                            uuid: UUID = Path(alias='uuid',
-                                              title='UUID of workstep'),
-                            user: User = Depends(get_user_info)):
+async def endp_get_workstep_by_id(request: Request,
+                                  db_session: AnySession = Depends(get_db),
+                                  uuid: UUID = Path(alias='uuid',
+                                                    title='UUID of workstep'),
+                                  user: User = Depends(get_user_info)):
     """
     # GET Endpoint to request a workstep by id
 
@@ -103,25 +146,26 @@ def endp_get_workstep_by_id(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_get_workstep_by_id(request=request, db_session=db_session, uuid=uuid, user=user)
+    response = await run_service(serv_get_workstep_by_id, request=request, db_session=db_session, uuid=uuid, user=user)
+    return model_response(response)
 
 
 @router.patch(
     "/worksteps/{uuid}",
     tags=["worksteps"],
-    response_class=JSONResponse,
+    response_class=ORJSONResponse,
     response_model=WorkstepResponse,
-    description="Endpoint to update Workstep",
+    description="Endpoint to update Workstep, orderNumber is ignored (see the move endpoint)",
     status_code=status.HTTP_200_OK,
     deprecated=False,
 )
-def endp_update_workstep(request: Request,
-                         db_session: Session = Depends(get_db),
-                         uuid: UUID = Path(alias='uuid',
-                                           title='UUID of workstep'),
-                         body: WorkstepUpdate = Body(alias='workstepUpdate',
-                                                     title='Workstep Patch Model'),
-                         user: User = Depends(get_user_info)):
+async def endp_update_workstep(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               uuid: UUID = Path(alias='uuid',
+                                                 title='UUID of workstep'),
+                               body: WorkstepUpdate = Body(alias='workstepUpdate',
+                                                           title='Workstep Patch Model'),
+                               user: User = Depends(get_user_info)):
     """
     # PATCH Endpoint to update an existing workstep
 
@@ -132,7 +176,41 @@ def endp_update_workstep(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_update_workstep(request=request, db_session=db_session, uuid=uuid, body=body, user=user)
+    response = await run_service(serv_update_workstep, request=request, db_session=db_session, uuid=uuid, body=body,
+                                 user=user)
+    return model_response(response)
+
+
+@router.post(
+    "/worksteps/{uuid}/move",
+    tags=["worksteps"],
+    response_class=ORJSONResponse,
+    response_model=WorkstepResponse,
+    description="Endpoint to move a workstep behind another workstep. Only the moved workstep gets a new orderNumber, "
+                "unless there is no gap left and all worksteps of the receipt are numbered again",
+    status_code=status.HTTP_200_OK,
+    deprecated=False,
+)
+async def endp_move_workstep(request: Request,
+                             db_session: AnySession = Depends(get_db),
+                             uuid: UUID = Path(alias='uuid',
+                                               title='UUID of workstep'),
+                             body: WorkstepMove = Body(alias='workstepMove',
+                                                       title='Workstep Move Model'),
+                             user: User = Depends(get_user_info)):
+    """
+    # POST Endpoint to move a workstep
+
+    :param uuid: UUID of workstep
+    :param request: General request information
+    :param db_session: database session
+    :param body: API move model
+    :param user: User information
+    :return: API response model
+    """
+    response = await run_service(serv_move_workstep, request=request, db_session=db_session, uuid=uuid, body=body,
+                                 user=user)
+    return model_response(response)
 
 
 @router.delete(
@@ -143,11 +221,11 @@ def endp_update_workstep(request: Request,
     status_code=status.HTTP_204_NO_CONTENT,
     deprecated=False,
 )
-def endp_delete_workstep(request: Request,
-                         db_session: Session = Depends(get_db),
-                         uuid: UUID = Path(alias='uuid',
-                                           title='UUID of workstep'),
-                         user: User = Depends(get_user_info)):
+async def endp_delete_workstep(request: Request,
+                               db_session: AnySession = Depends(get_db),
+                               uuid: UUID = Path(alias='uuid',
+                                                 title='UUID of workstep'),
+                               user: User = Depends(get_user_info)):
     """
     # DELETE Endpoint to remove workstep
 
@@ -157,4 +235,4 @@ def endp_delete_workstep(request: Request,
     :param user: User information
     :return: API response model
     """
-    return serv_delete_workstep(request=request, db_session=db_session, uuid=uuid, user=user)
+    return await run_service(serv_delete_workstep, request=request, db_session=db_session, uuid=uuid, user=user)
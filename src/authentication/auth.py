@@ -1,10 +1,13 @@
 #/auth.py
 from fastapi.security import OAuth2AuthorizationCodeBearer
 from keycloak import KeycloakOpenID
-from src.settings import keycloakConfig
+from src.settings import keycloakConfig, JWKS_CACHE_TTL, JWKS_REFRESH_MARGIN, JWKS_MIN_REFETCH_INTERVAL, TOKEN_CACHE_SIZE
 from fastapi import Security, HTTPException, status,Depends
 from pydantic import Json
+from starlette.concurrency import run_in_threadpool
 from src.api.models.auth import User
+from src.authentication.jwks import JWKSKeyStore, decode_token, read_token_kid
+from src.authentication.token_cache import VerifiedTokenCache
 
 # This is used for fastapi docs authentification
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
@@ -21,25 +24,28 @@ keycloak_openid = KeycloakOpenID(
     verify=True
 )
 
-async def get_idp_public_key():
-    return (
-        "-----BEGIN PUBLIC KEY-----\n"
-        f"{keycloak_openid.public_key()}"
-        "\n-----END PUBLIC KEY-----"
-    )
+# Signing keys of the realm, fetched once per process and refreshed before they expire
+signing_keys = JWKSKeyStore(
+    fetch_jwks=keycloak_openid.certs,
+    ttl=JWKS_CACHE_TTL,
+    refresh_margin=JWKS_REFRESH_MARGIN,
+    min_refetch_interval=JWKS_MIN_REFETCH_INTERVAL,
+)
+
+# Users of already verified tokens, entries expire with the token
+verified_tokens = VerifiedTokenCache(max_size=TOKEN_CACHE_SIZE)
 
 # Get the payload/token from keycloak
 async def get_payload(token: str = Security(oauth2_scheme)) -> dict:
     try:
-        return keycloak_openid.decode_token(
-            token,
-            key= await get_idp_public_key(),
-            options={
-                "verify_signature": True,
-                "verify_aud": False,
-                "exp": True
-            }
-        )
+        kid = read_token_kid(token)
+        key = signing_keys.get_cached_key(kid)
+        if key is None:
+            # Fetching the keys blocks, it must not stall the event loop
+            key = await run_in_threadpool(signing_keys.get_key, kid)
+
+        # signature and exp are validated, the audience is not checked
+        return decode_token(token, key=key)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,10 +53,16 @@ async def get_payload(token: str = Security(oauth2_scheme)) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-# Get user infos from the payload
-async def get_user_info(payload: dict = Depends(get_payload)) -> User:
+# Get user infos from the payload, tokens verified before are served from the cache
+async def get_user_info(token: str = Security(oauth2_scheme)) -> User:
+    user = verified_tokens.get(token)
+    if user is not None:
+        return user
+
+    payload = await get_payload(token)
+
     try:
-        return User(
+        user = User(
             id=payload.get("sub"),
             username=payload.get("preferred_username"),
             realm_roles=payload.get("realm_access", {}).get("roles", []),
@@ -62,3 +74,7 @@ async def get_user_info(payload: dict = Depends(get_payload)) -> User:
             detail=str(e), # "Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    verified_tokens.put(token, user, expires_at=payload.get("exp"))
+
+    return user
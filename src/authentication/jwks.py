@@ -0,0 +1,208 @@
+"""
+    Process-wide store for the signing keys (JWKS) of the identity provider
+"""
+import base64
+import json
+import logging
+import threading
+import time
+
+from typing import Callable, Dict, Optional, Sequence
+
+from jwcrypto import jwk, jwt
+
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownSigningKeyError(Exception):
+    """Raised if a token was signed with a key that the identity provider does not publish"""
+
+    def __init__(self, kid: Optional[str]):
+        super().__init__(f'Unknown signing key "{kid}"')
+        self.kid = kid
+
+
+def read_token_kid(token: str) -> Optional[str]:
+    """
+    Read the key id from the (unverified) header of a jwt
+
+    :param token: Encoded jwt
+    :return: Key id or None if the header does not contain one
+    """
+    header_segment = token.split('.', 1)[0]
+    header_segment += '=' * (-len(header_segment) % 4)
+    header: dict = json.loads(base64.urlsafe_b64decode(header_segment.encode('ascii')))
+
+    return header.get('kid')
+
+
+class JWKSKeyStore:
+    """
+    Caches the realm signing keys by kid
+
+    - keys are fetched once and kept for `ttl` seconds
+    - within `refresh_margin` seconds before expiry the keys are refreshed in a background thread
+    - an unknown kid triggers one refetch, refetches and retries after a failed fetch are started at most every
+      `min_refetch_interval` seconds, expired keys are served until a refresh succeeds
+    - all fetches are single-flight, concurrent callers wait for the running fetch instead of starting their own
+
+    `get_key` may block on a fetch, async callers use `get_cached_key` and run `get_key` in the thread pool if
+    it returns None.
+    """
+
+    def __init__(self,
+                 fetch_jwks: Callable[[], dict],
+                 ttl: float,
+                 refresh_margin: float,
+                 min_refetch_interval: float,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param fetch_jwks: Callable returning the JWKS document of the identity provider
+        :param ttl: Seconds until fetched keys expire
+        :param refresh_margin: Seconds before expiry in which a background refresh is started
+        :param min_refetch_interval: Minimum seconds between two fetches caused by unknown kids or errors
+        :param clock: Monotonic clock, can be replaced in tests
+        """
+        self._fetch_jwks = fetch_jwks
+        self._ttl = ttl
+        self._refresh_margin = refresh_margin
+        self._min_refetch_interval = min_refetch_interval
+        self._clock = clock
+
+        self._keys: Dict[Optional[str], jwk.JWK] = {}
+        # Last successful fetch (age of the keys) and last fetch attempt (successful or not)
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
+
+    def get_cached_key(self, kid: Optional[str]) -> Optional[jwk.JWK]:
+        """
+        Get the verification key for a kid without waiting for a fetch
+
+        Starts a background refresh if the keys expire soon.
+
+        :param kid: Key id from the token header
+        :return: Public key or None if the keys must be fetched first (call get_key then)
+        """
+        fetched_at = self._fetched_at
+        if fetched_at is None:
+            return None
+
+        age = self._clock() - fetched_at
+        if age >= self._ttl and self._refetch_allowed():
+            return None
+        if age >= self._ttl - self._refresh_margin and self._refetch_allowed():
+            self._refresh_in_background()
+
+        return self._lookup(kid)
+
+    def get_key(self, kid: Optional[str]) -> jwk.JWK:
+        """
+        Get the verification key for a kid, fetches the keys if necessary (blocking)
+
+        :param kid: Key id from the token header
+        :return: Public key of the identity provider
+        """
+        fetched_at = self._fetched_at
+
+        if fetched_at is None or (self._clock() - fetched_at >= self._ttl and self._refetch_allowed()):
+            self._refresh(seen_attempted_at=self._attempted_at)
+        elif self._clock() - fetched_at >= self._ttl - self._refresh_margin and self._refetch_allowed():
+            self._refresh_in_background()
+
+        key = self._lookup(kid)
+        if key is not None:
+            return key
+
+        if self._refetch_allowed():
+            # The realm keys may have been rotated since the last fetch
+            self._refresh(seen_attempted_at=self._attempted_at)
+            key = self._lookup(kid)
+
+        if key is None:
+            raise UnknownSigningKeyError(kid=kid)
+
+        return key
+
+    def clear(self):
+        """
+        Drop all cached keys, the next lookup fetches them again
+        """
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+            self._attempted_at = None
+
+    def _lookup(self, kid: Optional[str]) -> Optional[jwk.JWK]:
+        keys = self._keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+
+        return keys.get(kid)
+
+    def _refetch_allowed(self) -> bool:
+        attempted_at = self._attempted_at
+        return attempted_at is None or self._clock() - attempted_at >= self._min_refetch_interval
+
+    def _refresh(self, seen_attempted_at: Optional[float]):
+        with self._lock:
+            if self._attempted_at != seen_attempted_at and self._fetched_at is not None:
+                # Another caller refreshed the keys (or tried to) while we were waiting for the lock
+                return
+
+            self._attempted_at = self._clock()
+            try:
+                keys = self._load_keys()
+            except Exception as err:
+                if not self._keys:
+                    raise
+                # Keep serving the known keys, the next attempt follows after the refetch interval
+                logger.warning('Refreshing the signing keys failed: %s', err)
+                return
+
+            self._keys = keys
+            self._fetched_at = self._clock()
+
+    def _refresh_in_background(self):
+        if self._background_refresh is not None and self._background_refresh.is_alive():
+            return
+
+        self._background_refresh = threading.Thread(target=self._refresh,
+                                                     kwargs={'seen_attempted_at': self._attempted_at},
+                                                     name='jwks-refresh',
+                                                     daemon=True)
+        self._background_refresh.start()
+
+    def _load_keys(self) -> Dict[Optional[str], jwk.JWK]:
+        jwks: dict = self._fetch_jwks()
+
+        keys: Dict[Optional[str], jwk.JWK] = {}
+        for key_data in jwks.get('keys', []):
+            if key_data.get('use', 'sig') != 'sig':
+                continue
+            keys[key_data.get('kid')] = jwk.JWK(**key_data)
+
+        return keys
+
+
+def decode_token(token: str, key: jwk.JWK, algorithms: Sequence[str] = ('RS256',)) -> dict:
+    """
+    Verify the signature and the expiry of a jwt and return its claims
+
+    The token must contain an exp claim, nbf is checked if present. The audience is not checked.
+
+    :param token: Encoded jwt
+    :param key: Public key from the JWKS of the identity provider
+    :param algorithms: Accepted signature algorithms
+    :return: Claims of the token
+    """
+    verified = jwt.JWT(jwt=token, key=key, algs=list(algorithms), check_claims={'exp': None})
+    claims: dict = json.loads(verified.claims)
+
+    nbf = claims.get('nbf')
+    if nbf is not None and nbf > time.time() + verified.leeway:
+        raise jwt.JWTNotYetValid(f'Token is valid from {nbf}')
+
+    return claims
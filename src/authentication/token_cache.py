@@ -0,0 +1,97 @@
+"""
+    Bounded cache of already verified bearer tokens
+"""
+import hashlib
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from src.api.models.auth import User
+
+
+TOKEN_CACHE_HITS = Counter('auth_token_cache_hits_total', 'Requests authenticated by an already verified token')
+TOKEN_CACHE_MISSES = Counter('auth_token_cache_misses_total',
+                             'Requests whose token was not cached (or expired) and had to be verified')
+TOKEN_CACHE_ENTRIES = Gauge('auth_token_cache_entries', 'Verified tokens currently cached')
+
+
+class VerifiedTokenCache:
+    """
+    LRU cache mapping the digest of a verified token to the user built from its payload
+
+    Entries expire at the exp claim of the token, tokens without exp are not cached.
+    """
+
+    def __init__(self, max_size: int, clock: Callable[[], float] = time.time):
+        """
+        :param max_size: Maximum number of cached tokens, 0 disables the cache
+        :param clock: Wall clock returning unix timestamps, can be replaced in tests
+        """
+        self._max_size = max_size
+        self._clock = clock
+        self._entries: OrderedDict[bytes, Tuple[User, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        TOKEN_CACHE_ENTRIES.set_function(lambda: len(self._entries))
+
+    def get(self, token: str) -> Optional[User]:
+        """
+        Get the user of a token that was verified before
+
+        :param token: Encoded jwt
+        :return: User information or None if the token is not cached or expired
+        """
+        digest = self._digest(token)
+
+        with self._lock:
+            entry = self._entries.get(digest)
+
+            if entry is None:
+                TOKEN_CACHE_MISSES.inc()
+                return None
+
+            user, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[digest]
+                TOKEN_CACHE_MISSES.inc()
+                return None
+
+            self._entries.move_to_end(digest)
+            TOKEN_CACHE_HITS.inc()
+
+            return user
+
+    def put(self, token: str, user: User, expires_at: Optional[float]):
+        """
+        Store the user of a verified token until the token expires
+
+        :param token: Encoded jwt
+        :param user: User information built from the token payload
+        :param expires_at: exp claim of the token
+        """
+        if self._max_size <= 0 or expires_at is None or expires_at <= self._clock():
+            return
+
+        digest = self._digest(token)
+
+        with self._lock:
+            self._entries[digest] = (user, float(expires_at))
+            self._entries.move_to_end(digest)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all cached tokens
+        """
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
@@ -0,0 +1,97 @@
+"""
+	Frequencies of ingredient names and tags for the autocomplete
+"""
+from sqlalchemy.orm.session import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select, func
+
+from starlette import status
+from starlette.exceptions import HTTPException
+
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from src.database.models.ingredients import IngredientDB
+from src.database.models.receipts import ReceiptDB
+from src.database.models.tags import TagDB
+from src.database.models.receipt_tag_link import ReceiptTagLinkDB
+# Related models have to be registered for the relationships of ReceiptDB
+from src.database.models.worksteps import WorkstepDB
+
+
+def read_ingredient_frequencies(db_session: Session,
+                                user_id: UUID,
+                                prefix: Optional[str] = None,
+                                limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    read the ingredient names of the receipts of a user with the number of uses, case insensitive
+
+    Names that differ only in case are counted together and returned in their most used spelling. With a prefix
+    the names are matched with the pattern index on lower(ingredient).
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :param prefix: Only names starting with the prefix (case insensitive)
+    :param limit: Maximum number of names, most used first
+    :return: (ingredient name, number of uses)
+    """
+    name = func.lower(IngredientDB.ingredient)
+    frequency = func.count().label('frequency')
+
+    statement = (select(func.mode().within_group(IngredientDB.ingredient), frequency)
+                 .join(ReceiptDB, ReceiptDB.id == IngredientDB.receipt_id)
+                 .where(ReceiptDB.user_id == user_id)
+                 .group_by(name))
+
+    if prefix is not None:
+        statement = statement.where(name.like(_prefix_pattern(prefix.lower()), escape='/'))
+    if limit is not None:
+        statement = statement.order_by(frequency.desc(), name).limit(limit)
+
+    try:
+        return [(ingredient, count) for ingredient, count in db_session.execute(statement).all()]
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_tag_frequencies(db_session: Session,
+                         prefix: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    read the tags with the number of linked receipts
+
+    :param db_session: Database session
+    :param prefix: Only tags starting with the prefix (upper case)
+    :param limit: Maximum number of tags, most linked first
+    :return: (tag name, number of receipts)
+    """
+    frequency = func.count(ReceiptTagLinkDB.receipt_id).label('frequency')
+
+    statement = (select(TagDB.tag, frequency)
+                 .outerjoin(ReceiptTagLinkDB, ReceiptTagLinkDB.tag_id == TagDB.id)
+                 .group_by(TagDB.id))
+
+    if prefix is not None:
+        statement = statement.where(TagDB.tag.like(_prefix_pattern(prefix.upper()), escape='/'))
+    if limit is not None:
+        statement = statement.order_by(frequency.desc(), TagDB.tag).limit(limit)
+
+    try:
+        return [(tag, count) for tag, count in db_session.execute(statement).all()]
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def _prefix_pattern(prefix: str) -> str:
+    """
+    LIKE pattern of the values starting with a prefix (escape character /)
+
+    The pattern is a complete parameter instead of prefix || '%', so the planner can use the pattern indexes
+    with prepared statements as well.
+
+    :param prefix: Prefix
+    :return: Pattern
+    """
+    return prefix.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
@@ -3,13 +3,14 @@
 """
 from sqlalchemy.orm.session import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, literal, func, distinct, Float, VARCHAR
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as UUID_DB
 
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from typing import List
-from uuid import UUID
+from typing import Dict, List, Tuple
+from uuid import UUID, uuid4
 
 from src.database.models.ingredients import IngredientDB
 from src.database.database import save_entity_to_db, remove_entity_from_db
@@ -29,6 +30,63 @@ def save_ingredient(db_session: Session, db_ingredient: IngredientDB) -> Ingredi
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
 
+def create_ingredients(db_session: Session, receipt_id: UUID, ingredients: List[dict]) -> List[IngredientDB]:
+    """
+    Inserts ingredients of a receipt with multi-row INSERT ... RETURNING statements
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param ingredients: Column values (amount, unit, ingredient) per ingredient
+    :return: List of database objects in the order of the input
+    """
+    if not ingredients:
+        return []
+
+    try:
+        return db_session.scalars(insert(IngredientDB).returning(IngredientDB, sort_by_parameter_order=True),
+                                  [{**ingredient, 'id': uuid4(), 'receipt_id': receipt_id}
+                                   for ingredient in ingredients]).all()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def update_ingredients(db_session: Session, ingredients: List[dict]):
+    """
+    Updates ingredients by primary key with one executemany UPDATE
+
+    :param db_session: Database session
+    :param ingredients: Changed column values per ingredient, including the id
+    """
+    if not ingredients:
+        return
+
+    try:
+        db_session.execute(update(IngredientDB), ingredients)
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def delete_ingredients(db_session: Session, ingredient_ids: List[UUID]):
+    """
+    Removes ingredients by id with one DELETE
+
+    :param db_session: Database session
+    :param ingredient_ids: UUIDs of ingredients
+    """
+    if not ingredient_ids:
+        return
+
+    try:
+        db_session.execute(delete(IngredientDB)
+                           .where(IngredientDB.id.in_(ingredient_ids))
+                           .execution_options(synchronize_session=False))
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
 def read_ingredients(db_session: Session) -> List[IngredientDB]:
     """
     Read all ingredients in database
@@ -90,3 +148,49 @@ def delete_ingredient(db_session: Session, db_ingredient: IngredientDB):
     except SQLAlchemyError:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
+
+
+def read_ingredient_totals(db_session: Session,
+                           servings: Dict[UUID, float],
+                           units: List[Tuple[str, str, float]]) -> List[Tuple[str, str, float, int]]:
+    """
+    Sum the ingredients of several receipts per ingredient name and unit family, in one statement
+
+    The servings and the unit conversions are passed as arrays and joined with unnest (the statement text does not
+    depend on the number of receipts and is compiled once), the amounts are multiplied and summed by the database.
+    Names are compared case insensitive with collapsed whitespace, units without a conversion form a family of
+    their own.
+
+    :param db_session: Database session
+    :param servings: Serving multiplier by receipt id
+    :param units: (unit, base unit of the family, factor to the base unit), units in lower case
+    :return: (most used spelling of the name, unit, summed amount, number of receipts) ordered by name
+    """
+    if not servings:
+        return []
+
+    receipt_servings = (func.unnest(literal(list(servings), ARRAY(UUID_DB)),
+                                    literal(list(servings.values()), ARRAY(Float)))
+                        .table_valued('receipt_id', 'servings').render_derived(name='receipt_servings'))
+    conversions = (func.unnest(literal([unit for unit, _, _ in units], ARRAY(VARCHAR)),
+                               literal([base_unit for _, base_unit, _ in units], ARRAY(VARCHAR)),
+                               literal([factor for _, _, factor in units], ARRAY(Float)))
+                   .table_valued('unit', 'base_unit', 'factor').render_derived(name='unit_conversions'))
+
+    name = func.lower(func.regexp_replace(func.trim(IngredientDB.ingredient), r'\s+', ' ', 'g'))
+    unit = func.lower(func.trim(IngredientDB.unit))
+    base_unit = func.coalesce(conversions.c.base_unit, unit)
+
+    try:
+        return (db_session.execute(select(func.mode().within_group(func.trim(IngredientDB.ingredient)),
+                                          base_unit,
+                                          func.sum(IngredientDB.amount * receipt_servings.c.servings
+                                                   * func.coalesce(conversions.c.factor, 1.0)),
+                                          func.count(distinct(IngredientDB.receipt_id)))
+                                   .join(receipt_servings, receipt_servings.c.receipt_id == IngredientDB.receipt_id)
+                                   .outerjoin(conversions, conversions.c.unit == unit)
+                                   .group_by(name, base_unit)
+                                   .order_by(name, base_unit)).tuples().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
@@ -1,14 +1,15 @@
 from sqlalchemy.orm.session import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete
 
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from typing import List
+from typing import Dict, Iterable, List
 from uuid import UUID
 
 from src.database.models.receipt_tag_link import ReceiptTagLinkDB
+from src.database.models.tags import TagDB
 from src.database.database import save_entity_to_db, remove_entity_from_db
 
 def save_receipt_tag_link(db_session: Session, db_link: ReceiptTagLinkDB) -> ReceiptTagLinkDB:
@@ -39,6 +40,46 @@ def delete_receipt_tag_link(db_session: Session, db_link: ReceiptTagLinkDB):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
 
+def create_receipt_tag_links(db_session: Session, receipt_id: UUID, tag_ids: List[UUID]):
+    """
+    links tags to a receipt with a multi-row INSERT
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param tag_ids: UUIDs of tags
+    """
+    if not tag_ids:
+        return
+
+    try:
+        db_session.execute(insert(ReceiptTagLinkDB), [{'receipt_id': receipt_id, 'tag_id': tag_id}
+                                                      for tag_id in tag_ids])
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def delete_receipt_tag_links(db_session: Session, receipt_id: UUID, tag_ids: List[UUID]):
+    """
+    unlinks tags from a receipt with one DELETE
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param tag_ids: UUIDs of tags
+    """
+    if not tag_ids:
+        return
+
+    try:
+        db_session.execute(delete(ReceiptTagLinkDB)
+                           .where(ReceiptTagLinkDB.receipt_id == receipt_id,
+                                  ReceiptTagLinkDB.tag_id.in_(tag_ids))
+                           .execution_options(synchronize_session=False))
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
 def read_receipt_tag_link(db_session: Session, receipt_id: UUID, tag_id: UUID) -> ReceiptTagLinkDB:
     """
     Read a receipt tag link by given ids
@@ -88,3 +129,51 @@ def read_receipts_by_link(db_session: Session, tag_id: UUID) -> List[ReceiptTagL
 
     except SQLAlchemyError as err:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_tags_by_receipt(db_session: Session, receipt_id: UUID) -> List[TagDB]:
+    """
+    Read all tags linked to a receipt with one joined query
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :return: List of database objects
+    """
+    try:
+        return (db_session.execute(select(TagDB)
+                                   .join(ReceiptTagLinkDB, ReceiptTagLinkDB.tag_id == TagDB.id)
+                                   .where(ReceiptTagLinkDB.receipt_id == receipt_id)
+                                   .order_by(TagDB.tag))
+                .scalars().all())
+
+    except SQLAlchemyError as err:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_tags_by_receipts(db_session: Session, receipt_ids: Iterable[UUID]) -> Dict[UUID, List[TagDB]]:
+    """
+    Read the tags of many receipts with one joined query
+
+    :param db_session: Database session
+    :param receipt_ids: UUIDs of receipts
+    :return: Database objects by receipt id, receipts without tags map to an empty list
+    """
+    receipt_ids = list(receipt_ids)
+    tags_by_receipt: Dict[UUID, List[TagDB]] = {receipt_id: [] for receipt_id in receipt_ids}
+
+    if not receipt_ids:
+        return tags_by_receipt
+
+    try:
+        rows = db_session.execute(select(ReceiptTagLinkDB.receipt_id, TagDB)
+                                  .join(TagDB, ReceiptTagLinkDB.tag_id == TagDB.id)
+                                  .where(ReceiptTagLinkDB.receipt_id.in_(receipt_ids))
+                                  .order_by(TagDB.tag)).all()
+
+    except SQLAlchemyError as err:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+    for receipt_id, db_tag in rows:
+        tags_by_receipt[receipt_id].append(db_tag)
+
+    return tags_by_receipt
@@ -3,16 +3,23 @@
 """
 from sqlalchemy.orm.session import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
-from sqlalchemy import select
+from sqlalchemy import select, exists, tuple_, func, literal, delete
+from sqlalchemy.orm import selectinload, aliased
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from src.database.models.receipts import ReceiptDB
-from src.database.database import save_entity_to_db, remove_entity_from_db
+# Related models have to be registered for the relationships of ReceiptDB
+from src.database.models.ingredients import IngredientDB
+from src.database.models.worksteps import WorkstepDB
+from src.database.models.tags import TagDB
+from src.database.models.receipt_tag_link import ReceiptTagLinkDB
+from src.database.database import save_entity_to_db
 
 
 def save_receipt(db_session: Session, db_receipt: ReceiptDB) -> ReceiptDB:
@@ -44,17 +51,264 @@ def read_receipts(db_session: Session, user_id: UUID) -> List[ReceiptDB]:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
 
-def read_receipt(db_session: Session, uuid: UUID) -> ReceiptDB:
+def read_receipts_page(db_session: Session,
+                       user_id: UUID,
+                       limit: int,
+                       sort_column: str = 'title',
+                       descending: bool = False,
+                       after: Optional[Tuple[Any, UUID]] = None,
+                       title_prefix: Optional[str] = None,
+                       tag: Optional[str] = None,
+                       tags: Optional[List[str]] = None,
+                       match_all: bool = True) -> List[ReceiptDB]:
+    """
+    read one page of the receipts of a user (keyset pagination)
+
+    The rows are ordered by (sort_column, id) and continue after the given key, so every page is an index
+    range scan on (user_id, sort_column, id) no matter how deep the client pages.
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :param limit: Maximum number of rows
+    :param sort_column: Column to sort by ('title' or 'created_at')
+    :param descending: Sort descending instead of ascending
+    :param after: (sort value, id) of the last row of the previous page
+    :param title_prefix: Only receipts whose title starts with the prefix
+    :param tag: Only receipts linked to this tag
+    :param tags: Only receipts linked to all (match_all) or any of these tags, names have to be distinct
+    :param match_all: Receipts need all tags instead of one of them
+    :return: List of database objects
+    """
+    sort_key = getattr(ReceiptDB, sort_column)
+
+    query = select(ReceiptDB).where(ReceiptDB.user_id == user_id)
+
+    if after is not None:
+        if descending:
+            query = query.where(tuple_(sort_key, ReceiptDB.id) < tuple_(*after))
+        else:
+            query = query.where(tuple_(sort_key, ReceiptDB.id) > tuple_(*after))
+
+    if title_prefix:
+        query = query.where(ReceiptDB.title.startswith(title_prefix, autoescape=True))
+
+    if tag:
+        query = query.where(exists()
+                            .where(ReceiptTagLinkDB.receipt_id == ReceiptDB.id,
+                                   ReceiptTagLinkDB.tag_id == TagDB.id,
+                                   TagDB.tag == tag))
+
+    if tags:
+        # Tags are shared by all users, the links are joined to the receipts of the user before they are grouped.
+        # A receipt has all tags if it has a link per tag.
+        tagged_receipt = aliased(ReceiptDB)
+        tagged = (select(ReceiptTagLinkDB.receipt_id)
+                  .join(TagDB, TagDB.id == ReceiptTagLinkDB.tag_id)
+                  .join(tagged_receipt, tagged_receipt.id == ReceiptTagLinkDB.receipt_id)
+                  .where(TagDB.tag.in_(tags),
+                         tagged_receipt.user_id == user_id))
+        if match_all:
+            tagged = tagged.group_by(ReceiptTagLinkDB.receipt_id).having(func.count() == len(tags))
+
+        query = query.where(ReceiptDB.id.in_(tagged))
+
+    if descending:
+        query = query.order_by(sort_key.desc(), ReceiptDB.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), ReceiptDB.id.asc())
+
+    try:
+        return db_session.execute(query.limit(limit)).scalars().all()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipt_owners(db_session: Session, receipt_ids: List[UUID]) -> Dict[UUID, UUID]:
+    """
+    read the owners of receipts
+
+    :param db_session: Database session
+    :param receipt_ids: UUIDs of receipts
+    :return: User id by receipt id, unknown receipts are missing
+    """
+    try:
+        return dict(db_session.execute(select(ReceiptDB.id, ReceiptDB.user_id)
+                                       .where(ReceiptDB.id.in_(receipt_ids))).tuples().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipt_ids_by_tag(db_session: Session, user_id: UUID, tag: str) -> List[UUID]:
+    """
+    read the ids of the receipts of a user linked to a tag, ordered by title
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :param tag: Tag name
+    :return: List of receipt ids
+    """
+    try:
+        return (db_session.execute(select(ReceiptDB.id)
+                                   .where(ReceiptDB.user_id == user_id,
+                                          exists()
+                                          .where(ReceiptTagLinkDB.receipt_id == ReceiptDB.id,
+                                                 ReceiptTagLinkDB.tag_id == TagDB.id,
+                                                 TagDB.tag == tag))
+                                   .order_by(ReceiptDB.title, ReceiptDB.id)).scalars().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipts_with_children(db_session: Session, receipt_ids: List[UUID]) -> List[ReceiptDB]:
+    """
+    read receipts together with their ingredients and worksteps
+
+    Three statements for any number of receipts: the receipts and one selectin load per relationship.
+
+    :param db_session: Database session
+    :param receipt_ids: UUIDs of receipts
+    :return: List of database objects with loaded relationships (unordered)
+    """
+    try:
+        return (db_session.execute(select(ReceiptDB)
+                                   .where(ReceiptDB.id.in_(receipt_ids))
+                                   .options(selectinload(ReceiptDB.ingredients),
+                                            selectinload(ReceiptDB.worksteps))).scalars().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_user_receipts_with_children(db_session: Session, user_id: UUID) -> List[ReceiptDB]:
+    """
+    read all receipts of a user together with their ingredients and worksteps
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :return: List of database objects with loaded relationships
+    """
+    try:
+        return (db_session.execute(select(ReceiptDB)
+                                   .where(ReceiptDB.user_id == user_id)
+                                   .options(selectinload(ReceiptDB.ingredients),
+                                            selectinload(ReceiptDB.worksteps))).scalars().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipts_by_ids(db_session: Session, receipt_ids: List[UUID]) -> List[ReceiptDB]:
+    """
+    read receipts by id
+
+    :param db_session: Database session
+    :param receipt_ids: UUIDs of receipts
+    :return: List of database objects (unordered), unknown receipts are missing
+    """
+    if not receipt_ids:
+        return []
+
+    try:
+        return db_session.execute(select(ReceiptDB).where(ReceiptDB.id.in_(receipt_ids))).scalars().all()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_user_ingredient_names(db_session: Session, user_id: UUID) -> List[Tuple[UUID, str]]:
+    """
+    read the ingredient names of all receipts of a user
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :return: (receipt id, ingredient name) per ingredient
+    """
+    try:
+        return (db_session.execute(select(IngredientDB.receipt_id, IngredientDB.ingredient)
+                                   .join(ReceiptDB, ReceiptDB.id == IngredientDB.receipt_id)
+                                   .where(ReceiptDB.user_id == user_id)).tuples().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipt(db_session: Session, uuid: UUID, for_update: bool = False) -> ReceiptDB:
     """
     read a receipt by id
 
     :param db_session: Database session
     :param uuid: UUID of receipt
+    :param for_update: Lock the receipt row until the end of the transaction (SELECT ... FOR UPDATE)
     :return: Database object
     """
+    query = select(ReceiptDB).where(ReceiptDB.id == uuid)
+    if for_update:
+        query = query.with_for_update()
+
+    try:
+        return db_session.execute(query).scalars().one()
+
+    except NoResultFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Receipt with id "{uuid}" not found')
+    except SQLAlchemyError as err:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipt_full(db_session: Session, uuid: UUID) -> ReceiptDB:
+    """
+    read a receipt by id together with its ingredients, worksteps and tags
+
+    The children are loaded with one batched select per relationship (selectin loading). Already loaded objects
+    are overwritten, bulk statements of the same transaction may have changed the rows.
+
+    :param db_session: Database session
+    :param uuid: UUID of receipt
+    :return: Database object with loaded relationships
+    """
     try:
         return (db_session.execute(select(ReceiptDB)
-                                   .where(ReceiptDB.id == uuid)).scalars().one())
+                                   .where(ReceiptDB.id == uuid)
+                                   .options(selectinload(ReceiptDB.ingredients),
+                                            selectinload(ReceiptDB.worksteps),
+                                            selectinload(ReceiptDB.tags))
+                                   .execution_options(populate_existing=True)).scalars().one())
+
+    except NoResultFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Receipt with id "{uuid}" not found')
+    except SQLAlchemyError as err:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_receipt_content_digest(db_session: Session, uuid: UUID) -> Tuple[UUID, str]:
+    """
+    read the owner of a receipt and a md5 digest over the receipt, its ingredients and worksteps
+
+    The digest changes with every change of a printed column and is computed in one statement by the database.
+
+    :param db_session: Database session
+    :param uuid: UUID of receipt
+    :return: User id of the owner and content digest
+    """
+    ingredients = (select(func.string_agg(func.concat_ws('\x1f', IngredientDB.amount, IngredientDB.unit,
+                                                         IngredientDB.ingredient),
+                                          aggregate_order_by(literal('\x1e'), IngredientDB.id)))
+                   .where(IngredientDB.receipt_id == ReceiptDB.id)
+                   .scalar_subquery())
+    worksteps = (select(func.string_agg(func.concat_ws('\x1f', WorkstepDB.order_number, WorkstepDB.workstep),
+                                        aggregate_order_by(literal('\x1e'), WorkstepDB.order_number,
+                                                           WorkstepDB.id)))
+                 .where(WorkstepDB.receipt_id == ReceiptDB.id)
+                 .scalar_subquery())
+    try:
+        return (db_session.execute(select(ReceiptDB.user_id,
+                                          func.md5(func.concat_ws('\x1d', ReceiptDB.title,
+                                                                  func.coalesce(ReceiptDB.description, ''),
+                                                                  func.coalesce(ingredients, ''),
+                                                                  func.coalesce(worksteps, ''))))
+                                   .where(ReceiptDB.id == uuid)).one().tuple())
 
     except NoResultFound:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Receipt with id "{uuid}" not found')
@@ -62,15 +316,32 @@ def read_receipt(db_session: Session, uuid: UUID) -> ReceiptDB:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
 
-def delete_receipt(db_session: Session, db_receipt: ReceiptDB):
+def delete_receipts(db_session: Session, receipt_ids: List[UUID]) -> List[Tuple[UUID, str]]:
     """
-    delete a receipt entity from database
+    delete receipts together with their ingredients, worksteps and tag links
+
+    Two statements for any number of receipts: the tag links are deleted first to return their tags, the
+    ingredients and worksteps are removed by the foreign keys (ON DELETE CASCADE) of the receipt delete.
 
     :param db_session: Database session
-    :param db_receipt: Database object
+    :param receipt_ids: UUIDs of receipts
+    :return: (UUID, name) of the tag of every deleted link
     """
+    if not receipt_ids:
+        return []
+
     try:
-        remove_entity_from_db(db_session=db_session, entity=db_receipt)
+        tag_name = select(TagDB.tag).where(TagDB.id == ReceiptTagLinkDB.tag_id).scalar_subquery()
+        unlinked_tags = (db_session.execute(delete(ReceiptTagLinkDB)
+                                            .where(ReceiptTagLinkDB.receipt_id.in_(receipt_ids))
+                                            .returning(ReceiptTagLinkDB.tag_id, tag_name)
+                                            .execution_options(synchronize_session=False)).all())
+
+        db_session.execute(delete(ReceiptDB)
+                           .where(ReceiptDB.id.in_(receipt_ids))
+                           .execution_options(synchronize_session=False))
+
+        return [(tag_id, tag) for tag_id, tag in unlinked_tags]
 
     except SQLAlchemyError:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
@@ -0,0 +1,74 @@
+"""
+	Full text search of receipts
+"""
+from sqlalchemy.orm.session import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select, func, literal_column, cast, Float, or_, and_
+
+from starlette import status
+from starlette.exceptions import HTTPException
+
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from src.database.models.receipts import ReceiptDB
+# Related models have to be registered for the relationships of ReceiptDB
+from src.database.models.ingredients import IngredientDB
+from src.database.models.worksteps import WorkstepDB
+from src.database.models.tags import TagDB
+from src.database.models.receipt_tag_link import ReceiptTagLinkDB
+
+
+# Text search configuration of receipts.search_vector (migrations/007_receipts_search_vector.sql)
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+# Up to two fragments of the receipt text with the matched words marked
+HEADLINE_OPTIONS = 'StartSel=<b>, StopSel=</b>, MaxWords=20, MinWords=5, MaxFragments=2, FragmentDelimiter=" ... "'
+
+
+def search_receipts(db_session: Session,
+                    user_id: UUID,
+                    query: str,
+                    limit: int,
+                    after: Optional[Tuple[float, UUID]] = None) -> List[Tuple[ReceiptDB, float, str]]:
+    """
+    search the receipts of a user, ordered by rank (keyset pagination)
+
+    The query is parsed with websearch_to_tsquery (words, "phrases", OR, -word) and matched against the GIN indexed
+    search vector of the receipts. Headlines are only generated for the rows of the page.
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :param query: Search query
+    :param limit: Maximum number of rows
+    :param after: (rank, id) of the last row of the previous page
+    :return: Database objects with rank and headline
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    # Double precision, the rank of the cursor is compared exactly
+    rank = cast(func.ts_rank(ReceiptDB.search_vector, ts_query), Float)
+
+    page = (select(ReceiptDB.id, rank.label('rank'))
+            .where(ReceiptDB.user_id == user_id,
+                   ReceiptDB.search_vector.op('@@')(ts_query)))
+    if after is not None:
+        page = page.where(or_(rank < after[0],
+                              and_(rank == after[0], ReceiptDB.id > after[1])))
+    page = page.order_by(rank.desc(), ReceiptDB.id.asc()).limit(limit).subquery()
+
+    ingredients = (select(func.string_agg(IngredientDB.ingredient, ' '))
+                   .where(IngredientDB.receipt_id == ReceiptDB.id)
+                   .scalar_subquery())
+    worksteps = (select(func.string_agg(WorkstepDB.workstep, ' '))
+                 .where(WorkstepDB.receipt_id == ReceiptDB.id)
+                 .scalar_subquery())
+    document = func.concat_ws(' ', ReceiptDB.title, ReceiptDB.description, ingredients, worksteps)
+
+    try:
+        return (db_session.execute(select(ReceiptDB,
+                                          page.c.rank,
+                                          func.ts_headline(SEARCH_CONFIG, document, ts_query, HEADLINE_OPTIONS))
+                                   .join(page, page.c.id == ReceiptDB.id)
+                                   .order_by(page.c.rank.desc(), ReceiptDB.id.asc())).tuples().all())
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
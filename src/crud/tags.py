@@ -3,18 +3,23 @@
 """
 from sqlalchemy.orm.session import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
-from sqlalchemy import select
+from sqlalchemy import select, delete, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from starlette import status
 from starlette.exceptions import HTTPException
 
 from typing import List
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from src.database.models.tags import TagDB
+from src.database.models.receipt_tag_link import ReceiptTagLinkDB
 from src.database.database import save_entity_to_db, remove_entity_from_db
 
 
+# Rounds of get_or_create_tags, a round only repeats for tags deleted concurrently
+GET_OR_CREATE_ATTEMPTS = 3
+
 def save_tag(db_session: Session, db_tag: TagDB) -> TagDB:
     """
     saves a new tag
@@ -29,6 +34,75 @@ def save_tag(db_session: Session, db_tag: TagDB) -> TagDB:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
 
+def read_tags_by_names(db_session: Session, tags: List[str], lock: bool = False) -> List[TagDB]:
+    """
+    read tags by their names
+
+    :param db_session: Database session
+    :param tags: Tag names
+    :param lock: Lock the tags FOR KEY SHARE until the end of the transaction, they can not be deleted meanwhile
+    :return: List of database objects
+    """
+    if not tags:
+        return []
+
+    statement = select(TagDB).where(TagDB.tag.in_(tags)).order_by(TagDB.id)
+    if lock:
+        statement = statement.with_for_update(key_share=True)
+
+    try:
+        return db_session.execute(statement).scalars().all()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def get_or_create_tags(db_session: Session, tags: List[str]) -> List[TagDB]:
+    """
+    get tags by name, missing tags are created
+
+    The tags are inserted with INSERT ... ON CONFLICT DO NOTHING RETURNING, names that already exist (or were
+    inserted by a concurrent transaction) are read with a second statement. The unique constraint on the name
+    makes sure every tag exists once.
+
+    Existing tags are locked FOR KEY SHARE, a concurrent delete_unused_tags can not remove them before the caller
+    links them. Tags deleted between the insert and the read are inserted again.
+
+    :param db_session: Database session
+    :param tags: Tag names (normalized, upper case)
+    :return: List of database objects ordered by name
+    """
+    tag_names = sorted(set(tags))
+    db_tags: List[TagDB] = []
+
+    for _ in range(GET_OR_CREATE_ATTEMPTS):
+        if not tag_names:
+            return sorted(db_tags, key=lambda db_tag: db_tag.tag)
+
+        try:
+            created_tags: List[TagDB] = (db_session.scalars(pg_insert(TagDB)
+                                                            .values([{'id': uuid4(), 'tag': tag} for tag in tag_names])
+                                                            .on_conflict_do_nothing(index_elements=[TagDB.tag])
+                                                            .returning(TagDB)).all())
+
+        except SQLAlchemyError:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+        created = {db_tag.tag for db_tag in created_tags}
+        existing_tags = read_tags_by_names(db_session=db_session, tags=[tag for tag in tag_names if tag not in created],
+                                           lock=True)
+
+        db_tags.extend(created_tags)
+        db_tags.extend(existing_tags)
+        found = created | {db_tag.tag for db_tag in existing_tags}
+        tag_names = [tag for tag in tag_names if tag not in found]
+
+    if tag_names:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+    return sorted(db_tags, key=lambda db_tag: db_tag.tag)
+
+
 def read_tags(db_session: Session) -> List[TagDB]:
     """
     read all tags in database
@@ -73,3 +147,30 @@ def delete_tag(db_session: Session, db_tag: TagDB):
 
     except SQLAlchemyError as err:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def delete_unused_tags(db_session: Session, tag_ids: List[UUID]):
+    """
+    delete the tags of the given ones that are not linked to any receipt, with one DELETE
+
+    Tags locked by a concurrent transaction (get_or_create_tags, a link insert) are about to be linked, they are
+    skipped instead of waiting for the lock.
+
+    :param db_session: Database session
+    :param tag_ids: UUIDs of tags
+    """
+    if not tag_ids:
+        return
+
+    unused_tag_ids = (select(TagDB.id)
+                      .where(TagDB.id.in_(tag_ids),
+                             ~exists().where(ReceiptTagLinkDB.tag_id == TagDB.id))
+                      .with_for_update(skip_locked=True))
+
+    try:
+        db_session.execute(delete(TagDB)
+                           .where(TagDB.id.in_(unused_tag_ids))
+                           .execution_options(synchronize_session=False))
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
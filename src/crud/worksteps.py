@@ -3,18 +3,23 @@
 """
 from sqlalchemy.orm.session import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, func, literal, text
+from sqlalchemy.dialects.postgresql import UUID as UUID_DB
 
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from typing import List
-from uuid import UUID
+from typing import List, Optional
+from uuid import UUID, uuid4
 
 from src.database.models.worksteps import WorkstepDB
 from src.database.database import save_entity_to_db, remove_entity_from_db
 
 
+# Distance of the order numbers of neighbouring worksteps, a workstep is moved by taking the middle of the gap
+WORKSTEP_ORDER_GAP = 1024
+
+
 def save_workstep(db_session: Session, db_workstep: WorkstepDB) -> WorkstepDB:
     """
     Saves a workstep to database
@@ -29,6 +34,130 @@ def save_workstep(db_session: Session, db_workstep: WorkstepDB) -> WorkstepDB:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
 
 
+def append_workstep(db_session: Session, receipt_id: UUID, workstep_id: UUID, workstep: str) -> WorkstepDB:
+    """
+    Insert a workstep behind the last workstep of a receipt
+
+    The order number is computed by the INSERT ... SELECT MAX(order_number) itself. Concurrent appends to the same
+    receipt have to hold the lock of the receipt row (read_receipt(for_update=True)), the unique constraint on
+    (receipt_id, order_number) rejects duplicates otherwise.
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param workstep_id: UUID of the new workstep
+    :param workstep: Text of the new workstep
+    :return: Database object
+    """
+    try:
+        db_workstep: WorkstepDB = db_session.execute(
+            insert(WorkstepDB)
+            .from_select(['id', 'order_number', 'workstep', 'receipt_id'],
+                         select(literal(workstep_id, UUID_DB),
+                                func.coalesce(func.max(WorkstepDB.order_number), 0) + WORKSTEP_ORDER_GAP,
+                                literal(workstep),
+                                literal(receipt_id, UUID_DB))
+                         .where(WorkstepDB.receipt_id == receipt_id))
+            .returning(WorkstepDB)).scalars().one()
+
+        return db_workstep
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def create_worksteps(db_session: Session, receipt_id: UUID, worksteps: List[dict]) -> List[WorkstepDB]:
+    """
+    Inserts worksteps of a receipt with multi-row INSERT ... RETURNING statements
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param worksteps: Column values (order_number, workstep) per workstep
+    :return: List of database objects in the order of the input
+    """
+    if not worksteps:
+        return []
+
+    try:
+        return db_session.scalars(insert(WorkstepDB).returning(WorkstepDB, sort_by_parameter_order=True),
+                                  [{**workstep, 'id': uuid4(), 'receipt_id': receipt_id}
+                                   for workstep in worksteps]).all()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def update_worksteps(db_session: Session, worksteps: List[dict]):
+    """
+    Updates worksteps by primary key with one executemany UPDATE
+
+    :param db_session: Database session
+    :param worksteps: Changed column values per workstep, including the id
+    """
+    if not worksteps:
+        return
+
+    try:
+        defer_order_number_check(db_session=db_session)
+        db_session.execute(update(WorkstepDB), worksteps)
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def delete_worksteps(db_session: Session, workstep_ids: List[UUID]):
+    """
+    Removes worksteps by id with one DELETE
+
+    :param db_session: Database session
+    :param workstep_ids: UUIDs of worksteps
+    """
+    if not workstep_ids:
+        return
+
+    try:
+        db_session.execute(delete(WorkstepDB)
+                           .where(WorkstepDB.id.in_(workstep_ids))
+                           .execution_options(synchronize_session=False))
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def replace_worksteps(db_session: Session, receipt_id: UUID, worksteps: List[str]) -> List[WorkstepDB]:
+    """
+    Replaces all worksteps of a receipt
+
+    One DELETE and multi-row INSERT ... RETURNING statements, the order numbers are spaced by WORKSTEP_ORDER_GAP.
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param worksteps: Texts of the new worksteps in their order
+    :return: List of database objects in their order
+    """
+    try:
+        db_session.execute(delete(WorkstepDB)
+                           .where(WorkstepDB.receipt_id == receipt_id)
+                           .execution_options(synchronize_session=False))
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+    return create_worksteps(db_session=db_session, receipt_id=receipt_id,
+                            worksteps=[{'order_number': position * WORKSTEP_ORDER_GAP, 'workstep': workstep}
+                                       for position, workstep in enumerate(worksteps, start=1)])
+
+
+def defer_order_number_check(db_session: Session):
+    """
+    Check the unique order numbers of the worksteps at commit instead of after every row
+
+    Needed for statements that swap order numbers, intermediate rows may share one.
+
+    :param db_session: Database session
+    """
+    db_session.execute(text('SET CONSTRAINTS public.uq_worksteps_receipt_id_order_number DEFERRED'))
+
+
 def read_worksteps(db_session: Session) -> List[WorkstepDB]:
     """
     Read all worksteps in database
@@ -53,7 +182,56 @@ def read_worksteps_by_receipt(db_session: Session, receipt_id: UUID) -> List[Wor
     """
     try:
         return db_session.execute(select(WorkstepDB)
-                                  .where(WorkstepDB.receipt_id == receipt_id)).scalars().all()
+                                  .where(WorkstepDB.receipt_id == receipt_id)
+                                  .order_by(WorkstepDB.order_number)).scalars().all()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def read_next_workstep_order_number(db_session: Session, receipt_id: UUID, order_number: int,
+                                    exclude_id: UUID) -> Optional[int]:
+    """
+    Read the order number following a position
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param order_number: Position to start after
+    :param exclude_id: UUID of a workstep to ignore (the moved workstep)
+    :return: Next order number or None if there is no workstep after the position
+    """
+    try:
+        return db_session.execute(select(func.min(WorkstepDB.order_number))
+                                  .where(WorkstepDB.receipt_id == receipt_id,
+                                         WorkstepDB.order_number > order_number,
+                                         WorkstepDB.id != exclude_id)).scalar_one()
+
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
+
+
+def rebalance_worksteps(db_session: Session, receipt_id: UUID):
+    """
+    Spread the order numbers of the worksteps of a receipt to multiples of WORKSTEP_ORDER_GAP
+
+    One UPDATE for all worksteps, the order is kept.
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    """
+    positions = (select(WorkstepDB.id,
+                        (func.row_number().over(order_by=(WorkstepDB.order_number, WorkstepDB.id))
+                         * WORKSTEP_ORDER_GAP).label('order_number'))
+                 .where(WorkstepDB.receipt_id == receipt_id)
+                 .subquery())
+    try:
+        defer_order_number_check(db_session=db_session)
+        db_session.execute(update(WorkstepDB)
+                           .where(WorkstepDB.id == positions.c.id)
+                           .values(order_number=positions.c.order_number)
+                           .execution_options(synchronize_session=False))
+        # Loaded worksteps still hold the old order numbers
+        db_session.expire_all()
 
     except SQLAlchemyError:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Database Error')
@@ -5,44 +5,200 @@
 
 from fastapi import HTTPException, status
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
-
-from src.settings import DATABASE_URI
+from starlette.concurrency import run_in_threadpool
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, TypeVar, Union
+
+from src.settings import (DATABASE_URI,
+                          DATABASE_ASYNC,
+                          DATABASE_ASYNC_URI,
+                          DATABASE_POOL_SIZE,
+                          DATABASE_MAX_OVERFLOW,
+                          DATABASE_POOL_RECYCLE,
+                          DATABASE_POOL_TIMEOUT,
+                          DATABASE_POOL_PRE_PING,
+                          DATABASE_STATEMENT_TIMEOUT)
 from src.database.DatabaseException import CustomDatabaseException
+from src.database.pool_metrics import (InstrumentedQueuePool,
+                                       InstrumentedAsyncAdaptedQueuePool,
+                                       register_pool_metrics)
+from src.database.query_metrics import register_query_metrics
+
+
+T = TypeVar('T')
+
+# Session handed to the endpoints, depends on the DATABASE_ASYNC setting
+AnySession = Union[Session, AsyncSession]
+
+
+
+def _engine_options(statement_timeout_args: dict) -> dict:
+    options = dict(pool_size=DATABASE_POOL_SIZE,
+                   max_overflow=DATABASE_MAX_OVERFLOW,
+                   pool_recycle=DATABASE_POOL_RECYCLE,
+                   pool_timeout=DATABASE_POOL_TIMEOUT,
+                   pool_pre_ping=DATABASE_POOL_PRE_PING,
+                   echo=False)
+    if DATABASE_STATEMENT_TIMEOUT > 0:
+        options['connect_args'] = statement_timeout_args
 
+    return options
 
-engine = create_engine(DATABASE_URI, pool_size=1, max_overflow=2, echo=False)
+
+engine = create_engine(DATABASE_URI,
+                       poolclass=InstrumentedQueuePool,
+                       **_engine_options({'options': f'-c statement_timeout={DATABASE_STATEMENT_TIMEOUT}'}))
+register_pool_metrics('sync', engine)
+register_query_metrics('sync', engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if DATABASE_ASYNC:
+    async_engine = create_async_engine(DATABASE_ASYNC_URI or make_url(DATABASE_URI).set(drivername='postgresql+asyncpg'),
+                                       poolclass=InstrumentedAsyncAdaptedQueuePool,
+                                       **_engine_options({'server_settings': {
+                                           'statement_timeout': str(DATABASE_STATEMENT_TIMEOUT)}}))
+    register_pool_metrics('async', async_engine.sync_engine)
+    register_query_metrics('async', async_engine.sync_engine)
+
+    AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=async_engine)
+
 Base = declarative_base()
 
 
-def get_db():
+@asynccontextmanager
+async def open_session() -> AsyncIterator[AnySession]:
+    """
+    Open a database session outside of a request dependency (e.g. in streamed responses)
+
+    Yields an AsyncSession (asyncpg) if DATABASE_ASYNC is enabled, otherwise a Session (psycopg2)
+    """
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def get_db():
     """
     Get general database session
+
+    Yields an AsyncSession (asyncpg) if DATABASE_ASYNC is enabled, otherwise a Session (psycopg2)
+
+    The session is the unit of work of the request: services only flush their changes, they are committed once
+    after the endpoint returned and rolled back if it raised.
     """
-    db = SessionLocal()
-    try:
+    async with open_session() as db:
         # Grafana can be included here to track database transactions
-        yield db
-    finally:
-        db.close()
+        try:
+            yield db
+        except Exception:
+            await _end_transaction(db, commit=False)
+            raise
+
+        await _end_transaction(db, commit=True)
+
+
+async def _end_transaction(db_session: AnySession, commit: bool):
+    try:
+        if isinstance(db_session, AsyncSession):
+            await (db_session.commit() if commit else db_session.rollback())
+        else:
+            await run_in_threadpool(db_session.commit if commit else db_session.rollback)
+
+    except SQLAlchemyError as ex:
+        raise CustomDatabaseException(ex=ex)
+
+
+def on_commit(db_session: Session, callback: Callable[[], Any]):
+    """
+    Run a callback after the transaction of the session was committed, e.g. to invalidate caches
 
+    The callbacks are dropped if the transaction is rolled back.
 
-def save_entity_to_db(entity, db_session: Session):
+    :param db_session: Database session
+    :param callback: Function without arguments
+    """
+    db_session.info.setdefault('on_commit', []).append(callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(db_session: Session):
+    for callback in db_session.info.pop('on_commit', []):
+        callback()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_on_commit(db_session: Session):
+    db_session.info.pop('on_commit', None)
+
+
+async def run_service(service: Callable[..., T], db_session: AnySession, **kwargs: Any) -> T:
+    """
+    Run a service with the database session of the request
+
+    - Session: the service runs in the thread pool, like a sync endpoint
+    - AsyncSession: the service runs on the event loop with AsyncSession.run_sync, the database io is
+      awaited by asyncpg and does not occupy a thread
+
+    :param service: Service function with a `db_session` keyword argument
+    :param db_session: Database session from get_db
+    :param kwargs: Further keyword arguments of the service
+    :return: Result of the service
+    """
+    if isinstance(db_session, AsyncSession):
+        return await db_session.run_sync(_call_service, service, kwargs)
+
+    return await run_in_threadpool(service, db_session=db_session, **kwargs)
+
+
+async def release_connection(db_session: AnySession):
+    """
+    End the transaction of a read-only request and return its connection to the pool
+
+    Changes that were not committed are discarded.
+
+    The session can still be used afterwards, it begins a new transaction on the next statement.
+
+    :param db_session: Database session from get_db
+    """
+    if isinstance(db_session, AsyncSession):
+        await db_session.close()
+    else:
+        await run_in_threadpool(db_session.close)
+
+
+def _call_service(db_session: Session, service: Callable[..., T], kwargs: dict) -> T:
+    return service(db_session=db_session, **kwargs)
+
+
+def save_entity_to_db(entity, db_session: Session, refresh: bool = False):
     """ " Save new data or update existing data in the database table
 
+    The entity is flushed, the commit happens at the end of the request (get_db). Server generated columns of
+    mappers with eager_defaults are returned by the INSERT/UPDATE itself.
+
     :param db_session: database session
     :param entity: database entity
     :type entity: database entity
+    :param refresh: reload the entity after the flush, only needed for server side values that are not fetched
     """
     try:
         db_session.add(entity)
-        db_session.commit()
-        db_session.refresh(entity)
+        db_session.flush()
+        if refresh:
+            db_session.refresh(entity)
         return entity
 
     except SQLAlchemyError as ex:
@@ -55,13 +211,15 @@ def save_entity_to_db(entity, db_session: Session):
 def remove_entity_from_db(entity, db_session: Session):
     """ " delete data from table
 
+    The delete is flushed, the commit happens at the end of the request (get_db).
+
     :param db_session: database session
     :param entity: database entity
     :type entity: database entity
     """
     try:
         db_session.delete(entity)
-        db_session.commit()
+        db_session.flush()
 
     except SQLAlchemyError as ex:
         raise CustomDatabaseException(ex=ex)
@@ -3,7 +3,7 @@
 """
 
 from src.database.database import Base
-from sqlalchemy import VARCHAR, ForeignKeyConstraint, Integer
+from sqlalchemy import VARCHAR, ForeignKeyConstraint, Index, Integer, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID as UUID_DB
 from uuid import UUID, uuid4, uuid1
@@ -15,7 +15,11 @@ class IngredientDB(Base):
     """
     __tablename__ = "ingredients"
     __table_args__ = (ForeignKeyConstraint(['receipt_id'],
-                                           ['public.receipts.id']),
+                                           ['public.receipts.id'],
+                                           name='fk_ingredients_receipt_id', ondelete='CASCADE'),
+                      Index('ix_ingredients_receipt_id', 'receipt_id'),
+                      # Prefix lookups of the autocomplete (lower(ingredient) LIKE 'prefix%')
+                      Index('ix_ingredients_ingredient_pattern', text('lower(ingredient) text_pattern_ops')),
                       {'schema': 'public'})
 
     id: Mapped[UUID] = mapped_column("id", UUID_DB, primary_key=True, nullable=False, default=uuid4())
@@ -24,4 +28,4 @@ class IngredientDB(Base):
     ingredient: Mapped[str] = mapped_column('ingredient', VARCHAR(200), nullable=False)
     receipt_id: Mapped[UUID] = mapped_column('receipt_id', UUID_DB, nullable=False)
 
-    receipt = relationship('ReceiptDB')
+    receipt = relationship('ReceiptDB', back_populates='ingredients')
@@ -2,7 +2,7 @@
     Receipt Tag Linking
 """
 from src.database.database import Base
-from sqlalchemy import ForeignKeyConstraint
+from sqlalchemy import ForeignKeyConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID as UUID_DB
 from uuid import UUID
@@ -14,9 +14,12 @@ class ReceiptTagLinkDB(Base):
     """
     __tablename__ = "receipt_tag_links"
     __table_args__ = (ForeignKeyConstraint(['receipt_id'],
-                                           ['public.receipts.id']),
+                                           ['public.receipts.id'],
+                                           name='fk_receipt_tag_links_receipt_id', ondelete='CASCADE'),
                       ForeignKeyConstraint(['tag_id'],
                                            ['public.tags.id']),
+                      # Lookup of the receipts of tags (tag filter, unused tags are deleted)
+                      Index('ix_receipt_tag_links_tag_id_receipt_id', 'tag_id', 'receipt_id'),
                       {'schema': 'public'})
 
     receipt_id: Mapped[UUID] = mapped_column('receipt_id', UUID_DB, primary_key=True)
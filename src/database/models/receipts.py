@@ -2,9 +2,10 @@
 Receipt endpoints
 """
 from src.database.database import Base
-from sqlalchemy import VARCHAR
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID as UUID_DB
+from sqlalchemy import VARCHAR, TIMESTAMP, Index, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import UUID as UUID_DB, TSVECTOR
+from datetime import datetime
 from uuid import UUID, uuid4
 
 
@@ -13,9 +14,24 @@ class ReceiptDB(Base):
     Database Model of Receipt Table
     """
     __tablename__ = "receipts"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (Index('ix_receipts_user_id_title_id', 'user_id', 'title', 'id'),
+                      Index('ix_receipts_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+                      Index('ix_receipts_search_vector', 'search_vector', postgresql_using='gin'),
+                      {'schema': 'public'})
+    # Fetch server generated values (created_at) with the insert statement
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[UUID] = mapped_column("id", UUID_DB, primary_key=True, nullable=False, default=uuid4())
     title: Mapped[str] = mapped_column("title", VARCHAR(50), nullable=False)
     description: Mapped[str] = mapped_column("description", VARCHAR(200), nullable=True)
     user_id: Mapped[UUID] = mapped_column("user_id", UUID_DB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column("created_at", TIMESTAMP(timezone=True), nullable=False,
+                                                 server_default=func.now())
+    # Maintained by database triggers (migrations/007_receipts_search_vector.sql), only loaded on access
+    search_vector: Mapped[str] = mapped_column("search_vector", TSVECTOR, nullable=True, deferred=True)
+
+    # Children are only loaded on access or with an explicit loader option (selectinload)
+    ingredients = relationship('IngredientDB', back_populates='receipt', passive_deletes=True)
+    worksteps = relationship('WorkstepDB', back_populates='receipt', passive_deletes=True,
+                             order_by='WorkstepDB.order_number')
+    tags = relationship('TagDB', secondary='public.receipt_tag_links', viewonly=True)
@@ -2,7 +2,7 @@
 Tag DB model
 """
 from src.database.database import Base
-from sqlalchemy import VARCHAR
+from sqlalchemy import VARCHAR, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID as UUID_DB
 from uuid import UUID
@@ -13,7 +13,10 @@ class TagDB(Base):
     Database Model of Receipt Table
     """
     __tablename__ = "tags"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (UniqueConstraint('tag', name='uq_tags_tag'),
+                      # Prefix lookups of the autocomplete (tag LIKE 'PREFIX%'), independent of the collation
+                      Index('ix_tags_tag_pattern', 'tag', postgresql_ops={'tag': 'varchar_pattern_ops'}),
+                      {'schema': 'public'})
 
     id: Mapped[UUID] = mapped_column("id", UUID_DB, primary_key=True, nullable=False)
     tag: Mapped[str] = mapped_column("tag", VARCHAR(20), nullable=False)
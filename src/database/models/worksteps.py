@@ -2,7 +2,7 @@
 	Workstep endpoints
 """
 from src.database.database import Base
-from sqlalchemy import VARCHAR, ForeignKeyConstraint, Integer
+from sqlalchemy import VARCHAR, ForeignKeyConstraint, Integer, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID as UUID_DB
 from uuid import UUID, uuid4
@@ -14,7 +14,11 @@ class WorkstepDB(Base):
     """
     __tablename__ = "worksteps"
     __table_args__ = (ForeignKeyConstraint(['receipt_id'],
-                                           ['public.receipts.id']),
+                                           ['public.receipts.id'],
+                                           name='fk_worksteps_receipt_id', ondelete='CASCADE'),
+                      # Deferrable, a rebalance of the order numbers checks it at commit
+                      UniqueConstraint('receipt_id', 'order_number', name='uq_worksteps_receipt_id_order_number',
+                                       deferrable=True, initially='IMMEDIATE'),
                       {'schema': 'public'})
 
     id: Mapped[UUID] = mapped_column("id", UUID_DB, primary_key=True, nullable=False, default=uuid4())
@@ -22,4 +26,4 @@ class WorkstepDB(Base):
     workstep: Mapped[str] = mapped_column('workstep', VARCHAR(500), nullable=False)
     receipt_id: Mapped[UUID] = mapped_column('receipt_id', UUID_DB, nullable=False)
 
-    receipt = relationship('ReceiptDB')
+    receipt = relationship('ReceiptDB', back_populates='worksteps')
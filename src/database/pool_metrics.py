@@ -0,0 +1,67 @@
+"""
+    Prometheus metrics of the database connection pools
+"""
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+POOL_CHECKOUT_WAIT = Histogram('db_pool_checkout_wait_seconds',
+                               'Time a request waited for a connection of the pool (including connect)',
+                               ['engine'],
+                               buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                                        2.5, 5.0, 10.0, 30.0))
+POOL_CHECKOUT_TIMEOUTS = Counter('db_pool_checkout_timeouts_total',
+                                 'Checkouts that failed because the pool timeout was reached',
+                                 ['engine'])
+POOL_SIZE = Gauge('db_pool_size', 'Configured number of persistent connections', ['engine'])
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out_connections', 'Connections currently in use', ['engine'])
+POOL_OVERFLOW = Gauge('db_pool_overflow_connections', 'Connections currently opened beyond the pool size',
+                      ['engine'])
+
+
+def _observe_checkout(label: str, do_get):
+    start = time.perf_counter()
+    try:
+        return do_get()
+    except PoolTimeoutError:
+        POOL_CHECKOUT_TIMEOUTS.labels(label).inc()
+        raise
+    finally:
+        POOL_CHECKOUT_WAIT.labels(label).observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool of the sync engine that records the checkout wait time
+    """
+    metrics_label = 'sync'
+
+    def _do_get(self):
+        return _observe_checkout(self.metrics_label, super()._do_get)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    QueuePool of the async engine that records the checkout wait time
+    """
+    metrics_label = 'async'
+
+    def _do_get(self):
+        return _observe_checkout(self.metrics_label, super()._do_get)
+
+
+def register_pool_metrics(label: str, engine: Engine):
+    """
+    Export the current pool usage of an engine as gauges
+
+    :param label: Engine label used in the metrics
+    :param engine: (Sync) engine, for async engines pass AsyncEngine.sync_engine
+    """
+    # The pool is read on every scrape because dispose() replaces it
+    POOL_SIZE.labels(label).set_function(lambda: engine.pool.size())
+    POOL_CHECKED_OUT.labels(label).set_function(lambda: engine.pool.checkedout())
+    POOL_OVERFLOW.labels(label).set_function(lambda: max(engine.pool.overflow(), 0))
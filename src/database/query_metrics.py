@@ -0,0 +1,98 @@
+"""
+    Statement and commit counters of the database engines
+
+Counted globally as Prometheus metrics and per request, the per request counts can be returned as response headers
+(DATABASE_STATS_HEADERS) to check how many round-trips an endpoint needs.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Counter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+DB_STATEMENTS = Counter('db_statements_total', 'Statements sent to the database', ['engine'])
+DB_COMMITS = Counter('db_commits_total', 'Committed transactions', ['engine'])
+DB_ROLLBACKS = Counter('db_rollbacks_total', 'Rolled back transactions', ['engine'])
+
+
+class RequestDatabaseStats:
+    """
+    Statements and commits of one request
+    """
+
+    def __init__(self):
+        self.statements: int = 0
+        self.commits: int = 0
+
+
+# Set per request by DatabaseStatsMiddleware, the object is shared with the thread pool and run_sync
+request_database_stats: ContextVar[Optional[RequestDatabaseStats]] = ContextVar('request_database_stats',
+                                                                                default=None)
+
+
+def register_query_metrics(label: str, engine: Engine):
+    """
+    Count the statements and transactions of an engine
+
+    :param label: Engine label used in the metrics
+    :param engine: (Sync) engine, for async engines pass AsyncEngine.sync_engine
+    """
+    statements = DB_STATEMENTS.labels(label)
+    commits = DB_COMMITS.labels(label)
+    rollbacks = DB_ROLLBACKS.labels(label)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.inc()
+        stats = request_database_stats.get()
+        if stats is not None:
+            stats.statements += 1
+
+    @event.listens_for(engine, 'commit')
+    def _count_commit(conn):
+        commits.inc()
+        stats = request_database_stats.get()
+        if stats is not None:
+            stats.commits += 1
+
+    @event.listens_for(engine, 'rollback')
+    def _count_rollback(conn):
+        rollbacks.inc()
+
+
+class DatabaseStatsMiddleware:
+    """
+    Counts the statements and commits of every request, optionally sent as X-DB-Statements / X-DB-Commits headers
+    """
+
+    def __init__(self, app: ASGIApp, headers: bool = False):
+        """
+        :param app: ASGI application
+        :param headers: Add the counts to the response headers
+        """
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDatabaseStats()
+        token = request_database_stats.set(stats)
+
+        async def send_with_stats(message: Message):
+            if self.headers and message['type'] == 'http.response.start':
+                message.setdefault('headers', [])
+                message['headers'] = [*message['headers'],
+                                      (b'x-db-statements', str(stats.statements).encode('latin-1')),
+                                      (b'x-db-commits', str(stats.commits).encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            request_database_stats.reset(token)
@@ -0,0 +1,264 @@
+"""
+    Cache of rendered receipt pdfs
+
+Entries are keyed by "<receipt id>-<content digest>", a changed receipt, ingredient or workstep results in a new
+key. invalidate() additionally removes all entries of a receipt as soon as one of its rows is written.
+"""
+import logging
+import os
+import tempfile
+import threading
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from src.settings import PDF_CACHE_BACKEND, PDF_CACHE_MAX_BYTES, PDF_CACHE_DIR, PDF_CACHE_DISK_BYTES
+
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_cache_key(receipt_id: UUID, digest: str) -> str:
+    """
+    Cache key of a rendered pdf
+
+    :param receipt_id: UUID of receipt
+    :param digest: Content digest of the receipt, its ingredients and worksteps
+    :return: Cache key
+    """
+    return f'{receipt_id}-{digest}'
+
+
+class PDFCache(ABC):
+    """
+    Backend of the pdf cache
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        :param key: Cache key
+        :return: Cached pdf or None
+        """
+
+    @abstractmethod
+    def set(self, key: str, pdf_bytes: bytes):
+        """
+        :param key: Cache key
+        :param pdf_bytes: Rendered pdf
+        """
+
+    @abstractmethod
+    def invalidate(self, receipt_id: UUID):
+        """
+        Remove all cached pdfs of a receipt
+
+        :param receipt_id: UUID of receipt
+        """
+
+
+class NullPDFCache(PDFCache):
+    """
+    Disabled cache, every download renders the pdf
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, pdf_bytes: bytes):
+        pass
+
+    def invalidate(self, receipt_id: UUID):
+        pass
+
+
+class MemoryPDFCache(PDFCache):
+    """
+    In-process LRU cache limited by the total size of the cached pdfs
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        :param max_bytes: Byte budget of all cached pdfs
+        """
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._keys_by_receipt: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+
+            return pdf_bytes
+
+    def set(self, key: str, pdf_bytes: bytes):
+        if len(pdf_bytes) > self._max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+
+            self._entries[key] = pdf_bytes
+            self._size += len(pdf_bytes)
+            self._keys_by_receipt.setdefault(self._receipt_of(key), set()).add(key)
+
+            while self._size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, receipt_id: UUID):
+        with self._lock:
+            for key in list(self._keys_by_receipt.get(str(receipt_id), ())):
+                self._remove(key)
+
+    def _remove(self, key: str):
+        pdf_bytes = self._entries.pop(key, None)
+        if pdf_bytes is None:
+            return
+
+        self._size -= len(pdf_bytes)
+
+        receipt_keys = self._keys_by_receipt.get(self._receipt_of(key))
+        if receipt_keys is not None:
+            receipt_keys.discard(key)
+            if not receipt_keys:
+                del self._keys_by_receipt[self._receipt_of(key)]
+
+    @staticmethod
+    def _receipt_of(key: str) -> str:
+        # UUIDs have a fixed length of 36 characters
+        return key[:36]
+
+
+class DiskPDFCache(PDFCache):
+    """
+    Cache storing the pdfs as files in a directory, can be shared by the workers of a host
+
+    Each receipt has one file "<receipt id>.pdf" whose first line is the content digest of the cached pdf. A newer
+    pdf of the receipt replaces the file, invalidate() removes one file. If the files exceed the byte budget the
+    least recently used ones (modification time, touched on reads) are removed until a tenth of the budget is free.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        :param directory: Cache directory, created if it does not exist
+        :param max_bytes: Byte budget of all files in the directory
+        """
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Estimate of the directory size, other workers write as well, it is corrected by every eviction
+        self._size = self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        receipt_id, digest = self._split(key)
+        path = self._path(receipt_id)
+
+        try:
+            with open(path, 'rb') as pdf_file:
+                if pdf_file.readline() != digest.encode('ascii') + b'\n':
+                    return None
+                pdf_bytes = pdf_file.read()
+
+            os.utime(path)
+            return pdf_bytes
+
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, pdf_bytes: bytes):
+        receipt_id, digest = self._split(key)
+        entry = digest.encode('ascii') + b'\n' + pdf_bytes
+        if len(entry) > self._max_bytes:
+            return
+
+        # Write to a temporary file first, readers never see a partially written pdf
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as tmp_file:
+                tmp_file.write(entry)
+            os.replace(tmp_path, self._path(receipt_id))
+
+        except OSError as err:
+            logger.warning('Could not write pdf cache entry %s: %s', key, err)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            # Replaced files are counted twice, at worst the eviction scan runs earlier
+            self._size += len(entry)
+            if self._size > self._max_bytes:
+                self._size = self._evict()
+
+    def invalidate(self, receipt_id: UUID):
+        try:
+            os.remove(self._path(str(receipt_id)))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> int:
+        """
+        Remove the least recently used files until the directory fits into 90% of the budget
+
+        :return: Size of the remaining files
+        """
+        entries: List[Tuple[float, int, str]] = []
+        for dir_entry in os.scandir(self._directory):
+            if not dir_entry.name.endswith('.pdf'):
+                continue
+            try:
+                stat = dir_entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        if size <= self._max_bytes:
+            return size
+
+        for _, entry_size, path in sorted(entries):
+            if size <= self._max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+        return size
+
+    def _path(self, receipt_id: str) -> str:
+        return os.path.join(self._directory, f'{receipt_id}.pdf')
+
+    @staticmethod
+    def _split(key: str) -> Tuple[str, str]:
+        # UUIDs have a fixed length of 36 characters, followed by "-<digest>"
+        return key[:36], key[37:]
+
+
+def create_pdf_cache(backend: str) -> PDFCache:
+    """
+    Create the pdf cache configured by PDF_CACHE_BACKEND
+
+    :param backend: 'memory', 'disk' or 'none'
+    :return: Cache backend
+    """
+    if backend == 'memory':
+        return MemoryPDFCache(max_bytes=PDF_CACHE_MAX_BYTES)
+    if backend == 'disk':
+        return DiskPDFCache(directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_DISK_BYTES)
+    if backend == 'none':
+        return NullPDFCache()
+
+    raise ValueError(f'Unknown pdf cache backend "{backend}"')
+
+
+pdf_cache: PDFCache = create_pdf_cache(PDF_CACHE_BACKEND)
@@ -1,10 +1,13 @@
-from typing import List
+from typing import List, Tuple
 
 from fpdf import FPDF
 
 from src.api.models.ingredients import IngredientReadInDB
+from src.api.models.receipts import ReceiptReadInDB
 from src.api.models.worksteps import WorkstepReadInDB
 
+# Part of the cache key and ETag of rendered pdfs, increase it on every change of the layout
+PDF_LAYOUT_VERSION = 2
 
 
 class ReceiptPDF(FPDF):
@@ -30,6 +33,47 @@ class ReceiptPDF(FPDF):
         self.set_font('Arial', 'B', 12)
         self.multi_cell(0, 8, "Arbeitsschritte:")
         self.set_font('Arial', '', 12)
-        for workstep in worksteps:
-            self.multi_cell(0, 6, f'{workstep.order_number}.) {workstep.workstep}')
-        self.ln()
\ No newline at end of file
+        # The order numbers are sort keys with gaps, the worksteps are numbered by their position
+        for position, workstep in enumerate(worksteps, start=1):
+            self.multi_cell(0, 6, f'{position}.) {workstep.workstep}')
+        self.ln()
+
+    def add_receipt(self, receipt: ReceiptReadInDB, ingredients: List[IngredientReadInDB],
+                    worksteps: List[WorkstepReadInDB]):
+        self.add_page()
+        self.chapter_title(title=receipt.title)
+        self.chapter_description(description=receipt.description)
+        self.chapter_ingredients(ingredients=ingredients)
+        self.chapter_worksteps(worksteps=worksteps)
+
+
+def render_receipt_pdf(receipt: ReceiptReadInDB,
+                       ingredients: List[IngredientReadInDB],
+                       worksteps: List[WorkstepReadInDB]) -> bytes:
+    """
+    Render the pdf of a receipt
+
+    :param receipt: Receipt
+    :param ingredients: Ingredients of the receipt
+    :param worksteps: Worksteps of the receipt in their order
+    :return: PDF document
+    """
+    receipt_pdf = ReceiptPDF()
+    receipt_pdf.add_receipt(receipt=receipt, ingredients=ingredients, worksteps=worksteps)
+
+    return receipt_pdf.output(dest='S').encode('latin1')
+
+
+def render_cookbook_pdf(receipts: List[Tuple[ReceiptReadInDB, List[IngredientReadInDB],
+                                             List[WorkstepReadInDB]]]) -> bytes:
+    """
+    Render one pdf with a chapter (starting on a new page) per receipt
+
+    :param receipts: Receipts with their ingredients and ordered worksteps
+    :return: PDF document
+    """
+    receipt_pdf = ReceiptPDF()
+    for receipt, ingredients, worksteps in receipts:
+        receipt_pdf.add_receipt(receipt=receipt, ingredients=ingredients, worksteps=worksteps)
+
+    return receipt_pdf.output(dest='S').encode('latin1')
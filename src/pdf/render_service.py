@@ -0,0 +1,147 @@
+"""
+    Rendering of receipt pdfs in a process pool
+
+FPDF is pure python and CPU-bound, rendering in the worker process would hold the GIL and slow down all other requests.
+"""
+import asyncio
+import multiprocessing
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from fastapi import status
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.exceptions import HTTPException
+
+from src.api.models.ingredients import IngredientReadInDB
+from src.api.models.receipts import ReceiptReadInDB
+from src.api.models.worksteps import WorkstepReadInDB
+from src.pdf.receipt_pdf import render_receipt_pdf
+from src.settings import PDF_RENDER_WORKERS, PDF_RENDER_QUEUE_SIZE, PDF_RENDER_RETRY_AFTER
+
+
+T = TypeVar('T')
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PDF_RENDER_SECONDS = Histogram('pdf_render_seconds', 'Time a render process needed for one pdf', buckets=_BUCKETS)
+PDF_RENDER_LATENCY = Histogram('pdf_render_latency_seconds',
+                               'Time from submitting a render until the pdf was received (including queueing)',
+                               buckets=_BUCKETS)
+PDF_RENDER_REJECTED = Counter('pdf_render_rejected_total', 'Renders rejected because the queue was full')
+PDF_RENDER_IN_FLIGHT = Gauge('pdf_render_in_flight', 'Renders running or waiting for a render process')
+
+
+def _timed_call(function: Callable[..., T], *args: Any) -> Tuple[T, float]:
+    # Runs in the render process
+    start = time.perf_counter()
+    result = function(*args)
+
+    return result, time.perf_counter() - start
+
+
+class PDFRenderService:
+    """
+    Process pool with bounded concurrency for pdf rendering
+
+    At most `max_workers` pdfs are rendered at once and `queue_size` further renders wait for a process, renders
+    beyond that are rejected with 503 and a Retry-After header. The processes are started on the first render.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, retry_after: int):
+        """
+        :param max_workers: Number of render processes
+        :param queue_size: Number of renders waiting for a free process
+        :param retry_after: Seconds sent as Retry-After if a render is rejected
+        """
+        self._max_workers = max_workers
+        self._max_in_flight = max_workers + queue_size
+        self._retry_after = retry_after
+        self._in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def render(self,
+                     receipt: ReceiptReadInDB,
+                     ingredients: List[IngredientReadInDB],
+                     worksteps: List[WorkstepReadInDB]) -> bytes:
+        """
+        Render the pdf of a receipt in a render process
+
+        :param receipt: Receipt
+        :param ingredients: Ingredients of the receipt
+        :param worksteps: Worksteps of the receipt in their order
+        :return: PDF document
+        """
+        self.acquire()
+        try:
+            return await self.run(render_receipt_pdf, receipt, ingredients, worksteps)
+        finally:
+            self.release()
+
+    def acquire(self):
+        """
+        Take a render slot, has to be called on the event loop (the counter is not locked)
+
+        Callers that render several pdfs one after another (exports) hold one slot for all of them.
+        """
+        if self._in_flight >= self._max_in_flight:
+            PDF_RENDER_REJECTED.inc()
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Too many pdf downloads, please retry later',
+                                headers={'Retry-After': str(self._retry_after)})
+
+        self._in_flight += 1
+        PDF_RENDER_IN_FLIGHT.inc()
+
+    def release(self):
+        """
+        Return a render slot taken with acquire()
+        """
+        self._in_flight -= 1
+        PDF_RENDER_IN_FLIGHT.dec()
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Run a render function in a render process, the caller has to hold a slot
+
+        :param function: Module level function, its arguments and result are pickled
+        :param args: Arguments of the function
+        :return: Result of the function
+        """
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(_timed_call, function, *args)
+            result, render_seconds = await asyncio.wrap_future(future)
+
+        except BrokenProcessPool:
+            # A render process died, the next render starts a new pool
+            self._executor = None
+            raise
+
+        PDF_RENDER_SECONDS.observe(render_seconds)
+        PDF_RENDER_LATENCY.observe(time.perf_counter() - start)
+
+        return result
+
+    def shutdown(self):
+        """
+        Stop the render processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process with running threads (thread pool, jwks refresh) is unsafe, spawn fresh interpreters
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+
+        return self._executor
+
+
+pdf_renderer = PDFRenderService(max_workers=PDF_RENDER_WORKERS,
+                                queue_size=PDF_RENDER_QUEUE_SIZE,
+                                retry_after=PDF_RENDER_RETRY_AFTER)
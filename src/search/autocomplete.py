@@ -0,0 +1,106 @@
+"""
+    In-process autocomplete indexes
+
+Each worker process keeps a prefix trie per scope: the ingredient names of a user and the tag catalog. The tries
+are loaded from the database on the first request, changed incrementally by the writes of the worker (after their
+commit) and reloaded after AUTOCOMPLETE_TTL seconds to pick up the writes of the other workers. Until then a new
+value is shown in the spelling it was first added with, the reload returns the most used spelling.
+"""
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, List, Tuple
+
+from src.search.prefix_trie import PrefixTrie
+from src.settings import AUTOCOMPLETE_TTL, AUTOCOMPLETE_MAX_USERS
+
+
+# Limit of the autocomplete endpoints, size of the caches in the trie nodes
+MAX_COMPLETIONS = 50
+
+# Scope of the tag catalog, tags are shared by all users
+TAG_SCOPE = 'tags'
+
+
+class CompletionIndex:
+    """
+    LRU of prefix tries per scope with a time to live
+    """
+
+    def __init__(self, max_scopes: int, ttl: float, normalize: Callable[[str], str],
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_scopes: Maximum number of tries kept in memory
+        :param ttl: Seconds after which a trie is loaded again
+        :param normalize: Function turning values and prefixes into keys (e.g. str.lower)
+        :param clock: Monotonic clock, can be replaced in tests
+        """
+        self._max_scopes = max_scopes
+        self._ttl = ttl
+        self._normalize = normalize
+        self._clock = clock
+        self._tries: OrderedDict[Hashable, Tuple[PrefixTrie, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def complete(self, scope: Hashable, prefix: str, limit: int,
+                 load: Callable[[], Iterable[Tuple[str, int]]]) -> List[Tuple[str, int]]:
+        """
+        Most frequent values of a scope starting with a prefix
+
+        :param scope: Scope of the values (e.g. user id)
+        :param prefix: Prefix typed by the user
+        :param limit: Maximum number of completions
+        :param load: Function returning all (value, frequency) of the scope, called if the trie is missing or expired
+        :return: (value, frequency) ordered by frequency (descending)
+        """
+        key = self._normalize(prefix)
+
+        with self._lock:
+            entry = self._tries.get(scope)
+            if entry is not None and entry[1] > self._clock():
+                self._tries.move_to_end(scope)
+                return entry[0].complete(key, limit)
+
+        # Loaded outside of the lock, lookups of other scopes are not blocked by the database
+        trie = PrefixTrie(cache_size=MAX_COMPLETIONS)
+        for value, frequency in load():
+            trie.add(self._normalize(value), value, frequency)
+
+        with self._lock:
+            self._tries[scope] = (trie, self._clock() + self._ttl)
+            self._tries.move_to_end(scope)
+            while len(self._tries) > self._max_scopes:
+                self._tries.popitem(last=False)
+
+            return trie.complete(key, limit)
+
+    def update(self, scope: Hashable, changes: Iterable[Tuple[str, int]]):
+        """
+        Change the frequencies of values in a loaded trie, scopes that are not loaded are skipped
+
+        :param scope: Scope of the values
+        :param changes: (value, change of the frequency)
+        """
+        with self._lock:
+            entry = self._tries.get(scope)
+            if entry is None:
+                return
+
+            for value, delta in changes:
+                entry[0].add(self._normalize(value), value, delta)
+
+    def invalidate(self, scope: Hashable):
+        """
+        Drop the trie of a scope, it is loaded again by the next lookup
+
+        :param scope: Scope of the values
+        """
+        with self._lock:
+            self._tries.pop(scope, None)
+
+
+# Ingredient names by user id, case insensitive
+ingredient_completions = CompletionIndex(max_scopes=AUTOCOMPLETE_MAX_USERS, ttl=AUTOCOMPLETE_TTL, normalize=str.lower)
+# Tag catalog (TAG_SCOPE), frequency is the number of linked receipts
+tag_completions = CompletionIndex(max_scopes=1, ttl=AUTOCOMPLETE_TTL, normalize=str.upper)
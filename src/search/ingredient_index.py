@@ -0,0 +1,286 @@
+"""
+    In-process inverted ingredient index ("what can I cook?")
+
+Each worker process keeps an index per user: normalized ingredient term -> receipts that use it. The indexes are
+loaded from the database on the first request, changed by the ingredient writes of the worker (after their commit)
+and reloaded after COOKABLE_TTL seconds to pick up the writes of the other workers.
+"""
+import heapq
+import threading
+import time
+
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, Union
+from uuid import UUID
+
+from src.settings import COOKABLE_TTL, COOKABLE_MAX_USERS
+
+
+# Posting lists with at least 1/DENSE_SHARE of the receipts of a user are kept as bitmasks, the others as sets
+DENSE_SHARE = 256
+
+
+def normalize_ingredient(name: str) -> str:
+    """
+    Term of an ingredient name: case folded, surrounding and repeated whitespace removed
+
+    :param name: Ingredient name
+    :return: Normalized term
+    """
+    return ' '.join(name.casefold().split())
+
+
+def _bitmask(numbers: Iterable[int]) -> int:
+    bits = bytearray()
+    for number in numbers:
+        if number >> 3 >= len(bits):
+            bits.extend(bytes((number >> 3) - len(bits) + 1))
+        bits[number >> 3] |= 1 << (number & 7)
+
+    return int.from_bytes(bits, 'little')
+
+
+def _numbers(mask: int) -> Iterator[int]:
+    for position, byte in enumerate(mask.to_bytes((mask.bit_length() + 7) // 8, 'little')):
+        while byte:
+            lowest = byte & -byte
+            yield position * 8 + lowest.bit_length() - 1
+            byte ^= lowest
+
+
+class _UserIngredients:
+    """
+    Posting lists of the ingredient terms of one user
+
+    Receipts are numbered per index. The posting lists of common terms are bitmasks (Python ints) over the receipt
+    numbers, rare terms keep a set of numbers that is turned into a bitmask when it is queried. Receipts are also
+    grouped by their number of distinct terms (size masks).
+    """
+    __slots__ = ('postings', 'size_masks', 'receipt_terms', 'receipt_ids', 'numbers')
+
+    def __init__(self, rows: Iterable[Tuple[UUID, str]]):
+        """
+        :param rows: (receipt id, normalized term) per ingredient
+        """
+        # number of ingredients per term, by receipt number
+        self.receipt_terms: List[Counter] = []
+        self.receipt_ids: List[UUID] = []
+        self.numbers: Dict[UUID, int] = {}
+
+        for receipt_id, term in rows:
+            self.receipt_terms[self._number(receipt_id)][term] += 1
+
+        receipts_by_term: Dict[str, List[int]] = {}
+        receipts_by_size: Dict[int, List[int]] = {}
+        for number, terms in enumerate(self.receipt_terms):
+            receipts_by_size.setdefault(len(terms), []).append(number)
+            for term in terms:
+                receipts_by_term.setdefault(term, []).append(number)
+
+        dense = len(self.receipt_ids) // DENSE_SHARE
+        self.postings: Dict[str, Union[int, Set[int]]] = {
+            term: _bitmask(numbers) if len(numbers) > dense else set(numbers)
+            for term, numbers in receipts_by_term.items()}
+        self.size_masks: Dict[int, int] = {size: _bitmask(numbers) for size, numbers in receipts_by_size.items()}
+
+    def add(self, receipt_id: UUID, term: str, delta: int):
+        number = self._number(receipt_id)
+        terms = self.receipt_terms[number]
+        before = terms[term]
+        after = max(before + delta, 0)
+
+        if after:
+            terms[term] = after
+        else:
+            terms.pop(term, None)
+
+        if (before > 0) != (after > 0):
+            self._post(term, number, after > 0)
+            self._resize(number, len(terms) + (-1 if after else 1), len(terms))
+
+    def remove_receipt(self, receipt_id: UUID):
+        # The number is not reused, the index is compacted by the next reload
+        number = self.numbers.pop(receipt_id, None)
+        if number is None:
+            return
+
+        terms = self.receipt_terms[number]
+        for term in terms:
+            self._post(term, number, False)
+        self._resize(number, len(terms), 0)
+        self.receipt_terms[number] = Counter()
+
+    def posting_mask(self, term: str) -> int:
+        posting = self.postings.get(term, 0)
+        return posting if isinstance(posting, int) else _bitmask(posting)
+
+    def _number(self, receipt_id: UUID) -> int:
+        number = self.numbers.get(receipt_id)
+        if number is None:
+            number = self.numbers[receipt_id] = len(self.receipt_ids)
+            self.receipt_ids.append(receipt_id)
+            self.receipt_terms.append(Counter())
+
+        return number
+
+    def _post(self, term: str, number: int, present: bool):
+        posting = self.postings.get(term, set())
+        if isinstance(posting, int):
+            posting = posting | 1 << number if present else posting & ~(1 << number)
+        elif present:
+            posting.add(number)
+        else:
+            posting.discard(number)
+
+        if posting:
+            self.postings[term] = posting
+        else:
+            self.postings.pop(term, None)
+
+    def _resize(self, number: int, before: int, after: int):
+        bit = 1 << number
+        if before:
+            self.size_masks[before] &= ~bit
+            if not self.size_masks[before]:
+                del self.size_masks[before]
+        if after:
+            self.size_masks[after] = self.size_masks.get(after, 0) | bit
+
+
+class IngredientIndex:
+    """
+    LRU of inverted ingredient indexes per user with a time to live
+    """
+
+    def __init__(self, max_users: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_users: Maximum number of user indexes kept in memory
+        :param ttl: Seconds after which the index of a user is loaded again
+        :param clock: Monotonic clock, can be replaced in tests
+        """
+        self._max_users = max_users
+        self._ttl = ttl
+        self._clock = clock
+        self._users: OrderedDict[UUID, Tuple[_UserIngredients, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match(self, user_id: UUID, on_hand: Iterable[str], max_missing: int, limit: int,
+              load: Callable[[], Iterable[Tuple[UUID, str]]]) -> List[Tuple[UUID, int, List[str]]]:
+        """
+        Receipts of a user ranked by the coverage of their ingredients with the ingredients on hand
+
+        The posting lists of the terms on hand are added up per receipt with bitwise operations, a receipt misses
+        the number of its terms minus its count. Only receipts using at least one ingredient on hand are returned.
+
+        :param user_id: UUID of user
+        :param on_hand: Ingredient names on hand
+        :param max_missing: Maximum number of missing ingredient terms per receipt
+        :param limit: Maximum number of receipts
+        :param load: Function returning all (receipt id, ingredient name) of the user, called if the index is
+            missing or expired
+        :return: (receipt id, number of matched terms, missing terms) ordered by missing terms, then coverage
+        """
+        terms = {normalize_ingredient(name) for name in on_hand}
+
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[1] > self._clock():
+                self._users.move_to_end(user_id)
+                return self._match(entry[0], terms, max_missing, limit)
+
+        # Loaded outside of the lock, lookups of other users are not blocked by the database
+        index = _UserIngredients((receipt_id, normalize_ingredient(name)) for receipt_id, name in load())
+
+        with self._lock:
+            self._users[user_id] = (index, self._clock() + self._ttl)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self._max_users:
+                self._users.popitem(last=False)
+
+            return self._match(index, terms, max_missing, limit)
+
+    def update(self, user_id: UUID, receipt_id: UUID, changes: Iterable[Tuple[str, int]]):
+        """
+        Change the ingredients of a receipt in a loaded index, users that are not loaded are skipped
+
+        :param user_id: UUID of the owner of the receipt
+        :param receipt_id: UUID of receipt
+        :param changes: (ingredient name, change of the number of ingredients with the name)
+        """
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+
+            for name, delta in changes:
+                entry[0].add(receipt_id, normalize_ingredient(name), delta)
+
+    def remove_receipts(self, user_id: UUID, receipt_ids: Iterable[UUID]):
+        """
+        Remove deleted receipts from a loaded index
+
+        :param user_id: UUID of the owner of the receipts
+        :param receipt_ids: UUIDs of receipts
+        """
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+
+            for receipt_id in receipt_ids:
+                entry[0].remove_receipt(receipt_id)
+
+    def invalidate(self, user_id: UUID):
+        """
+        Drop the index of a user, it is loaded again by the next lookup
+
+        :param user_id: UUID of user
+        """
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    @staticmethod
+    def _match(index: _UserIngredients, terms: Set[str], max_missing: int,
+               limit: int) -> List[Tuple[UUID, int, List[str]]]:
+        # Bit sliced counters: bit j of the number of matched terms of every receipt is in slices[j]
+        slices: List[int] = []
+        for term in terms:
+            carry = index.posting_mask(term)
+            position = 0
+            while carry:
+                if position == len(slices):
+                    slices.append(carry)
+                    break
+                slices[position], carry = slices[position] ^ carry, slices[position] & carry
+                position += 1
+
+        # Fewest missing terms first, then the largest receipts (highest coverage), then by id
+        results: List[Tuple[int, int]] = []
+        for missing in range(max_missing + 1):
+            for size in sorted(index.size_masks, reverse=True):
+                matched = size - missing
+                if matched <= 0 or matched >> len(slices):
+                    continue
+
+                receipts = index.size_masks[size]
+                for position, bits in enumerate(slices):
+                    receipts &= bits if matched >> position & 1 else ~bits
+                    if not receipts:
+                        break
+
+                if receipts:
+                    results.extend((number, matched)
+                                   for number in heapq.nsmallest(limit - len(results), _numbers(receipts),
+                                                                 key=index.receipt_ids.__getitem__))
+                    if len(results) == limit:
+                        break
+            if len(results) == limit:
+                break
+
+        return [(index.receipt_ids[number], matched,
+                 sorted(term for term in index.receipt_terms[number] if term not in terms))
+                for number, matched in results]
+
+
+# Ingredient terms of the receipts by user id
+ingredient_index = IngredientIndex(max_users=COOKABLE_MAX_USERS, ttl=COOKABLE_TTL)
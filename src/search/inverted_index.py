@@ -0,0 +1,226 @@
+"""
+    In-memory inverted index for the receipt search
+
+Pure python counterpart of the tsvector search of the database (SEARCH_BACKEND=memory). Words are lower cased and
+not stemmed like with the 'simple' text search configuration, a query matches the documents containing all of its
+words. The rank weights the occurrences by field with the defaults of ts_rank (A=1.0, B=0.4, C=0.2, D=0.1).
+
+Each worker process keeps the index of a user for SEARCH_TTL seconds. It is dropped after the commit of a write of
+the worker to the receipts of the user and built again by the next search, writes of the other workers are picked up
+after the ttl.
+"""
+import math
+import re
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from src.settings import SEARCH_TTL, SEARCH_MAX_USERS
+
+
+# Weight per field, in the order of the fields of a document
+FIELD_WEIGHTS: Tuple[float, ...] = (1.0, 0.4, 0.2, 0.1)
+
+# Words of a headline and words shown before the first match
+HEADLINE_WORDS = 20
+HEADLINE_LEAD_WORDS = 5
+
+_WORD = re.compile(r'\w+')
+
+# (document id, rank, headline)
+SearchMatch = Tuple[Hashable, float, str]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lower case words
+
+    :param text: Text
+    :return: Words in their order
+    """
+    return _WORD.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Inverted index of documents with weighted fields (e.g. title, description, ingredients, worksteps)
+
+    Postings map a word to the documents containing it and the number of occurrences per field.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {}
+        self._documents: Dict[Hashable, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, document_id: Hashable, fields: Sequence[Optional[str]]):
+        """
+        Add or replace a document
+
+        :param document_id: Id of the document
+        :param fields: Texts of the fields, weighted by their position (FIELD_WEIGHTS)
+        """
+        if len(fields) > len(FIELD_WEIGHTS):
+            raise ValueError(f'At most {len(FIELD_WEIGHTS)} fields are supported')
+
+        self.remove(document_id)
+
+        texts = tuple(field or '' for field in fields)
+        self._documents[document_id] = texts
+
+        for position, text in enumerate(texts):
+            for word in tokenize(text):
+                counts = self._postings.setdefault(word, {}).setdefault(document_id, [0] * len(FIELD_WEIGHTS))
+                counts[position] += 1
+
+    def remove(self, document_id: Hashable):
+        """
+        Remove a document, unknown ids are ignored
+
+        :param document_id: Id of the document
+        """
+        texts = self._documents.pop(document_id, None)
+        if texts is None:
+            return
+
+        for word in set(tokenize(' '.join(texts))):
+            documents = self._postings.get(word)
+            if documents is None:
+                continue
+
+            documents.pop(document_id, None)
+            if not documents:
+                del self._postings[word]
+
+    def search(self, query: str, after: Optional[Tuple[float, Hashable]] = None) -> List[SearchMatch]:
+        """
+        Find the documents containing all words of a query
+
+        :param query: Words separated by spaces or punctuation
+        :param after: (rank, id) of the last match of the previous page, only the matches ordered after it are returned
+        :return: Matches ordered by rank (descending), then by id
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+
+        # Intersect starting with the rarest word
+        postings = sorted((self._postings.get(word, {}) for word in words), key=len)
+        document_ids = set(postings[0])
+        for documents in postings[1:]:
+            document_ids.intersection_update(documents)
+            if not document_ids:
+                return []
+
+        matches: List[SearchMatch] = []
+        for document_id in document_ids:
+            rank = sum(math.log1p(sum(weight * count for weight, count in zip(FIELD_WEIGHTS, documents[document_id])))
+                       for documents in postings)
+            if after is not None and (rank > after[0] or (rank == after[0] and str(document_id) <= str(after[1]))):
+                continue
+
+            matches.append((document_id, rank, self.headline(document_id, words)))
+
+        matches.sort(key=lambda match: (-match[1], str(match[0])))
+        return matches
+
+    def headline(self, document_id: Hashable, words: Sequence[str]) -> str:
+        """
+        Excerpt of a document around the first match with the matched words marked by <b></b> (like ts_headline)
+
+        :param document_id: Id of the document
+        :param words: Lower case query words
+        :return: Excerpt
+        """
+        text = ' '.join(field for field in self._documents.get(document_id, ()) if field)
+        tokens = list(_WORD.finditer(text))
+        if not tokens:
+            return ''
+
+        words = set(words)
+        first = next((index for index, token in enumerate(tokens) if token.group().lower() in words), 0)
+        start = max(0, min(first - HEADLINE_LEAD_WORDS, len(tokens) - HEADLINE_WORDS))
+        window = tokens[start:start + HEADLINE_WORDS]
+
+        parts: List[str] = []
+        position = window[0].start()
+        for token in window:
+            parts.append(text[position:token.start()])
+            if token.group().lower() in words:
+                parts.append(f'<b>{token.group()}</b>')
+            else:
+                parts.append(token.group())
+            position = token.end()
+
+        return ''.join(parts)
+
+
+class SearchIndexCache:
+    """
+    LRU of inverted indexes per user with a time to live
+    """
+
+    def __init__(self, max_users: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_users: Maximum number of user indexes kept in memory
+        :param ttl: Seconds after which the index of a user is built again
+        :param clock: Monotonic clock, can be replaced in tests
+        """
+        self._max_users = max_users
+        self._ttl = ttl
+        self._clock = clock
+        self._indexes: OrderedDict[Hashable, Tuple[InvertedIndex, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, user_id: Hashable, query: str,
+               load: Callable[[], Iterable[Tuple[Hashable, Sequence[Optional[str]]]]],
+               after: Optional[Tuple[float, Hashable]] = None) -> List[SearchMatch]:
+        """
+        Find the documents of a user containing all words of a query
+
+        :param user_id: Id of the user
+        :param query: Words separated by spaces or punctuation
+        :param load: Function returning all (document id, fields) of the user, called if the index is missing or
+            expired
+        :param after: (rank, id) of the last match of the previous page
+        :return: Matches ordered by rank (descending), then by id
+        """
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is not None and entry[1] > self._clock():
+                self._indexes.move_to_end(user_id)
+                index = entry[0]
+            else:
+                index = None
+
+        if index is None:
+            # Built outside of the lock, searches of other users are not blocked by the database
+            index = InvertedIndex()
+            for document_id, fields in load():
+                index.add(document_id, fields)
+
+            with self._lock:
+                self._indexes[user_id] = (index, self._clock() + self._ttl)
+                self._indexes.move_to_end(user_id)
+                while len(self._indexes) > self._max_users:
+                    self._indexes.popitem(last=False)
+
+        # A cached index is not changed anymore, it is replaced as a whole
+        return index.search(query, after=after)
+
+    def invalidate(self, user_id: Hashable):
+        """
+        Drop the index of a user, it is built again by the next search
+
+        :param user_id: Id of the user
+        """
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+
+# Receipts by user id (title, description, ingredients, worksteps)
+search_indexes = SearchIndexCache(max_users=SEARCH_MAX_USERS, ttl=SEARCH_TTL)
@@ -0,0 +1,114 @@
+"""
+    Frequency ranked prefix trie for the autocomplete
+"""
+import heapq
+
+from itertools import islice
+
+from typing import Dict, List, Optional, Tuple
+
+
+# (negative count, key, display value), ordered by count (descending), then key
+_Entry = Tuple[int, str, str]
+
+
+class _Node:
+    __slots__ = ('children', 'count', 'display', 'best')
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.count: Optional[int] = None
+        self.display: Optional[str] = None
+        # Best entries of the subtree, computed on the first lookup after a change
+        self.best: Optional[List[_Entry]] = None
+
+
+class PrefixTrie:
+    """
+    Prefix trie of keys with a frequency, completions are the most frequent keys with the prefix
+
+    Every node caches the best `cache_size` entries of its subtree. A change only drops the caches on the path of
+    its key, the next lookup recomputes them from the (cached) children, so lookups and updates cost
+    O(len(key) * children) instead of a walk over the subtree. Not thread safe.
+    """
+
+    def __init__(self, cache_size: int = 50):
+        """
+        :param cache_size: Maximum number of completions a lookup can return
+        """
+        self._cache_size = cache_size
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: str, display: str, delta: int = 1):
+        """
+        Change the frequency of a key
+
+        A missing key is inserted (delta 0 inserts it with frequency 0), a key whose frequency drops to 0 or below
+        by a negative delta is removed.
+
+        :param key: Normalized key (e.g. lower case)
+        :param display: Value returned for the key if it is inserted
+        :param delta: Change of the frequency
+        """
+        path: List[Tuple[_Node, str]] = []
+        node = self._root
+        for char in key:
+            path.append((node, char))
+            child = node.children.get(char)
+            if child is None:
+                if delta < 0:
+                    return
+                child = node.children[char] = _Node()
+            node = child
+
+        if node.count is None:
+            if delta < 0:
+                return
+            node.count, node.display = 0, display
+            self._size += 1
+
+        node.count += delta
+        node.best = None
+        for parent, _ in path:
+            parent.best = None
+
+        if delta < 0 and node.count <= 0:
+            node.count = node.display = None
+            self._size -= 1
+            # Remove the nodes that lead to no key anymore
+            for parent, char in reversed(path):
+                child = parent.children[char]
+                if child.children or child.count is not None:
+                    break
+                del parent.children[char]
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """
+        Most frequent keys starting with a prefix
+
+        :param prefix: Normalized prefix
+        :param limit: Maximum number of completions (at most cache_size)
+        :return: (display value, frequency) ordered by frequency (descending), then key
+        """
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        return [(display, -negative_count) for negative_count, _, display in self._best(node, prefix)[:limit]]
+
+    def _best(self, node: _Node, key: str) -> List[_Entry]:
+        if node.best is None:
+            # The lists of the children are sorted, merging them stops after cache_size entries
+            sources: List[List[_Entry]] = [self._best(child, key + char) for char, child in node.children.items()]
+            if node.count is not None:
+                sources.append([(-node.count, key, node.display)])
+
+            node.best = list(islice(heapq.merge(*sources), self._cache_size))
+
+        return node.best
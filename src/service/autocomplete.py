@@ -0,0 +1,150 @@
+"""
+    Autocomplete endpoints
+"""
+from functools import partial
+
+from fastapi import status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from uuid import UUID
+from typing import Iterable, List, Tuple
+
+from src.api.models.auth import User
+from src.api.models.autocomplete import Completion, CompletionResponse
+from src.crud.autocomplete import read_ingredient_frequencies, read_tag_frequencies
+from src.database.database import on_commit
+from src.search.autocomplete import ingredient_completions, tag_completions, TAG_SCOPE
+from src.settings import AUTOCOMPLETE_BACKEND
+
+
+def serv_autocomplete_ingredients(request: Request,
+                                  db_session: Session,
+                                  user: User,
+                                  prefix: str,
+                                  limit: int) -> CompletionResponse:
+    """
+    Service to complete the ingredient names used in the receipts of the user
+
+    :param request: General request information
+    :param db_session: Database session
+    :param user: User information
+    :param prefix: Typed prefix of the name
+    :param limit: Maximum number of names
+    :return: API response model
+    """
+    try:
+        if AUTOCOMPLETE_BACKEND == 'postgres':
+            completions = read_ingredient_frequencies(db_session=db_session, user_id=user.id, prefix=prefix,
+                                                      limit=limit)
+        else:
+            completions = ingredient_completions.complete(user.id, prefix, limit,
+                                                          load=partial(read_ingredient_frequencies,
+                                                                       db_session=db_session,
+                                                                       user_id=user.id))
+
+        return _completion_response(request=request, completions=completions)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def serv_autocomplete_tags(request: Request,
+                           db_session: Session,
+                           prefix: str,
+                           limit: int) -> CompletionResponse:
+    """
+    Service to complete the tags, most used first
+
+    :param request: General request information
+    :param db_session: Database session
+    :param prefix: Typed prefix of the tag
+    :param limit: Maximum number of tags
+    :return: API response model
+    """
+    try:
+        if AUTOCOMPLETE_BACKEND == 'postgres':
+            completions = read_tag_frequencies(db_session=db_session, prefix=prefix, limit=limit)
+        else:
+            completions = tag_completions.complete(TAG_SCOPE, prefix, limit,
+                                                   load=partial(read_tag_frequencies, db_session=db_session))
+
+        return _completion_response(request=request, completions=completions)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def ingredients_changed(db_session: Session, user_id: UUID, added: Iterable[str] = (), removed: Iterable[str] = ()):
+    """
+    Count added and removed ingredient names of a user in the autocomplete after the commit
+
+    :param db_session: Database session
+    :param user_id: UUID of the owner of the receipt
+    :param added: Names of added ingredients (once per ingredient)
+    :param removed: Names of removed ingredients (once per ingredient)
+    """
+    on_commit(db_session, partial(ingredient_completions.update, user_id, _frequency_changes(added, removed)))
+
+
+def ingredients_reset(db_session: Session, user_id: UUID):
+    """
+    Reload the ingredient names of a user in the autocomplete after the commit (changes of whole receipts)
+
+    :param db_session: Database session
+    :param user_id: UUID of the owner of the receipts
+    """
+    on_commit(db_session, partial(ingredient_completions.invalidate, user_id))
+
+
+def tags_changed(db_session: Session, added: Iterable[str] = (), removed: Iterable[str] = (),
+                 created: Iterable[str] = ()):
+    """
+    Count added and removed tag links in the autocomplete after the commit
+
+    :param db_session: Database session
+    :param added: Tag names of created links
+    :param removed: Tag names of removed links, tags without links are removed from the autocomplete
+    :param created: Names of created tags (without links)
+    """
+    changes = [(tag, 0) for tag in created] + _frequency_changes(added, removed)
+    on_commit(db_session, partial(tag_completions.update, TAG_SCOPE, changes))
+
+
+def tags_reset(db_session: Session):
+    """
+    Reload the tags in the autocomplete after the commit
+
+    :param db_session: Database session
+    """
+    on_commit(db_session, partial(tag_completions.invalidate, TAG_SCOPE))
+
+
+def _completion_response(request: Request, completions: List[Tuple[str, int]]) -> CompletionResponse:
+    """
+    API response of completions
+
+    :param request: General request information
+    :param completions: (value, frequency)
+    :return: API response model
+    """
+    api_completions: List[Completion] = [Completion(value=value, frequency=frequency)
+                                         for value, frequency in completions]
+
+    return CompletionResponse(method=request.method,
+                              items=api_completions)
+
+
+def _frequency_changes(added: Iterable[str], removed: Iterable[str]) -> List[Tuple[str, int]]:
+    """
+    Changes of the frequencies, additions first so that a value that is removed and added again is kept
+
+    :param added: Added values
+    :param removed: Removed values
+    :return: (value, change)
+    """
+    return [(value, 1) for value in added] + [(value, -1) for value in removed]
@@ -0,0 +1,91 @@
+"""
+    Cookable receipts ("what can I cook?")
+"""
+from functools import partial
+
+from fastapi import status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from uuid import UUID
+from typing import Dict, Iterable, List
+
+from src.api.models.auth import User
+from src.api.models.receipts import CookableQuery, CookableReceipt, CookableResponse
+from src.crud.receipts import read_receipts_by_ids, read_user_ingredient_names
+from src.database.database import on_commit
+from src.database.models.receipts import ReceiptDB
+from src.search.ingredient_index import ingredient_index
+
+
+def serv_get_cookable_receipts(request: Request, db_session: Session, body: CookableQuery,
+                               user: User) -> CookableResponse:
+    """
+    Service to find the receipts of the user that can be cooked with the ingredients on hand
+
+    :param request: General request information
+    :param db_session: Database session
+    :param body: API query model
+    :param user: User information
+    :return: API response model, fewest missing ingredients first
+    """
+    try:
+        matches = ingredient_index.match(user.id, body.ingredients, body.max_missing, body.limit,
+                                         load=partial(read_user_ingredient_names, db_session=db_session,
+                                                      user_id=user.id))
+
+        receipt_ids: List[UUID] = [receipt_id for receipt_id, _, _ in matches]
+        db_receipts: Dict[UUID, ReceiptDB] = {db_receipt.id: db_receipt
+                                              for db_receipt in read_receipts_by_ids(db_session=db_session,
+                                                                                     receipt_ids=receipt_ids)}
+
+        api_receipts: List[CookableReceipt] = []
+
+        for receipt_id, matched, missing in matches:
+            # Receipts deleted by another worker stay in the index until it is reloaded
+            db_receipt = db_receipts.get(receipt_id)
+            if db_receipt is None or db_receipt.user_id != user.id:
+                continue
+
+            # One validation pass, the row values and the match are passed together
+            api_receipt: CookableReceipt = CookableReceipt.model_validate({'id': db_receipt.id,
+                                                                           'title': db_receipt.title,
+                                                                           'description': db_receipt.description,
+                                                                           'created_at': db_receipt.created_at,
+                                                                           'matched': matched,
+                                                                           'missing': missing})
+            api_receipts.append(api_receipt)
+
+        return CookableResponse(method=request.method,
+                                items=api_receipts)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def receipt_ingredients_changed(db_session: Session, user_id: UUID, receipt_id: UUID, added: Iterable[str] = (),
+                                removed: Iterable[str] = ()):
+    """
+    Change the ingredients of a receipt in the ingredient index after the commit
+
+    :param db_session: Database session
+    :param user_id: UUID of the owner of the receipt
+    :param receipt_id: UUID of receipt
+    :param added: Names of added ingredients (once per ingredient)
+    :param removed: Names of removed ingredients (once per ingredient)
+    """
+    changes = [(name, 1) for name in added] + [(name, -1) for name in removed]
+    on_commit(db_session, partial(ingredient_index.update, user_id, receipt_id, changes))
+
+
+def receipts_removed(db_session: Session, user_id: UUID, receipt_ids: List[UUID]):
+    """
+    Remove deleted receipts from the ingredient index after the commit
+
+    :param db_session: Database session
+    :param user_id: UUID of the owner of the receipts
+    :param receipt_ids: UUIDs of receipts
+    """
+    on_commit(db_session, partial(ingredient_index.remove_receipts, user_id, list(receipt_ids)))
@@ -3,6 +3,8 @@
 """
 import uuid
 
+from functools import partial
+
 from fastapi import status
 from sqlalchemy.orm import Session
 from starlette.responses import Response
@@ -13,17 +15,23 @@ from starlette.exceptions import HTTPException
 
 from src.api.models.auth import User
 from src.api.models.ingredients import (IngredientCreate,
+                                        IngredientBatchCreate,
                                         IngredientUpdate,
                                         IngredientResponse,
-                                        IngredientRead,
-                                        IngredientReadInDB)
+                                        IngredientRead)
 from src.database.models.ingredients import IngredientDB
 from src.database.models.receipts import ReceiptDB
 from src.crud.ingredients import (save_ingredient,
                                   read_ingredients_by_receipt,
                                   read_ingredient,
-                                  delete_ingredient)
+                                  delete_ingredient,
+                                  create_ingredients)
 from src.crud.receipts import read_receipt
+from src.database.database import on_commit
+from src.pdf.cache import pdf_cache
+from src.service.autocomplete import ingredients_changed
+from src.service.cookable import receipt_ingredients_changed
+from src.service.search import receipts_changed
 
 
 def serv_create_ingredient(request: Request, db_session: Session, body: IngredientCreate, user: User) -> IngredientResponse:
@@ -46,9 +54,13 @@ def serv_create_ingredient(request: Request, db_session: Session, body: Ingredie
         db_ingredient.id = uuid.uuid4()
 
         db_ingredient = save_ingredient(db_session=db_session, db_ingredient=db_ingredient)
+        on_commit(db_session, partial(pdf_cache.invalidate, db_ingredient.receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
+        ingredients_changed(db_session=db_session, user_id=user.id, added=[db_ingredient.ingredient])
+        receipt_ingredients_changed(db_session=db_session, user_id=user.id, receipt_id=db_ingredient.receipt_id,
+                                    added=[db_ingredient.ingredient])
 
-        tmp_ingredient: IngredientReadInDB = IngredientReadInDB.model_validate(db_ingredient)
-        api_ingredient: IngredientRead = IngredientRead(**tmp_ingredient.dict())
+        api_ingredient: IngredientRead = IngredientRead.model_validate(db_ingredient)
 
         return IngredientResponse(method=request.method,
                                   items=[api_ingredient])
@@ -59,6 +71,47 @@ def serv_create_ingredient(request: Request, db_session: Session, body: Ingredie
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def serv_create_ingredients_batch(request: Request, db_session: Session, receipt_id: UUID,
+                                  body: List[IngredientBatchCreate], user: User) -> IngredientResponse:
+    """
+    service to create several ingredients of a receipt in one transaction
+
+    :param body: API post models
+    :param receipt_id: UUID of receipt
+    :param request: General request information
+    :param db_session: Database session
+    :param user: User information
+    :return: API response model
+    """
+    try:
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=receipt_id)
+        if not db_receipt.user_id == user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
+
+        db_ingredients: List[IngredientDB] = create_ingredients(db_session=db_session,
+                                                                receipt_id=receipt_id,
+                                                                ingredients=[ingredient.dict(exclude={'receipt_id'})
+                                                                             for ingredient in body])
+
+        api_ingredients: List[IngredientRead] = [IngredientRead.model_validate(db_ingredient)
+                                                 for db_ingredient in db_ingredients]
+
+        on_commit(db_session, partial(pdf_cache.invalidate, receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
+        ingredients_changed(db_session=db_session, user_id=user.id,
+                            added=[db_ingredient.ingredient for db_ingredient in db_ingredients])
+        receipt_ingredients_changed(db_session=db_session, user_id=user.id, receipt_id=receipt_id,
+                                    added=[db_ingredient.ingredient for db_ingredient in db_ingredients])
+
+        return IngredientResponse(method=request.method,
+                                  items=api_ingredients)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 def serv_get_ingredient(request: Request, db_session: Session, uuid: UUID, user: User):
     """
     service to request an ingredient by id
@@ -72,13 +125,11 @@ def serv_get_ingredient(request: Request, db_session: Session, uuid: UUID, user:
     try:
         db_ingredient: IngredientDB = read_ingredient(db_session=db_session, uuid=uuid)
 
-        tmp_ingredient: IngredientReadInDB = IngredientReadInDB.model_validate(db_ingredient)
-
-        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=tmp_ingredient.receipt_id)
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=db_ingredient.receipt_id)
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
-        api_ingredient: IngredientRead = IngredientRead(**tmp_ingredient.dict())
+        api_ingredient: IngredientRead = IngredientRead.model_validate(db_ingredient)
 
         return IngredientResponse(method=request.method,
                                   items=[api_ingredient])
@@ -109,8 +160,7 @@ def serv_get_ingredients_by_receipt(request: Request, db_session: Session, recei
         api_ingredients: List[IngredientRead] = []
 
         for db_ingredient in db_ingredients:
-            tmp_ingredient: IngredientReadInDB = IngredientReadInDB.model_validate(db_ingredient)
-            api_ingredient: IngredientRead = IngredientRead(**tmp_ingredient.dict())
+            api_ingredient: IngredientRead = IngredientRead.model_validate(db_ingredient)
 
             api_ingredients.append(api_ingredient)
 
@@ -144,14 +194,22 @@ def serv_update_ingredient(request: Request, db_session: Session, uuid: UUID, bo
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
+        previous_name: str = db_ingredient.ingredient
+
         if patch_items:
             for key, value in patch_items.items():
                 setattr(db_ingredient, key, value)
 
         db_ingredient = save_ingredient(db_session=db_session, db_ingredient=db_ingredient)
+        on_commit(db_session, partial(pdf_cache.invalidate, db_ingredient.receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
+        if db_ingredient.ingredient != previous_name:
+            ingredients_changed(db_session=db_session, user_id=user.id, added=[db_ingredient.ingredient],
+                                removed=[previous_name])
+            receipt_ingredients_changed(db_session=db_session, user_id=user.id, receipt_id=db_ingredient.receipt_id,
+                                        added=[db_ingredient.ingredient], removed=[previous_name])
 
-        tmp_ingredient: IngredientReadInDB = IngredientReadInDB.model_validate(db_ingredient)
-        api_ingredient: IngredientRead = IngredientRead(**tmp_ingredient.dict())
+        api_ingredient: IngredientRead = IngredientRead.model_validate(db_ingredient)
 
         return IngredientResponse(method=request.method,
                                   items=[api_ingredient])
@@ -180,6 +238,11 @@ def serv_delete_ingredient(request: Request, db_session: Session, uuid: UUID, us
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
         delete_ingredient(db_session=db_session, db_ingredient=db_ingredient)
+        on_commit(db_session, partial(pdf_cache.invalidate, db_receipt.id))
+        receipts_changed(db_session=db_session, user_id=user.id)
+        ingredients_changed(db_session=db_session, user_id=user.id, removed=[db_ingredient.ingredient])
+        receipt_ingredients_changed(db_session=db_session, user_id=user.id, receipt_id=db_receipt.id,
+                                    removed=[db_ingredient.ingredient])
 
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
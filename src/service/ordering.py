@@ -0,0 +1,75 @@
+"""
+    Gap based order numbers of ordered rows
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
+
+
+def plan_order_numbers(current_order_numbers: List[Optional[int]], gap: int) -> List[int]:
+    """
+    Order numbers for rows in their new positions that change as few rows as possible
+
+    The longest run of rows whose current order numbers are already increasing keeps its numbers, the other rows get
+    numbers spread in the gaps between them. Without enough room all rows are spread by the gap.
+
+    :param current_order_numbers: Current order number per position, None for new rows
+    :param gap: Distance of the order numbers of neighbouring rows that are spread (e.g. WORKSTEP_ORDER_GAP)
+    :return: Order number per position
+    """
+    kept = _longest_increasing(current_order_numbers)
+    order_numbers: List[Optional[int]] = [order_number if position in kept else None
+                                          for position, order_number in enumerate(current_order_numbers)]
+
+    position = 0
+    while position < len(order_numbers):
+        if order_numbers[position] is not None:
+            position += 1
+            continue
+
+        end = position
+        while end < len(order_numbers) and order_numbers[end] is None:
+            end += 1
+
+        low = order_numbers[position - 1] if position > 0 else 0
+        count = end - position
+        if end < len(order_numbers):
+            step = (order_numbers[end] - low) // (count + 1)
+            if step < 1:
+                return [number * gap for number in range(1, len(order_numbers) + 1)]
+        else:
+            step = gap
+
+        for offset in range(count):
+            order_numbers[position + offset] = low + step * (offset + 1)
+        position = end
+
+    return order_numbers
+
+
+def _longest_increasing(values: List[Optional[int]]) -> Set[int]:
+    # Positions of a longest strictly increasing subsequence (patience sorting), None values are skipped
+    tail_values: List[int] = []
+    tail_positions: List[int] = []
+    predecessors: Dict[int, int] = {}
+
+    for position, value in enumerate(values):
+        if value is None or value <= 0:
+            continue
+
+        index = bisect_left(tail_values, value)
+        if index > 0:
+            predecessors[position] = tail_positions[index - 1]
+        if index == len(tail_values):
+            tail_values.append(value)
+            tail_positions.append(position)
+        else:
+            tail_values[index] = value
+            tail_positions[index] = position
+
+    kept: Set[int] = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        kept.add(position)
+        position = predecessors.get(position)
+
+    return kept
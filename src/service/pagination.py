@@ -0,0 +1,41 @@
+"""
+    Opaque cursors for keyset pagination
+"""
+import base64
+import json
+
+from fastapi import status
+from starlette.exceptions import HTTPException
+
+from typing import Any, List
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the sort values of the last row of a page into an opaque cursor
+
+    :param values: JSON serializable sort values
+    :return: Cursor string
+    """
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor created by encode_cursor
+
+    :param cursor: Cursor string from the client
+    :return: Sort values of the last row of the previous page
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+
+    if not isinstance(values, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+
+    return values
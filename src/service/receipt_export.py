@@ -0,0 +1,233 @@
+"""
+    Receipt export endpoints
+"""
+import logging
+import zipfile
+
+from fastapi import status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from typing import AsyncIterator, List, Set, Tuple
+from uuid import UUID
+
+from src.api.models.auth import User
+from src.api.models.ingredients import IngredientReadInDB
+from src.api.models.receipts import ReceiptExport, ReceiptReadInDB, ExportFormat
+from src.api.models.worksteps import WorkstepReadInDB
+from src.crud.receipts import read_receipt_owners, read_receipt_ids_by_tag, read_receipts_with_children
+from src.database.database import AnySession, open_session, release_connection, run_service
+from src.database.models.receipts import ReceiptDB
+from src.pdf.receipt_pdf import render_receipt_pdf, render_cookbook_pdf
+from src.pdf.render_service import pdf_renderer
+
+
+logger = logging.getLogger(__name__)
+
+# Receipts loaded per batch (three statements per batch)
+EXPORT_BATCH_SIZE = 100
+# Size of the chunks the single pdf export is streamed in
+EXPORT_CHUNK_SIZE = 64 * 1024
+# FPDF builds the whole document in memory, the single pdf export is limited (the zip export is not)
+EXPORT_PDF_MAX_RECEIPTS = 200
+
+ExportedReceipt = Tuple[ReceiptReadInDB, List[IngredientReadInDB], List[WorkstepReadInDB]]
+
+
+def serv_prepare_receipt_export(request: Request, db_session: Session, body: ReceiptExport,
+                                user: User) -> List[UUID]:
+    """
+    Service to resolve and check the receipts of an export
+
+    :param request: General request information
+    :param db_session: Database session
+    :param body: API export model
+    :param user: User information
+    :return: Receipt ids in export order
+    """
+    try:
+        if (body.ids is None) == (body.tag is None):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Either ids or tag has to be given')
+
+        if body.ids is not None:
+            receipt_ids: List[UUID] = list(dict.fromkeys(body.ids))
+
+            owners = read_receipt_owners(db_session=db_session, receipt_ids=receipt_ids)
+            missing = [str(receipt_id) for receipt_id in receipt_ids if receipt_id not in owners]
+            if missing:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail=f'Receipts with ids "{", ".join(missing)}" not found')
+            if any(owner_id != user.id for owner_id in owners.values()):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipts')
+
+        else:
+            receipt_ids = read_receipt_ids_by_tag(db_session=db_session, user_id=user.id, tag=body.tag.upper())
+            if not receipt_ids:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail=f'No receipts with tag "{body.tag.upper()}" found')
+
+        if body.format == ExportFormat.pdf and len(receipt_ids) > EXPORT_PDF_MAX_RECEIPTS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f'At most {EXPORT_PDF_MAX_RECEIPTS} receipts can be exported as one pdf, '
+                                       f'use the zip format for more')
+
+        return receipt_ids
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def serv_load_export_batch(db_session: Session, receipt_ids: List[UUID], user: User) -> List[ExportedReceipt]:
+    """
+    Service to load one batch of exported receipts with their ingredients and worksteps
+
+    Receipts deleted or changed hands since the export started are skipped.
+
+    :param db_session: Database session
+    :param receipt_ids: Receipt ids of the batch in export order
+    :param user: User information
+    :return: Receipts with ingredients and ordered worksteps in export order
+    """
+    db_receipts: List[ReceiptDB] = read_receipts_with_children(db_session=db_session, receipt_ids=receipt_ids)
+    db_receipts_by_id = {db_receipt.id: db_receipt for db_receipt in db_receipts}
+
+    receipts: List[ExportedReceipt] = []
+    for receipt_id in receipt_ids:
+        db_receipt = db_receipts_by_id.get(receipt_id)
+        if db_receipt is None or db_receipt.user_id != user.id:
+            continue
+
+        receipts.append((ReceiptReadInDB.model_validate(db_receipt),
+                         [IngredientReadInDB.model_validate(db_ingredient) for db_ingredient in db_receipt.ingredients],
+                         [WorkstepReadInDB.model_validate(db_workstep) for db_workstep in db_receipt.worksteps]))
+
+    return receipts
+
+
+async def serv_export_receipts(request: Request, db_session: AnySession, body: ReceiptExport,
+                               user: User) -> StreamingResponse:
+    """
+    Service to export receipts as one pdf (a chapter per receipt) or as a zip with a pdf per receipt
+
+    The response is streamed. The receipts are loaded in batches with a session of the stream (the session of the
+    request is closed before streaming starts), the pdfs are rendered in the render process pool. The zip is written
+    entry by entry, so only one receipt is held in memory at a time. The single pdf is rendered at once, it is
+    limited to EXPORT_PDF_MAX_RECEIPTS receipts.
+
+    :param request: General request information
+    :param db_session: Database session from get_db
+    :param body: API export model
+    :param user: User information
+    :return: Streamed pdf or zip
+    """
+    receipt_ids = await run_service(serv_prepare_receipt_export, request=request, db_session=db_session, body=body,
+                                    user=user)
+
+    # One render slot for the whole export, a full queue is rejected with 503 before streaming starts
+    pdf_renderer.acquire()
+
+    if body.format == ExportFormat.zip:
+        return _RenderSlotResponse(_zip_chunks(receipt_ids=receipt_ids, user=user), media_type='application/zip',
+                                   headers={'Content-Disposition': 'attachment;filename=cookbook.zip'})
+
+    return _RenderSlotResponse(_pdf_chunks(receipt_ids=receipt_ids, user=user), media_type='application/pdf',
+                               headers={'Content-Disposition': 'attachment;filename=cookbook.pdf'})
+
+
+class _RenderSlotResponse(StreamingResponse):
+    """
+    Streamed export holding a render slot of pdf_renderer until the response is finished
+
+    The slot is returned even if the body is never iterated (client disconnected, error before streaming).
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            pdf_renderer.release()
+
+
+async def _load_receipts(receipt_ids: List[UUID], user: User) -> AsyncIterator[ExportedReceipt]:
+    async with open_session() as db_session:
+        for start in range(0, len(receipt_ids), EXPORT_BATCH_SIZE):
+            batch = await run_service(serv_load_export_batch, db_session=db_session,
+                                      receipt_ids=receipt_ids[start:start + EXPORT_BATCH_SIZE], user=user)
+            # The connection is not needed while the batch is rendered
+            await release_connection(db_session)
+
+            for receipt in batch:
+                yield receipt
+
+
+async def _pdf_chunks(receipt_ids: List[UUID], user: User) -> AsyncIterator[bytes]:
+    try:
+        receipts = [receipt async for receipt in _load_receipts(receipt_ids=receipt_ids, user=user)]
+        # FPDF assembles the document in memory, it is rendered at once and streamed in chunks
+        pdf_bytes: bytes = await pdf_renderer.run(render_cookbook_pdf, receipts)
+        del receipts
+
+        for start in range(0, len(pdf_bytes), EXPORT_CHUNK_SIZE):
+            yield pdf_bytes[start:start + EXPORT_CHUNK_SIZE]
+
+    except Exception:
+        logger.exception('Receipt export failed')
+        raise
+
+
+async def _zip_chunks(receipt_ids: List[UUID], user: User) -> AsyncIterator[bytes]:
+    try:
+        output = _ChunkWriter()
+        file_names: Set[str] = set()
+
+        # The output is not seekable, zipfile writes data descriptors after the entries
+        with zipfile.ZipFile(output, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            async for receipt, ingredients, worksteps in _load_receipts(receipt_ids=receipt_ids, user=user):
+                pdf_bytes: bytes = await pdf_renderer.run(render_receipt_pdf, receipt, ingredients, worksteps)
+                archive.writestr(_unique_file_name(receipt.title, file_names), pdf_bytes)
+
+                yield output.drain()
+
+        yield output.drain()
+
+    except Exception:
+        logger.exception('Receipt export failed')
+        raise
+
+
+def _unique_file_name(title: str, file_names: Set[str]) -> str:
+    base_name = ''.join(char if char.isprintable() and char not in '/\\' else '_' for char in title) or 'receipt'
+
+    file_name = f'{base_name}.pdf'
+    counter = 1
+    while file_name in file_names:
+        counter += 1
+        file_name = f'{base_name} ({counter}).pdf'
+
+    file_names.add(file_name)
+    return file_name
+
+
+class _ChunkWriter:
+    """
+    Write-only file object collecting the written bytes until they are drained
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
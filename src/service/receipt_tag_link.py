@@ -1,3 +1,5 @@
+import re
+
 from fastapi import status
 from sqlalchemy.orm import Session
 from starlette.exceptions import HTTPException
@@ -6,18 +8,21 @@ from starlette.requests import Request
 from uuid import UUID
 from typing import List
 
-from src.api.models.tags import TagResponse, TagRead, TagReadInDB
+from src.api.models.tags import TagResponse, TagRead
 from src.api.models.auth import User
-from src.crud.tags import read_tag, delete_tag
+from src.crud.tags import read_tag, get_or_create_tags, delete_unused_tags
 from src.crud.receipts import read_receipt
 from src.crud.receipt_tag_link import (read_receipt_tag_link,
-                                       read_links_by_receipt,
-                                       read_receipts_by_link,
+                                       read_tags_by_receipt,
                                        save_receipt_tag_link,
-                                       delete_receipt_tag_link)
+                                       delete_receipt_tag_link,
+                                       create_receipt_tag_links,
+                                       delete_receipt_tag_links)
 from src.database.models.receipts import ReceiptDB
 from src.database.models.receipt_tag_link import ReceiptTagLinkDB
 from src.database.models.tags import TagDB
+from src.service.tags import TAG_PATTERN
+from src.service.autocomplete import tags_changed
 
 
 def serv_create_receipt_tag_link(request: Request, db_session: Session, receipt_id: UUID, tag_id: UUID, user: User):
@@ -44,6 +49,7 @@ def serv_create_receipt_tag_link(request: Request, db_session: Session, receipt_
         db_receipt_tag_link.tag_id = db_tag.id
 
         save_receipt_tag_link(db_session=db_session, db_link=db_receipt_tag_link)
+        tags_changed(db_session=db_session, added=[db_tag.tag])
 
         return Response(status_code=status.HTTP_201_CREATED, content='Linked')
 
@@ -76,11 +82,8 @@ def serv_delete_receipt_tag_link(request: Request, db_session: Session, receipt_
                                                                       tag_id=db_tag.id)
 
         delete_receipt_tag_link(db_session=db_session, db_link=db_receipt_tag_link)
-
-        db_receipt_tag_links: List[ReceiptTagLinkDB] = read_receipts_by_link(db_session=db_session, tag_id=db_tag.id)
-
-        if len(db_receipt_tag_links) == 0:
-            delete_tag(db_session=db_session, db_tag=db_tag)
+        delete_unused_tags(db_session=db_session, tag_ids=[db_tag.id])
+        tags_changed(db_session=db_session, removed=[db_tag.tag])
 
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -106,15 +109,12 @@ def serv_read_tags_by_receipt(request: Request, db_session: Session, receipt_id:
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
-        db_receipt_tag_links: List[ReceiptTagLinkDB] = read_links_by_receipt(db_session=db_session,
-                                                                             receipt_id=receipt_id)
+        db_tags: List[TagDB] = read_tags_by_receipt(db_session=db_session, receipt_id=receipt_id)
 
         api_tags: List[TagRead] = []
 
-        for db_receipt_tag_link in db_receipt_tag_links:
-            db_tag: TagDB = read_tag(db_session=db_session, uuid=db_receipt_tag_link.tag_id)
-            tmp_tag: TagReadInDB = TagReadInDB.model_validate(db_tag)
-            api_tag: TagRead = TagRead(**tmp_tag.dict())
+        for db_tag in db_tags:
+            api_tag: TagRead = TagRead.model_validate(db_tag)
             api_tags.append(api_tag)
 
         return TagResponse(method=request.method,
@@ -124,3 +124,70 @@ def serv_read_tags_by_receipt(request: Request, db_session: Session, receipt_id:
         raise HTTPException(status_code=err.status_code, detail=err.detail)
     except Exception:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def serv_set_receipt_tags(request: Request, db_session: Session, receipt_id: UUID, body: List[str],
+                          user: User) -> TagResponse:
+    """
+    Service to set the tags of a receipt by name
+
+    Unknown tags are created, the links are added and removed with one statement each and tags that are no longer
+    used are deleted, all in the transaction of the request. The receipt row is locked until the end of the transaction.
+
+    :param request: General request information
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param body: Tag names
+    :param user: User information
+    :return: API response model
+    """
+    try:
+        # The lock serializes concurrent requests for the receipt, each one reads the links committed by the last
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=receipt_id, for_update=True)
+
+        if not db_receipt.user_id == user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
+
+        db_tags: List[TagDB] = set_receipt_tags(db_session=db_session, receipt_id=receipt_id, tags=body)
+
+        return TagResponse(method=request.method,
+                           items=[TagRead.model_validate(db_tag) for db_tag in db_tags])
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def set_receipt_tags(db_session: Session, receipt_id: UUID, tags: List[str]) -> List[TagDB]:
+    """
+    Link exactly the given tags to a receipt
+
+    Unknown tags are created. Only the missing links are inserted and only the surplus links are deleted, with one
+    statement each. Unlinked tags that are not used by another receipt are deleted.
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :param tags: Tag names
+    :return: Linked tags ordered by name
+    """
+    for tag in tags:
+        if not re.match(TAG_PATTERN, tag):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Unallowed symbols in tag')
+
+    db_tags: List[TagDB] = get_or_create_tags(db_session=db_session, tags=[tag.upper() for tag in tags])
+
+    wanted_tags = {db_tag.id: db_tag.tag for db_tag in db_tags}
+    linked_tags = {db_tag.id: db_tag.tag for db_tag in read_tags_by_receipt(db_session=db_session,
+                                                                            receipt_id=receipt_id)}
+
+    unlinked_tag_ids = [tag_id for tag_id in linked_tags if tag_id not in wanted_tags]
+    new_tag_ids = [tag_id for tag_id in wanted_tags if tag_id not in linked_tags]
+    delete_receipt_tag_links(db_session=db_session, receipt_id=receipt_id, tag_ids=unlinked_tag_ids)
+    delete_unused_tags(db_session=db_session, tag_ids=unlinked_tag_ids)
+    create_receipt_tag_links(db_session=db_session, receipt_id=receipt_id, tag_ids=new_tag_ids)
+    tags_changed(db_session=db_session,
+                 added=[wanted_tags[tag_id] for tag_id in new_tag_ids],
+                 removed=[linked_tags[tag_id] for tag_id in unlinked_tag_ids])
+
+    return db_tags
@@ -1,37 +1,78 @@
 """
     Receipt endpoints
 """
+import re
+
+from functools import partial
 
 from fastapi import status
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException
 from starlette.responses import Response
 from starlette.requests import Request
+from datetime import datetime
 from uuid import UUID, uuid4
-from typing import List
+from typing import Any, List, Optional, Tuple, Union
 
 from src.database.models.ingredients import IngredientDB
 from src.database.models.worksteps import WorkstepDB
-from src.pdf.receipt_pdf import ReceiptPDF
+from src.pdf.receipt_pdf import PDF_LAYOUT_VERSION
+from src.pdf.cache import pdf_cache, pdf_cache_key
+from src.pdf.render_service import pdf_renderer
+from src.database.database import AnySession, run_service, release_connection, on_commit
 from src.api.models.auth import User
 from src.crud.receipts import (save_receipt,
-                               delete_receipt,
+                               delete_receipts,
                                read_receipt,
-                               read_receipts)
-from src.crud.ingredients import read_ingredients_by_receipt
-from src.crud.worksteps import read_worksteps_by_receipt
+                               read_receipt_owners,
+                               read_receipt_full,
+                               read_receipt_content_digest,
+                               read_receipts_page)
+from src.crud.ingredients import (read_ingredients_by_receipt,
+                                  create_ingredients,
+                                  update_ingredients,
+                                  delete_ingredients)
+from src.crud.worksteps import (read_worksteps_by_receipt,
+                                create_worksteps,
+                                update_worksteps,
+                                delete_worksteps,
+                                WORKSTEP_ORDER_GAP)
+from src.crud.tags import delete_unused_tags
+from src.crud.receipt_tag_link import read_tags_by_receipts
+from src.service.receipt_tag_link import set_receipt_tags
+from src.service.autocomplete import ingredients_changed, ingredients_reset, tags_changed
+from src.service.cookable import receipt_ingredients_changed, receipts_removed
+from src.service.search import receipts_changed
+from src.service.tags import TAG_PATTERN
+from src.service.ordering import plan_order_numbers
+from src.service.pagination import encode_cursor, decode_cursor
 
 from src.api.models.receipts import (ReceiptUpdate,
                                      ReceiptCreate,
                                      ReceiptResponse,
                                      ReceiptRead,
-                                     ReceiptReadInDB)
-
-from src.api.models.ingredients import IngredientReadInDB
-from src.api.models.worksteps import WorkstepReadInDB
+                                     ReceiptReadInDB,
+                                     ReceiptFullRead,
+                                     ReceiptFullResponse,
+                                     ReceiptListRead,
+                                     ReceiptFullUpdate,
+                                     ReceiptPageResponse,
+                                     ReceiptSort,
+                                     ReceiptDelete,
+                                     TagMatch)
+from src.api.models.general import SortOrder
+
+from src.api.models.ingredients import IngredientReadInDB, IngredientFullUpdate
+from src.api.models.worksteps import WorkstepReadInDB, WorkstepFullUpdate
 from src.database.models.receipts import ReceiptDB
 
 
+# Maximum number of tags in the tags filter of the receipt listing
+MAX_FILTER_TAGS = 20
+
+
 def serv_create_receipt(request: Request, db_session: Session, body: ReceiptCreate, user: User) -> ReceiptResponse:
     """
     # Service to create a receipt
@@ -48,9 +89,9 @@ def serv_create_receipt(request: Request, db_session: Session, body: ReceiptCrea
         db_receipt.user_id = user.id
 
         db_receipt = save_receipt(db_session=db_session, db_receipt=db_receipt)
+        receipts_changed(db_session=db_session, user_id=user.id)
 
-        tmp_receipt: ReceiptReadInDB = ReceiptReadInDB.from_orm(db_receipt)
-        api_receipt: ReceiptRead = ReceiptRead(**tmp_receipt.dict())
+        api_receipt: ReceiptRead = ReceiptRead.model_validate(db_receipt)
 
         return ReceiptResponse(method=request.method,
                                items=[api_receipt])
@@ -61,27 +102,73 @@ def serv_create_receipt(request: Request, db_session: Session, body: ReceiptCrea
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def serv_get_receipts(request: Request, db_session: Session, user: User) -> ReceiptResponse:
+def serv_get_receipts(request: Request,
+                      db_session: Session,
+                      user: User,
+                      limit: int,
+                      cursor: Optional[str] = None,
+                      sort: ReceiptSort = ReceiptSort.title,
+                      order: SortOrder = SortOrder.asc,
+                      title_prefix: Optional[str] = None,
+                      tag: Optional[str] = None,
+                      tags: Optional[str] = None,
+                      match: TagMatch = TagMatch.all) -> ReceiptPageResponse:
     """
-    # Service to request all receipts
+    # Service to request one page of the receipts of the user
 
     :param request: General request information
     :param db_session: Database session
     :param user: User information
+    :param limit: Maximum number of receipts in the page
+    :param cursor: Cursor of the previous page (nextCursor)
+    :param sort: Sort key
+    :param order: Sort direction
+    :param title_prefix: Only receipts whose title starts with the prefix
+    :param tag: Only receipts linked to this tag
+    :param tags: Comma separated tags, only receipts linked to all or any of them (match)
+    :param match: Receipts need all tags or one of them
     :return: API response model
     """
     try:
-        db_receipts: List[ReceiptDB] = read_receipts(db_session=db_session, user_id=user.id)
+        sort_column: str = 'created_at' if sort == ReceiptSort.created_at else 'title'
+
+        tag_names: Optional[List[str]] = _parse_tag_filter(tags) if tags else None
+
+        after: Optional[Tuple[Any, UUID]] = None
+        if cursor:
+            after = _decode_receipt_cursor(cursor=cursor, sort=sort)
+
+        db_receipts: List[ReceiptDB] = read_receipts_page(db_session=db_session,
+                                                          user_id=user.id,
+                                                          limit=limit + 1,
+                                                          sort_column=sort_column,
+                                                          descending=order == SortOrder.desc,
+                                                          after=after,
+                                                          title_prefix=title_prefix,
+                                                          tag=tag.upper() if tag else None,
+                                                          tags=tag_names,
+                                                          match_all=match == TagMatch.all)
+
+        next_cursor: Optional[str] = None
+        if len(db_receipts) > limit:
+            db_receipts = db_receipts[:limit]
+            last_receipt: ReceiptDB = db_receipts[-1]
+            next_cursor = encode_cursor([sort.value, getattr(last_receipt, sort_column), last_receipt.id])
+
+        # Tags of the whole page with one query, set as loaded so that reading them does not query per receipt
+        tags_by_receipt = read_tags_by_receipts(db_session=db_session,
+                                                receipt_ids=[db_receipt.id for db_receipt in db_receipts])
 
-        api_receipts: List[ReceiptRead] = []
+        api_receipts: List[ReceiptListRead] = []
 
         for db_receipt in db_receipts:
-            tmp_receipt: ReceiptReadInDB = ReceiptReadInDB.from_orm(db_receipt)
-            api_receipt: ReceiptRead = ReceiptRead(**tmp_receipt.dict())
+            set_committed_value(db_receipt, 'tags', tags_by_receipt[db_receipt.id])
+            api_receipt: ReceiptListRead = ReceiptListRead.model_validate(db_receipt)
             api_receipts.append(api_receipt)
 
-        return ReceiptResponse(method=request.method,
-                               items=api_receipts)
+        return ReceiptPageResponse(method=request.method,
+                                   items=api_receipts,
+                                   next_cursor=next_cursor)
 
     except HTTPException as err:
         raise HTTPException(status_code=err.status_code, detail=err.detail)
@@ -89,6 +176,49 @@ def serv_get_receipts(request: Request, db_session: Session, user: User) -> Rece
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _parse_tag_filter(tags: str) -> List[str]:
+    """
+    Parse the tags filter of the receipt listing
+
+    :param tags: Comma separated tag names
+    :return: Distinct upper case tag names
+    """
+    tag_names: List[str] = list(dict.fromkeys(tag.strip().upper() for tag in tags.split(',') if tag.strip()))
+
+    if not tag_names or len(tag_names) > MAX_FILTER_TAGS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f'Between 1 and {MAX_FILTER_TAGS} tags can be filtered')
+    for tag in tag_names:
+        if not re.match(TAG_PATTERN, tag):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Unallowed symbols in tag')
+
+    return tag_names
+
+
+def _decode_receipt_cursor(cursor: str, sort: ReceiptSort) -> Tuple[Any, UUID]:
+    """
+    Decode the cursor of the receipt listing
+
+    :param cursor: Cursor string from the client
+    :param sort: Sort key of the current request
+    :return: (sort value, id) of the last receipt of the previous page
+    """
+    values = decode_cursor(cursor)
+
+    try:
+        cursor_sort, sort_value, receipt_id = values
+        if cursor_sort != sort.value:
+            raise ValueError('Cursor belongs to another sort key')
+
+        if sort == ReceiptSort.created_at:
+            sort_value = datetime.fromisoformat(sort_value)
+
+        return sort_value, UUID(receipt_id)
+
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+
+
 def serv_get_receipt(request: Request, db_session: Session, uuid: UUID, user: User) -> ReceiptResponse:
     """
     # Service to request a receipt by id
@@ -104,8 +234,7 @@ def serv_get_receipt(request: Request, db_session: Session, uuid: UUID, user: Us
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
-        tmp_receipt: ReceiptReadInDB = ReceiptReadInDB.from_orm(db_receipt)
-        api_receipt: ReceiptRead = ReceiptRead(**tmp_receipt.dict())
+        api_receipt: ReceiptRead = ReceiptRead.model_validate(db_receipt)
 
         return ReceiptResponse(method=request.method,
                                items=[api_receipt])
@@ -116,48 +245,109 @@ def serv_get_receipt(request: Request, db_session: Session, uuid: UUID, user: Us
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def serv_get_receipt_pdf(request: Request, db_session: Session, uuid: UUID, user: User):
+def serv_get_receipt_full(request: Request, db_session: Session, uuid: UUID, user: User) -> ReceiptFullResponse:
     """
-    Service to generate a pdf of receipt
+    # Service to request a receipt with its ingredients, worksteps and tags
 
+    :param uuid: UUID of receipt
     :param request: General request information
     :param db_session: Database session
-    :param uuid: UUID of receipt
     :param user: User information
-    :return: PDF File
+    :return: API response model
     """
     try:
-        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=uuid)
+        db_receipt: ReceiptDB = read_receipt_full(db_session=db_session, uuid=uuid)
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
+        api_receipt: ReceiptFullRead = ReceiptFullRead.model_validate(db_receipt)
+
+        return ReceiptFullResponse(method=request.method,
+                                   items=[api_receipt])
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+
+    return False
+
+
+def serv_prepare_receipt_pdf(request: Request, db_session: Session, uuid: UUID,
+                             user: User) -> Union[Response, Tuple[dict, str, ReceiptReadInDB]]:
+    """
+    Service to check the ETag of a receipt pdf and load the receipt
+
+    Rendered pdfs are cached by a digest of the receipt content, which is also sent as ETag. Requests with a matching
+    If-None-Match header are answered with 304 Not Modified.
+
+    :param request: General request information
+    :param db_session: Database session
+    :param uuid: UUID of receipt
+    :param user: User information
+    :return: Final response (304) or response headers, cache key and the receipt
+    """
+    try:
+        owner_id, content_digest = read_receipt_content_digest(db_session=db_session, uuid=uuid)
+        if not owner_id == user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
+
+        digest = f'{PDF_LAYOUT_VERSION}.{content_digest}'
+        headers = {'ETag': f'"{digest}"', 'Cache-Control': 'private, no-cache'}
+
+        if _etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=uuid)
         tmp_receipt: ReceiptReadInDB = ReceiptReadInDB.from_orm(db_receipt)
+        headers['Content-Disposition'] = f'attachment;filename={tmp_receipt.title}.pdf'
+
+        return headers, pdf_cache_key(receipt_id=uuid, digest=digest), tmp_receipt
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception as err:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+def serv_read_receipt_pdf_content(db_session: Session,
+                                  receipt_id: UUID) -> Tuple[List[IngredientReadInDB], List[WorkstepReadInDB]]:
+    """
+    Service to load the ingredients and worksteps for the pdf of a receipt
+
+    :param db_session: Database session
+    :param receipt_id: UUID of receipt
+    :return: Ingredients and worksteps in order
+    """
+    try:
         ingredients: List[IngredientReadInDB] = []
 
         db_ingredients: List[IngredientDB] = read_ingredients_by_receipt(db_session=db_session,
-                                                                         receipt_id=tmp_receipt.id)
+                                                                         receipt_id=receipt_id)
 
         for tmp_ingredient in db_ingredients:
             ingredients.append(IngredientReadInDB.from_orm(tmp_ingredient))
 
         worksteps: List[WorkstepReadInDB] = []
 
-        db_worksteps: List[WorkstepDB] = read_worksteps_by_receipt(db_session=db_session, receipt_id=tmp_receipt.id)
+        db_worksteps: List[WorkstepDB] = read_worksteps_by_receipt(db_session=db_session, receipt_id=receipt_id)
 
         for tmp_workstep in db_worksteps:
             worksteps.append(WorkstepReadInDB.from_orm(tmp_workstep))
 
-        receipt_pdf = ReceiptPDF()
-        receipt_pdf.add_page()
-        receipt_pdf.chapter_title(title=tmp_receipt.title)
-        receipt_pdf.chapter_description(description=tmp_receipt.description)
-        receipt_pdf.chapter_ingredients(ingredients=ingredients)
-        receipt_pdf.chapter_worksteps(worksteps=worksteps)
+        worksteps.sort(key=lambda workstep: workstep.order_number)
 
-        pdf_bytes = receipt_pdf.output(dest='S').encode('latin1')
-        return Response(content=pdf_bytes, media_type="application/pdf",
-                        headers={"Content-Disposition": f"attachment;filename={tmp_receipt.title}.pdf"})
+        return ingredients, worksteps
 
     except HTTPException as err:
         raise HTTPException(status_code=err.status_code, detail=err.detail)
@@ -165,6 +355,49 @@ def serv_get_receipt_pdf(request: Request, db_session: Session, uuid: UUID, user
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def serv_get_receipt_pdf(request: Request, db_session: AnySession, uuid: UUID, user: User) -> Response:
+    """
+    Service to generate a pdf of receipt
+
+    The data is loaded with the database session of the request, the pdf is rendered in the render process pool.
+    The disk cache is read and written in the thread pool.
+
+    :param request: General request information
+    :param db_session: Database session from get_db
+    :param uuid: UUID of receipt
+    :param user: User information
+    :return: PDF File
+    """
+    prepared = await run_service(serv_prepare_receipt_pdf, request=request, db_session=db_session, uuid=uuid,
+                                 user=user)
+    if isinstance(prepared, Response):
+        return prepared
+
+    headers, cache_key, receipt = prepared
+
+    pdf_bytes = await run_in_threadpool(pdf_cache.get, cache_key)
+    if pdf_bytes is not None:
+        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+    ingredients, worksteps = await run_service(serv_read_receipt_pdf_content, db_session=db_session,
+                                               receipt_id=receipt.id)
+
+    # The connection is not needed while waiting for a render process
+    await release_connection(db_session)
+
+    try:
+        pdf_bytes = await pdf_renderer.render(receipt=receipt, ingredients=ingredients, worksteps=worksteps)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail, headers=err.headers)
+    except Exception as err:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    await run_in_threadpool(pdf_cache.set, cache_key, pdf_bytes)
+
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+
 def serv_update_receipt(request: Request, db_session: Session, uuid: UUID, body: ReceiptUpdate,
                         user: User) -> ReceiptResponse:
     """
@@ -189,9 +422,10 @@ def serv_update_receipt(request: Request, db_session: Session, uuid: UUID, body:
                 setattr(db_receipt, key, value)
 
         db_receipt = save_receipt(db_session=db_session, db_receipt=db_receipt)
+        on_commit(db_session, partial(pdf_cache.invalidate, db_receipt.id))
+        receipts_changed(db_session=db_session, user_id=user.id)
 
-        tmp_receipt: ReceiptReadInDB = ReceiptReadInDB.from_orm(db_receipt)
-        api_receipt: ReceiptRead = ReceiptRead(**tmp_receipt.dict())
+        api_receipt: ReceiptRead = ReceiptRead.model_validate(db_receipt)
 
         return ReceiptResponse(method=request.method,
                                items=[api_receipt])
@@ -202,6 +436,128 @@ def serv_update_receipt(request: Request, db_session: Session, uuid: UUID, body:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def serv_replace_receipt_full(request: Request, db_session: Session, uuid: UUID, body: ReceiptFullUpdate,
+                              user: User) -> ReceiptFullResponse:
+    """
+    Service to replace a receipt with its ingredients, worksteps and tags in one transaction
+
+    The new state is compared with the stored rows, only the differences are written: one bulk INSERT, UPDATE and
+    DELETE per table at most. Ingredients and worksteps without id are created, stored ones missing in the body are
+    removed.
+
+    :param request: General request information
+    :param db_session: Database session
+    :param uuid: UUID of receipt
+    :param body: API put model
+    :param user: User information
+    :return: API response model
+    """
+    try:
+        # The lock keeps concurrent workstep appends and moves out until the new state is committed
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=uuid, for_update=True)
+        if not db_receipt.user_id == user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
+
+        if db_receipt.title != body.title or db_receipt.description != body.description:
+            db_receipt.title = body.title
+            db_receipt.description = body.description
+            db_session.flush()
+
+        added, removed = _apply_ingredients(db_session=db_session, receipt_id=uuid, ingredients=body.ingredients)
+        ingredients_changed(db_session=db_session, user_id=user.id, added=added, removed=removed)
+        receipt_ingredients_changed(db_session=db_session, user_id=user.id, receipt_id=uuid, added=added,
+                                    removed=removed)
+        _apply_worksteps(db_session=db_session, receipt_id=uuid, worksteps=body.worksteps)
+        set_receipt_tags(db_session=db_session, receipt_id=uuid, tags=body.tags)
+
+        on_commit(db_session, partial(pdf_cache.invalidate, uuid))
+        receipts_changed(db_session=db_session, user_id=user.id)
+
+        db_receipt = read_receipt_full(db_session=db_session, uuid=uuid)
+
+        return ReceiptFullResponse(method=request.method,
+                                   items=[ReceiptFullRead.model_validate(db_receipt)])
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _check_child_ids(body_ids: List[UUID], stored_ids: set, name: str):
+    if len(set(body_ids)) != len(body_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'Duplicate {name} ids')
+
+    unknown = [str(child_id) for child_id in body_ids if child_id not in stored_ids]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f'{name.capitalize()}s "{", ".join(unknown)}" are not part of the receipt')
+
+
+def _apply_ingredients(db_session: Session, receipt_id: UUID,
+                       ingredients: List[IngredientFullUpdate]) -> Tuple[List[str], List[str]]:
+    """
+    Write the differences of the ingredients, returns the added and removed ingredient names (for the autocomplete)
+    """
+    db_ingredients = {db_ingredient.id: db_ingredient
+                      for db_ingredient in read_ingredients_by_receipt(db_session=db_session, receipt_id=receipt_id)}
+    _check_child_ids([ingredient.id for ingredient in ingredients if ingredient.id is not None],
+                     set(db_ingredients), 'ingredient')
+
+    changed: List[dict] = []
+    created: List[dict] = []
+    added_names: List[str] = []
+    removed_names: List[str] = []
+    for ingredient in ingredients:
+        values = ingredient.dict(include={'amount', 'unit', 'ingredient'})
+        db_ingredient = db_ingredients.get(ingredient.id)
+        if db_ingredient is None:
+            created.append(values)
+            added_names.append(ingredient.ingredient)
+        elif any(getattr(db_ingredient, key) != value for key, value in values.items()):
+            changed.append({**values, 'id': ingredient.id})
+            if db_ingredient.ingredient != ingredient.ingredient:
+                added_names.append(ingredient.ingredient)
+                removed_names.append(db_ingredient.ingredient)
+
+    kept_ids = {ingredient.id for ingredient in ingredients}
+    deleted_ids = [ingredient_id for ingredient_id in db_ingredients if ingredient_id not in kept_ids]
+    removed_names.extend(db_ingredients[ingredient_id].ingredient for ingredient_id in deleted_ids)
+
+    delete_ingredients(db_session=db_session, ingredient_ids=deleted_ids)
+    update_ingredients(db_session=db_session, ingredients=changed)
+    create_ingredients(db_session=db_session, receipt_id=receipt_id, ingredients=created)
+
+    return added_names, removed_names
+
+
+def _apply_worksteps(db_session: Session, receipt_id: UUID, worksteps: List[WorkstepFullUpdate]):
+    db_worksteps = {db_workstep.id: db_workstep
+                    for db_workstep in read_worksteps_by_receipt(db_session=db_session, receipt_id=receipt_id)}
+    _check_child_ids([workstep.id for workstep in worksteps if workstep.id is not None],
+                     set(db_worksteps), 'workstep')
+
+    order_numbers = plan_order_numbers([db_worksteps[workstep.id].order_number if workstep.id is not None else None
+                                        for workstep in worksteps], gap=WORKSTEP_ORDER_GAP)
+
+    changed: List[dict] = []
+    created: List[dict] = []
+    for workstep, order_number in zip(worksteps, order_numbers):
+        values = {'order_number': order_number, 'workstep': workstep.workstep}
+        db_workstep = db_worksteps.get(workstep.id)
+        if db_workstep is None:
+            created.append(values)
+        elif db_workstep.order_number != order_number or db_workstep.workstep != workstep.workstep:
+            changed.append({**values, 'id': workstep.id})
+
+    kept_ids = {workstep.id for workstep in worksteps}
+    # Removed worksteps first, their order numbers may be taken by the updated and created ones
+    delete_worksteps(db_session=db_session,
+                     workstep_ids=[workstep_id for workstep_id in db_worksteps if workstep_id not in kept_ids])
+    update_worksteps(db_session=db_session, worksteps=changed)
+    create_worksteps(db_session=db_session, receipt_id=receipt_id, worksteps=created)
+
+
 def serv_delete_receipt(request: Request, db_session: Session, uuid: UUID, user: User):
     """
     # Service to remove a receipt
@@ -217,7 +573,53 @@ def serv_delete_receipt(request: Request, db_session: Session, uuid: UUID, user:
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
-        delete_receipt(db_session=db_session, db_receipt=db_receipt)
+        unlinked_tags: List[Tuple[UUID, str]] = delete_receipts(db_session=db_session, receipt_ids=[uuid])
+        delete_unused_tags(db_session=db_session, tag_ids=list({tag_id for tag_id, _ in unlinked_tags}))
+        on_commit(db_session, partial(pdf_cache.invalidate, uuid))
+        receipts_changed(db_session=db_session, user_id=user.id)
+        ingredients_reset(db_session=db_session, user_id=user.id)
+        receipts_removed(db_session=db_session, user_id=user.id, receipt_ids=[uuid])
+        tags_changed(db_session=db_session, removed=[tag for _, tag in unlinked_tags])
+
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def serv_delete_receipts(request: Request, db_session: Session, body: ReceiptDelete, user: User):
+    """
+    # Service to remove several receipts in one transaction
+
+    Nothing is deleted if one of the receipts does not exist or belongs to another user.
+
+    :param body: API delete model
+    :param request: General request information
+    :param db_session: Database session
+    :param user: User information
+    :return: API response model
+    """
+    try:
+        receipt_ids: List[UUID] = list(dict.fromkeys(body.ids))
+
+        owners = read_receipt_owners(db_session=db_session, receipt_ids=receipt_ids)
+        missing = [str(receipt_id) for receipt_id in receipt_ids if receipt_id not in owners]
+        if missing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f'Receipts with ids "{", ".join(missing)}" not found')
+        if any(owner_id != user.id for owner_id in owners.values()):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipts')
+
+        unlinked_tags: List[Tuple[UUID, str]] = delete_receipts(db_session=db_session, receipt_ids=receipt_ids)
+        delete_unused_tags(db_session=db_session, tag_ids=list({tag_id for tag_id, _ in unlinked_tags}))
+        for receipt_id in receipt_ids:
+            on_commit(db_session, partial(pdf_cache.invalidate, receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
+        ingredients_reset(db_session=db_session, user_id=user.id)
+        receipts_removed(db_session=db_session, user_id=user.id, receipt_ids=receipt_ids)
+        tags_changed(db_session=db_session, removed=[tag for _, tag in unlinked_tags])
 
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
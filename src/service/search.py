@@ -0,0 +1,159 @@
+"""
+    Search endpoints
+"""
+from functools import partial
+
+from fastapi import status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from uuid import UUID
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from src.api.models.auth import User
+from src.api.models.search import SearchHit, SearchResponse
+from src.crud.receipts import read_user_receipts_with_children, read_receipts_by_ids
+from src.crud.search import search_receipts
+from src.database.database import on_commit
+from src.database.models.receipts import ReceiptDB
+from src.search.inverted_index import search_indexes
+from src.service.pagination import encode_cursor, decode_cursor
+from src.settings import SEARCH_BACKEND
+
+
+def serv_search_receipts(request: Request,
+                         db_session: Session,
+                         user: User,
+                         query: str,
+                         limit: int,
+                         cursor: Optional[str] = None) -> SearchResponse:
+    """
+    Service to search the receipts of the user by title, description, ingredients and worksteps
+
+    :param request: General request information
+    :param db_session: Database session
+    :param user: User information
+    :param query: Search query
+    :param limit: Maximum number of receipts in the page
+    :param cursor: Cursor of the previous page (nextCursor)
+    :return: API response model
+    """
+    try:
+        after: Optional[Tuple[float, UUID]] = None
+        if cursor:
+            after = _decode_search_cursor(cursor=cursor)
+
+        if SEARCH_BACKEND == 'memory':
+            results = _search_in_memory(db_session=db_session, user_id=user.id, query=query, limit=limit + 1,
+                                        after=after)
+        else:
+            results = search_receipts(db_session=db_session, user_id=user.id, query=query, limit=limit + 1,
+                                      after=after)
+
+        next_cursor: Optional[str] = None
+        if len(results) > limit:
+            results = results[:limit]
+            last_receipt, last_rank, _ = results[-1]
+            next_cursor = encode_cursor([last_rank, last_receipt.id])
+
+        api_hits: List[SearchHit] = []
+
+        for db_receipt, rank, headline in results:
+            # One validation pass, the row values and the ranking are passed together
+            api_hit: SearchHit = SearchHit.model_validate({'id': db_receipt.id,
+                                                           'title': db_receipt.title,
+                                                           'description': db_receipt.description,
+                                                           'created_at': db_receipt.created_at,
+                                                           'rank': rank,
+                                                           'headline': headline})
+            api_hits.append(api_hit)
+
+        return SearchResponse(method=request.method,
+                              items=api_hits,
+                              next_cursor=next_cursor)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _search_in_memory(db_session: Session,
+                      user_id: UUID,
+                      query: str,
+                      limit: int,
+                      after: Optional[Tuple[float, UUID]] = None) -> List[Tuple[ReceiptDB, float, str]]:
+    """
+    Search the receipts of a user with the inverted index of the user (SEARCH_BACKEND=memory)
+
+    The index is built from all receipts of the user on the first search and kept for SEARCH_TTL seconds, only the
+    receipts of the page are read afterwards.
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :param query: Search query, words that all have to be contained
+    :param limit: Maximum number of rows
+    :param after: (rank, id) of the last row of the previous page
+    :return: Database objects with rank and headline ordered like search_receipts
+    """
+    matches = search_indexes.search(user_id, query,
+                                    load=partial(_read_search_documents, db_session=db_session, user_id=user_id),
+                                    after=after)
+
+    results: List[Tuple[ReceiptDB, float, str]] = []
+    position = 0
+    while len(results) < limit and position < len(matches):
+        page = matches[position:position + limit - len(results)]
+        position += len(page)
+
+        # Receipts deleted by another worker are still in the index until it expires
+        db_receipts = {db_receipt.id: db_receipt
+                       for db_receipt in read_receipts_by_ids(db_session=db_session,
+                                                              receipt_ids=[receipt_id for receipt_id, _, _ in page])}
+        results.extend((db_receipts[receipt_id], rank, headline)
+                       for receipt_id, rank, headline in page if receipt_id in db_receipts)
+
+    return results
+
+
+def _read_search_documents(db_session: Session, user_id: UUID) -> Iterator[Tuple[UUID, Sequence[Optional[str]]]]:
+    """
+    Searchable fields of all receipts of a user
+
+    :param db_session: Database session
+    :param user_id: UUID of user
+    :return: (receipt id, [title, description, ingredients, worksteps])
+    """
+    for db_receipt in read_user_receipts_with_children(db_session=db_session, user_id=user_id):
+        yield db_receipt.id, [db_receipt.title,
+                              db_receipt.description,
+                              ' '.join(db_ingredient.ingredient for db_ingredient in db_receipt.ingredients),
+                              ' '.join(db_workstep.workstep for db_workstep in db_receipt.worksteps)]
+
+
+def receipts_changed(db_session: Session, user_id: UUID):
+    """
+    Drop the search index of a user after the commit (created, changed or deleted receipts, ingredients and
+    worksteps)
+
+    :param db_session: Database session
+    :param user_id: UUID of the owner of the receipts
+    """
+    on_commit(db_session, partial(search_indexes.invalidate, user_id))
+
+
+def _decode_search_cursor(cursor: str) -> Tuple[float, UUID]:
+    """
+    Decode the cursor of the search
+
+    :param cursor: Cursor string from the client
+    :return: (rank, id) of the last receipt of the previous page
+    """
+    values = decode_cursor(cursor)
+
+    try:
+        rank, receipt_id = values
+        return float(rank), UUID(receipt_id)
+
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
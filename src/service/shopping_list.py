@@ -0,0 +1,98 @@
+"""
+    Shopping list endpoints
+"""
+from fastapi import status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from uuid import UUID
+from typing import Dict, List, Tuple
+
+from src.api.models.auth import User
+from src.api.models.shopping_list import ShoppingListCreate, ShoppingListItem, ShoppingListResponse
+from src.crud.ingredients import read_ingredient_totals
+from src.crud.receipts import read_receipt_owners
+
+
+# Units of a family by base unit, from the largest; amounts are shown in the largest unit they reach
+UNIT_FAMILIES: Dict[str, List[Tuple[str, float]]] = {
+    'g': [('kg', 1000.0), ('g', 1.0)],
+    'ml': [('l', 1000.0), ('ml', 1.0)],
+    'tsp': [('tbsp', 3.0), ('tsp', 1.0)],
+}
+
+# Spellings of the units (lower case), German ones included
+UNIT_SPELLINGS: Dict[str, List[str]] = {
+    'g': ['g', 'gr', 'gram', 'grams', 'gramm'],
+    'kg': ['kg', 'kilo', 'kilogram', 'kilograms', 'kilogramm'],
+    'ml': ['ml', 'milliliter', 'millilitre', 'milliliters', 'millilitres'],
+    'l': ['l', 'liter', 'litre', 'liters', 'litres'],
+    'tsp': ['tsp', 'teaspoon', 'teaspoons', 'tl', 'teelöffel'],
+    'tbsp': ['tbsp', 'tablespoon', 'tablespoons', 'el', 'esslöffel'],
+}
+
+# (spelling, base unit, factor to the base unit) for the database
+UNIT_CONVERSIONS: List[Tuple[str, str, float]] = [(spelling, base_unit, factor)
+                                                  for base_unit, units in UNIT_FAMILIES.items()
+                                                  for unit, factor in units
+                                                  for spelling in UNIT_SPELLINGS[unit]]
+
+
+def serv_create_shopping_list(request: Request, db_session: Session, body: ShoppingListCreate,
+                              user: User) -> ShoppingListResponse:
+    """
+    Service to combine the ingredients of several receipts into one shopping list
+
+    The amounts are multiplied with the servings and summed per ingredient and unit family by one statement.
+    Nothing is returned if one of the receipts does not exist or belongs to another user.
+
+    :param request: General request information
+    :param db_session: Database session
+    :param body: API post model
+    :param user: User information
+    :return: API response model, ordered by ingredient
+    """
+    try:
+        servings: Dict[UUID, float] = {}
+        for receipt in body.receipts:
+            servings[receipt.receipt_id] = servings.get(receipt.receipt_id, 0.0) + receipt.servings
+
+        owners = read_receipt_owners(db_session=db_session, receipt_ids=list(servings))
+        missing = [str(receipt_id) for receipt_id in servings if receipt_id not in owners]
+        if missing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f'Receipts with ids "{", ".join(missing)}" not found')
+        if any(owner_id != user.id for owner_id in owners.values()):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipts')
+
+        api_items: List[ShoppingListItem] = []
+
+        for ingredient, base_unit, amount, receipt_count in read_ingredient_totals(db_session=db_session,
+                                                                                   servings=servings,
+                                                                                   units=UNIT_CONVERSIONS):
+            amount, unit = _display_amount(amount=amount, base_unit=base_unit)
+            api_items.append(ShoppingListItem(ingredient=ingredient, amount=amount, unit=unit,
+                                              receipt_count=receipt_count))
+
+        return ShoppingListResponse(method=request.method,
+                                    items=api_items)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _display_amount(amount: float, base_unit: str) -> Tuple[float, str]:
+    """
+    Amount in the largest unit of its family that it reaches, rounded to two decimals
+
+    :param amount: Amount in the base unit
+    :param base_unit: Base unit of the family (or an unknown unit)
+    :return: (amount, unit)
+    """
+    for unit, factor in UNIT_FAMILIES.get(base_unit, []):
+        if amount >= factor:
+            return round(amount / factor, 2), unit
+
+    return round(amount, 2), base_unit
@@ -1,4 +1,3 @@
-import uuid
 import re
 
 from fastapi import status
@@ -9,14 +8,19 @@ from starlette.requests import Request
 from uuid import UUID
 from typing import List
 
-from src.crud.tags import save_tag, delete_tag, read_tag, read_tags
-from src.api.models.tags import TagResponse, TagCreate, TagReadInDB, TagRead
+from src.crud.tags import get_or_create_tags, delete_tag, read_tag, read_tags
+from src.service.autocomplete import tags_changed
+from src.api.models.tags import TagResponse, TagCreate, TagRead
 from src.database.models.tags import TagDB
 
 
+# Tags are single words of at most 20 letters, stored upper case
+TAG_PATTERN = r'^[a-zA-Z]{1,20}$'
+
+
 def serv_create_tag(request: Request, db_session: Session, body: TagCreate) -> TagResponse:
     """
-    Service to create a new tag
+    Service to create a new tag, an existing tag with the same name is returned instead
 
     :param request: General request information
     :param db_session: Database session
@@ -24,20 +28,13 @@ def serv_create_tag(request: Request, db_session: Session, body: TagCreate) -> T
     :return: API response model
     """
     try:
-        regex = r'^[a-zA-Z]+$'
-
-        if not re.match(regex, body.tag):
+        if not re.match(TAG_PATTERN, body.tag):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Unallowed symbols in tag')
 
-        body.tag = body.tag.upper()
-
-        db_tag: TagDB = TagDB(**body.dict())
-        db_tag.id = uuid.uuid4()
-
-        db_tag = save_tag(db_session=db_session, db_tag=db_tag)
+        db_tag: TagDB = get_or_create_tags(db_session=db_session, tags=[body.tag.upper()])[0]
+        tags_changed(db_session=db_session, created=[db_tag.tag])
 
-        tmp_tag: TagReadInDB = TagReadInDB.model_validate(db_tag)
-        api_tag: TagRead = TagRead(**tmp_tag.dict())
+        api_tag: TagRead = TagRead.model_validate(db_tag)
 
         return TagResponse(method=request.method,
                            items=[api_tag])
@@ -62,8 +59,7 @@ def serv_get_tags(request: Request, db_session: Session) -> TagResponse:
         api_tags: List[TagRead] = []
 
         for db_tag in db_tags:
-            tmp_tag: TagReadInDB = TagReadInDB.model_validate(db_tag)
-            api_tag: TagRead = TagRead(**tmp_tag.dict())
+            api_tag: TagRead = TagRead.model_validate(db_tag)
             api_tags.append(api_tag)
 
         return TagResponse(method=request.method,
@@ -87,8 +83,7 @@ def serv_get_tag(request: Request, db_session: Session, tag_id: UUID) -> TagResp
     try:
         db_tag: TagDB = read_tag(db_session=db_session, uuid=tag_id)
 
-        tmp_tag: TagReadInDB = TagReadInDB.model_validate(db_tag)
-        api_tag: TagRead = TagRead(**tmp_tag.dict())
+        api_tag: TagRead = TagRead.model_validate(db_tag)
 
         return TagResponse(method=request.method,
                            items=[api_tag])
@@ -112,6 +107,8 @@ def serv_delete_tag(request: Request, db_session: Session, tag_id: UUID):
         db_tag: TagDB = read_tag(db_session=db_session, uuid=tag_id)
 
         delete_tag(db_session=db_session, db_tag=db_tag)
+        # Linked tags cannot be deleted, the tag has no link left
+        tags_changed(db_session=db_session, removed=[db_tag.tag])
 
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -3,11 +3,13 @@
 """
 import uuid
 
+from functools import partial
+
 from fastapi import status
 from sqlalchemy.orm import Session
 from starlette.responses import Response
 from starlette.requests import Request
-from typing import List
+from typing import List, Optional
 from starlette.exceptions import HTTPException
 from uuid import UUID
 
@@ -15,13 +17,25 @@ from src.api.models.auth import User
 from src.api.models.worksteps import (WorkstepResponse,
                                       WorkstepCreate,
                                       WorkstepUpdate,
-                                      WorkstepRead,
-                                      WorkstepReadInDB)
+                                      WorkstepMove,
+                                      WorkstepBatchCreate,
+                                      WorkstepRead)
 from src.database.models.worksteps import WorkstepDB
 from src.database.models.receipts import ReceiptDB
 
-from src.crud.worksteps import save_workstep, read_workstep, read_worksteps_by_receipt, delete_workstep
+from src.crud.worksteps import (save_workstep,
+                                read_workstep,
+                                read_worksteps_by_receipt,
+                                delete_workstep,
+                                append_workstep,
+                                replace_worksteps,
+                                read_next_workstep_order_number,
+                                rebalance_worksteps,
+                                WORKSTEP_ORDER_GAP)
 from src.crud.receipts import read_receipt
+from src.database.database import on_commit
+from src.pdf.cache import pdf_cache
+from src.service.search import receipts_changed
 
 
 def serv_create_workstep(request: Request,
@@ -38,23 +52,19 @@ def serv_create_workstep(request: Request,
     :return: API response model
     """
     try:
-        db_worksteps: List[WorkstepDB] = read_worksteps_by_receipt(db_session=db_session, receipt_id=body.receipt_id)
-        new_order_number: int = len(db_worksteps) + 1
-
-        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=body.receipt_id)
+        # The lock serializes appends to the receipt until the insert is committed
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=body.receipt_id, for_update=True)
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
-        db_workstep: WorkstepDB = WorkstepDB(**body.dict(exclude={'receipt_id',
-                                                                  'order_number'}),
-                                             order_number=new_order_number)
-        db_workstep.receipt_id = db_receipt.id
-        db_workstep.id = uuid.uuid4()
-
-        db_workstep = save_workstep(db_session=db_session, db_workstep=db_workstep)
+        db_workstep: WorkstepDB = append_workstep(db_session=db_session,
+                                                  receipt_id=db_receipt.id,
+                                                  workstep_id=uuid.uuid4(),
+                                                  workstep=body.workstep)
+        on_commit(db_session, partial(pdf_cache.invalidate, db_workstep.receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
 
-        tmp_workstep: WorkstepReadInDB = WorkstepReadInDB.model_validate(db_workstep)
-        api_workstep: WorkstepRead = WorkstepRead(**tmp_workstep.dict())
+        api_workstep: WorkstepRead = WorkstepRead.model_validate(db_workstep)
 
         return WorkstepResponse(method=request.method,
                                 items=[api_workstep])
@@ -65,6 +75,46 @@ def serv_create_workstep(request: Request,
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def serv_replace_worksteps(request: Request,
+                           db_session: Session,
+                           receipt_id: UUID,
+                           body: List[WorkstepBatchCreate],
+                           user: User):
+    """
+    service to replace all worksteps of a receipt in one transaction
+
+    :param body: API models of the worksteps in their order
+    :param receipt_id: UUID of receipt
+    :param request: General request information
+    :param db_session: Database session
+    :param user: User information
+    :return: API response model
+    """
+    try:
+        # The lock keeps concurrent appends and moves out until the new worksteps are committed
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=receipt_id, for_update=True)
+        if not db_receipt.user_id == user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
+
+        db_worksteps: List[WorkstepDB] = replace_worksteps(db_session=db_session,
+                                                           receipt_id=receipt_id,
+                                                           worksteps=[workstep.workstep for workstep in body])
+
+        api_worksteps: List[WorkstepRead] = [WorkstepRead.model_validate(db_workstep)
+                                             for db_workstep in db_worksteps]
+
+        on_commit(db_session, partial(pdf_cache.invalidate, receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
+
+        return WorkstepResponse(method=request.method,
+                                items=api_worksteps)
+
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 def serv_get_worksteps_by_receipt(request: Request,
                                   db_session: Session,
                                   receipt_id: UUID,
@@ -88,8 +138,7 @@ def serv_get_worksteps_by_receipt(request: Request,
         api_worksteps: List[WorkstepRead] = []
 
         for db_workstep in db_worksteps:
-            tmp_workstep: WorkstepReadInDB = WorkstepReadInDB.model_validate(db_workstep)
-            api_workstep: WorkstepRead = WorkstepRead(**tmp_workstep.dict())
+            api_workstep: WorkstepRead = WorkstepRead.model_validate(db_workstep)
 
             api_worksteps.append(api_workstep)
 
@@ -120,14 +169,12 @@ def serv_get_workstep_by_id(request: Request,
     try:
         db_workstep: WorkstepDB = read_workstep(db_session=db_session, uuid=uuid)
 
-        tmp_workstep: WorkstepReadInDB = WorkstepReadInDB.model_validate(db_workstep)
-
-        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=tmp_workstep.receipt_id)
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=db_workstep.receipt_id)
           
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
-        api_workstep: WorkstepRead = WorkstepRead(**tmp_workstep.dict())
+        api_workstep: WorkstepRead = WorkstepRead.model_validate(db_workstep)
 
         return WorkstepResponse(method=request.method,
                                 items=[api_workstep])
@@ -170,9 +217,10 @@ def serv_update_workstep(request: Request,
                 setattr(db_workstep, key, value)
 
         db_workstep = save_workstep(db_session=db_session, db_workstep=db_workstep)
+        on_commit(db_session, partial(pdf_cache.invalidate, db_workstep.receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
 
-        tmp_workstep: WorkstepReadInDB = WorkstepReadInDB.model_validate(db_workstep)
-        api_workstep: WorkstepRead = WorkstepRead(**tmp_workstep.dict())
+        api_workstep: WorkstepRead = WorkstepRead.model_validate(db_workstep)
 
         return WorkstepResponse(method=request.method,
                                 items=[api_workstep])
@@ -205,18 +253,86 @@ def serv_delete_workstep(request: Request,
         if not db_receipt.user_id == user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
 
+        # The order numbers of the remaining worksteps have gaps, they do not have to be renumbered
         delete_workstep(db_session=db_session, db_workstep=db_workstep)
+        on_commit(db_session, partial(pdf_cache.invalidate, receipt_id))
+        receipts_changed(db_session=db_session, user_id=user.id)
 
-        db_worksteps: List[WorkstepDB] = read_worksteps_by_receipt(db_session=db_session, receipt_id=receipt_id)
-        db_worksteps.sort(key=lambda x: x.order_number)
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-        new_order: int = 1
-        for db_workstep in db_worksteps:
-            db_workstep.order_number = new_order
-            save_workstep(db_session=db_session, db_workstep=db_workstep)
-            new_order += 1
+    except HTTPException as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+def _order_number_after(db_session: Session, receipt_id: UUID, after_id: Optional[UUID],
+                        moved_id: UUID) -> Optional[int]:
+    if after_id is None:
+        after_order_number = 0
+    else:
+        db_after: WorkstepDB = read_workstep(db_session=db_session, uuid=after_id)
+        if not db_after.receipt_id == receipt_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail='Worksteps do not belong to the same receipt')
+        after_order_number = db_after.order_number
+
+    next_order_number = read_next_workstep_order_number(db_session=db_session, receipt_id=receipt_id,
+                                                        order_number=after_order_number, exclude_id=moved_id)
+    if next_order_number is None:
+        return after_order_number + WORKSTEP_ORDER_GAP
+    if next_order_number - after_order_number > 1:
+        return (after_order_number + next_order_number) // 2
+
+    # No free order number between the neighbours
+    return None
+
+
+def serv_move_workstep(request: Request,
+                       db_session: Session,
+                       uuid: UUID,
+                       body: WorkstepMove,
+                       user: User):
+    """
+    service to move a workstep behind another workstep of the receipt
+
+    Only the moved workstep is written. If its neighbours have no gap left, all worksteps of the receipt are
+    spread again with one UPDATE in the same transaction.
+
+    :param body: API move model
+    :param uuid: UUID of workstep
+    :param request: General request information
+    :param db_session: Database session
+    :param user: User information
+    :return: API response model
+    """
+    try:
+        db_workstep: WorkstepDB = read_workstep(db_session=db_session, uuid=uuid)
+        receipt_id: UUID = db_workstep.receipt_id
+
+        # The lock serializes moves and appends within the receipt
+        db_receipt: ReceiptDB = read_receipt(db_session=db_session, uuid=receipt_id, for_update=True)
+
+        if not db_receipt.user_id == user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is not owner of the receipt')
+
+        if body.after_id != uuid:
+            new_order_number = _order_number_after(db_session=db_session, receipt_id=receipt_id,
+                                                   after_id=body.after_id, moved_id=uuid)
+            if new_order_number is None:
+                rebalance_worksteps(db_session=db_session, receipt_id=receipt_id)
+                new_order_number = _order_number_after(db_session=db_session, receipt_id=receipt_id,
+                                                       after_id=body.after_id, moved_id=uuid)
+
+            db_workstep.order_number = new_order_number
+            db_workstep = save_workstep(db_session=db_session, db_workstep=db_workstep)
+            on_commit(db_session, partial(pdf_cache.invalidate, receipt_id))
+            receipts_changed(db_session=db_session, user_id=user.id)
+
+        api_workstep: WorkstepRead = WorkstepRead.model_validate(db_workstep)
+
+        return WorkstepResponse(method=request.method,
+                                items=[api_workstep])
 
     except HTTPException as err:
         raise HTTPException(status_code=err.status_code, detail=err.detail)
@@ -15,6 +15,13 @@ def load_env_with_default(env_name: str, default_value):
         return default_value
 
 
+def load_bool_env_with_default(env_name: str, default_value: bool) -> bool:
+    if env_name in os.environ:
+        return os.environ[env_name].strip().lower() in ("1", "true", "yes", "on")
+    else:
+        return default_value
+
+
 MAINTAINER_NAME: str = "Julian Kistner"
 MAINTAINER_EMAIL: str = "jul.kistner.21@lehre.mosbach.dhbw.de"
 
@@ -29,6 +36,55 @@ DATABASE_URI = load_env_with_default(
     "",
 )
 
+# Run the endpoints on an async engine (asyncpg) instead of the thread pool with psycopg2
+DATABASE_ASYNC: bool = load_bool_env_with_default("DATABASE_ASYNC", False)
+# Defaults to DATABASE_URI with the asyncpg driver
+DATABASE_ASYNC_URI = load_env_with_default("DATABASE_ASYNC_URI", "")
+
+# Connection pool per engine and worker process
+DATABASE_POOL_SIZE: int = int(load_env_with_default("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW: int = int(load_env_with_default("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_RECYCLE: int = int(load_env_with_default("DATABASE_POOL_RECYCLE", 1800))
+DATABASE_POOL_TIMEOUT: float = float(load_env_with_default("DATABASE_POOL_TIMEOUT", 30))
+DATABASE_POOL_PRE_PING: bool = load_bool_env_with_default("DATABASE_POOL_PRE_PING", True)
+# Statement timeout in milliseconds, 0 disables the timeout
+DATABASE_STATEMENT_TIMEOUT: int = int(load_env_with_default("DATABASE_STATEMENT_TIMEOUT", 0))
+# Send the number of statements and commits of a request as X-DB-Statements / X-DB-Commits headers
+DATABASE_STATS_HEADERS: bool = load_bool_env_with_default("DATABASE_STATS_HEADERS", False)
+
+JWKS_CACHE_TTL: int = int(load_env_with_default("JWKS_CACHE_TTL", 3600))
+JWKS_REFRESH_MARGIN: int = int(load_env_with_default("JWKS_REFRESH_MARGIN", 300))
+JWKS_MIN_REFETCH_INTERVAL: int = int(load_env_with_default("JWKS_MIN_REFETCH_INTERVAL", 30))
+TOKEN_CACHE_SIZE: int = int(load_env_with_default("TOKEN_CACHE_SIZE", 1024))
+
+# Cache of rendered pdfs: "memory" (LRU per worker), "disk" (directory shared by the workers) or "none"
+PDF_CACHE_BACKEND: str = load_env_with_default("PDF_CACHE_BACKEND", "memory")
+PDF_CACHE_MAX_BYTES: int = int(load_env_with_default("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PDF_CACHE_DIR: str = load_env_with_default("PDF_CACHE_DIR", "/tmp/recivault-pdf-cache")
+PDF_CACHE_DISK_BYTES: int = int(load_env_with_default("PDF_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+
+# Pdfs are rendered in a process pool, renders beyond workers + queue size are rejected with 503
+PDF_RENDER_WORKERS: int = int(load_env_with_default("PDF_RENDER_WORKERS", 2))
+PDF_RENDER_QUEUE_SIZE: int = int(load_env_with_default("PDF_RENDER_QUEUE_SIZE", 8))
+PDF_RENDER_RETRY_AFTER: int = int(load_env_with_default("PDF_RENDER_RETRY_AFTER", 5))
+
+# Backend of GET /api/search: "postgres" (tsvector index of the receipts) or "memory" (inverted index built
+# in the worker from the receipts of the user, no full text support of the database required)
+SEARCH_BACKEND: str = load_env_with_default("SEARCH_BACKEND", "postgres")
+# Inverted indexes of the memory search, kept per worker like the autocomplete tries
+SEARCH_TTL: int = int(load_env_with_default("SEARCH_TTL", 300))
+SEARCH_MAX_USERS: int = int(load_env_with_default("SEARCH_MAX_USERS", 1000))
+
+# Backend of the autocomplete endpoints: "memory" (prefix tries per worker, loaded from the database and changed
+# by the writes of the worker) or "postgres" (prefix queries on the pattern indexes)
+AUTOCOMPLETE_BACKEND: str = load_env_with_default("AUTOCOMPLETE_BACKEND", "memory")
+AUTOCOMPLETE_TTL: int = int(load_env_with_default("AUTOCOMPLETE_TTL", 300))
+AUTOCOMPLETE_MAX_USERS: int = int(load_env_with_default("AUTOCOMPLETE_MAX_USERS", 1000))
+
+# Inverted ingredient index of POST /api/receipts/cookable, kept per worker like the autocomplete tries
+COOKABLE_TTL: int = int(load_env_with_default("COOKABLE_TTL", 300))
+COOKABLE_MAX_USERS: int = int(load_env_with_default("COOKABLE_MAX_USERS", 1000))
+
 keycloakConfig = authConfiguration(
     server_url=load_env_with_default('KEYCLOAK_SERVER_URL', "https://accounts.recivault.com/"),
     realm=load_env_with_default('KEYCLOAK_REALM', "recivault"),
@@ -0,0 +1,161 @@
+"""
+    Token verification against a stub JWKS
+
+Run with `python -m unittest discover tests`
+"""
+import asyncio
+import json
+import time
+import unittest
+
+from unittest import mock
+
+from fastapi import HTTPException
+from jwcrypto import jwk, jwt
+
+from src.authentication import auth
+from src.authentication.jwks import JWKSKeyStore
+
+
+def make_signing_key(kid: str) -> jwk.JWK:
+    return jwk.JWK.generate(kty='RSA', size=2048, kid=kid, use='sig', alg='RS256')
+
+
+def sign_token(key: jwk.JWK, claims: dict) -> str:
+    token = jwt.JWT(header={'alg': 'RS256', 'kid': key.key_id}, claims=claims)
+    token.make_signed_token(key)
+    return token.serialize()
+
+
+def stub_jwks(*keys: jwk.JWK) -> dict:
+    return {'keys': [json.loads(key.export_public()) for key in keys]}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class GetPayloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.signing_key = make_signing_key('key-1')
+        self.fetches = 0
+
+        def fetch_jwks() -> dict:
+            self.fetches += 1
+            return stub_jwks(self.signing_key)
+
+        self.key_store = JWKSKeyStore(fetch_jwks=fetch_jwks, ttl=3600, refresh_margin=300, min_refetch_interval=30)
+        patcher = mock.patch.object(auth, 'signing_keys', self.key_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_valid_token(self):
+        token = sign_token(self.signing_key, {'sub': 'user-1', 'exp': int(time.time()) + 300})
+
+        payload = asyncio.run(auth.get_payload(token))
+        self.assertEqual(payload['sub'], 'user-1')
+
+        asyncio.run(auth.get_payload(token))
+        self.assertEqual(self.fetches, 1)
+
+    def test_expired_token(self):
+        token = sign_token(self.signing_key, {'sub': 'user-1', 'exp': int(time.time()) - 3600})
+
+        with self.assertRaises(HTTPException) as raised:
+            asyncio.run(auth.get_payload(token))
+        self.assertEqual(raised.exception.status_code, 401)
+
+    def test_token_without_exp(self):
+        token = sign_token(self.signing_key, {'sub': 'user-1'})
+
+        with self.assertRaises(HTTPException) as raised:
+            asyncio.run(auth.get_payload(token))
+        self.assertEqual(raised.exception.status_code, 401)
+
+    def test_foreign_signature(self):
+        forged = sign_token(make_signing_key('key-1'), {'sub': 'user-1', 'exp': int(time.time()) + 300})
+
+        with self.assertRaises(HTTPException) as raised:
+            asyncio.run(auth.get_payload(forged))
+        self.assertEqual(raised.exception.status_code, 401)
+
+
+class JWKSKeyStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.keys = [make_signing_key('key-1')]
+        self.fetches = 0
+        self.fail = False
+
+        def fetch_jwks() -> dict:
+            self.fetches += 1
+            if self.fail:
+                raise ConnectionError('identity provider unavailable')
+            return stub_jwks(*self.keys)
+
+        self.key_store = JWKSKeyStore(fetch_jwks=fetch_jwks, ttl=3600, refresh_margin=300, min_refetch_interval=30,
+                                      clock=self.clock)
+
+    def test_cached_key_needs_fetch_first(self):
+        self.assertIsNone(self.key_store.get_cached_key('key-1'))
+        self.assertEqual(self.key_store.get_key('key-1').key_id, 'key-1')
+        self.assertEqual(self.key_store.get_cached_key('key-1').key_id, 'key-1')
+        self.assertEqual(self.fetches, 1)
+
+    def test_rotated_key_is_refetched_once_per_interval(self):
+        self.key_store.get_key('key-1')
+
+        self.keys.append(make_signing_key('key-2'))
+        self.clock.now += 31
+        self.assertEqual(self.key_store.get_key('key-2').key_id, 'key-2')
+        self.assertEqual(self.fetches, 2)
+
+        with self.assertRaises(Exception):
+            self.key_store.get_key('key-3')
+        self.assertEqual(self.fetches, 2)
+
+    def test_failed_refresh_keeps_keys_and_interval(self):
+        self.key_store.get_key('key-1')
+        self.fail = True
+
+        # Expired keys are served while the identity provider is unavailable
+        self.clock.now += 3600
+        self.assertEqual(self.key_store.get_key('key-1').key_id, 'key-1')
+        self.assertEqual(self.fetches, 2)
+
+        # No new attempt within the refetch interval
+        self.clock.now += 10
+        self.assertEqual(self.key_store.get_key('key-1').key_id, 'key-1')
+        self.assertEqual(self.key_store.get_cached_key('key-1').key_id, 'key-1')
+        self.assertEqual(self.fetches, 2)
+
+        self.fail = False
+        self.clock.now += 30
+        self.assertIsNone(self.key_store.get_cached_key('key-1'))
+        self.key_store.get_key('key-1')
+        self.assertEqual(self.fetches, 3)
+
+    def test_failed_unknown_kid_fetch_does_not_shorten_ttl(self):
+        self.key_store.get_key('key-1')
+        self.fail = True
+
+        self.clock.now += 100
+        with self.assertRaises(Exception):
+            self.key_store.get_key('key-2')
+        self.assertEqual(self.fetches, 2)
+
+        # The keys fetched at the start are still within their ttl and margin
+        self.clock.now += 1000
+        self.assertEqual(self.key_store.get_cached_key('key-1').key_id, 'key-1')
+        self.assertEqual(self.fetches, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+    Prefix tries of the autocomplete (AUTOCOMPLETE_BACKEND=memory)
+
+Run with `python -m unittest discover tests`
+"""
+import unittest
+
+from src.search.autocomplete import CompletionIndex
+from src.search.prefix_trie import PrefixTrie
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class PrefixTrieTest(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = PrefixTrie(cache_size=3)
+        for key, count in [('tomato', 5), ('tofu', 2), ('toast', 2), ('thyme', 1), ('salt', 7)]:
+            self.trie.add(key, key.capitalize(), count)
+
+    def test_most_frequent_first_then_key(self):
+        self.assertEqual(self.trie.complete('to', 10), [('Tomato', 5), ('Toast', 2), ('Tofu', 2)])
+        self.assertEqual(self.trie.complete('t', 2), [('Tomato', 5), ('Toast', 2)])
+        self.assertEqual(self.trie.complete('tomato', 10), [('Tomato', 5)])
+        self.assertEqual(self.trie.complete('tomatoes', 10), [])
+        self.assertEqual(self.trie.complete('x', 10), [])
+
+    def test_empty_prefix_completes_all_keys(self):
+        self.assertEqual(self.trie.complete('', 10), [('Salt', 7), ('Tomato', 5), ('Toast', 2)])
+        self.assertEqual(PrefixTrie().complete('', 10), [])
+
+    def test_insert_changes_cached_completions(self):
+        self.assertEqual(self.trie.complete('to', 1), [('Tomato', 5)])
+
+        self.trie.add('tofu', 'Tofu', 4)
+        self.trie.add('tortilla', 'Tortilla', 0)
+
+        self.assertEqual(self.trie.complete('to', 3), [('Tofu', 6), ('Tomato', 5), ('Toast', 2)])
+        self.assertEqual(self.trie.complete('tor', 3), [('Tortilla', 0)])
+        self.assertEqual(len(self.trie), 6)
+
+    def test_display_value_of_the_first_insert(self):
+        self.trie.add('tomato', 'TOMATO', 1)
+
+        self.assertEqual(self.trie.complete('tom', 1), [('Tomato', 6)])
+
+    def test_remove(self):
+        self.assertEqual(self.trie.complete('to', 3), [('Tomato', 5), ('Toast', 2), ('Tofu', 2)])
+
+        self.trie.add('tomato', 'Tomato', -2)
+        self.assertEqual(self.trie.complete('tom', 3), [('Tomato', 3)])
+
+        self.trie.add('tomato', 'Tomato', -3)
+        self.trie.add('toast', 'Toast', -5)
+        self.assertEqual(self.trie.complete('to', 3), [('Tofu', 2)])
+        self.assertEqual(self.trie.complete('tom', 3), [])
+        self.assertEqual(len(self.trie), 3)
+
+    def test_remove_unknown_key(self):
+        self.trie.add('tomatillo', 'Tomatillo', -1)
+        self.trie.add('tom', 'Tom', -1)
+
+        self.assertEqual(self.trie.complete('tom', 3), [('Tomato', 5)])
+        self.assertEqual(len(self.trie), 5)
+
+    def test_whitespace_is_part_of_the_key(self):
+        self.trie.add('olive oil', 'Olive oil', 3)
+        self.trie.add('olives', 'Olives', 1)
+
+        self.assertEqual(self.trie.complete('olive', 3), [('Olive oil', 3), ('Olives', 1)])
+        self.assertEqual(self.trie.complete('olive ', 3), [('Olive oil', 3)])
+        self.assertEqual(self.trie.complete(' olive', 3), [])
+
+
+class CompletionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.loads = []
+        self.values = {'user-1': [('Tomato', 3), ('tofu', 1)],
+                       'user-2': [('Salt', 2)],
+                       'user-3': [('Sugar', 1)]}
+        self.index = CompletionIndex(max_scopes=2, ttl=300, normalize=str.lower, clock=self.clock)
+
+    def complete(self, scope: str, prefix: str, limit: int = 10):
+        def load():
+            self.loads.append(scope)
+            return self.values[scope]
+
+        return self.index.complete(scope, prefix, limit, load=load)
+
+    def test_prefix_is_case_insensitive(self):
+        self.assertEqual(self.complete('user-1', 'TO'), [('Tomato', 3), ('tofu', 1)])
+        self.assertEqual(self.complete('user-1', 'tOm'), [('Tomato', 3)])
+        self.assertEqual(self.loads, ['user-1'])
+
+    def test_values_differing_in_case_are_counted_together(self):
+        self.complete('user-1', 't')
+        self.index.update('user-1', [('TOMATO', 2), ('Tofu', 3)])
+
+        self.assertEqual(self.complete('user-1', 't'), [('Tomato', 5), ('tofu', 4)])
+
+    def test_update_and_remove(self):
+        self.complete('user-1', 't')
+        self.index.update('user-1', [('Tomato', -3), ('Thyme', 1)])
+
+        self.assertEqual(self.complete('user-1', 't'), [('Thyme', 1), ('tofu', 1)])
+        self.assertEqual(self.loads, ['user-1'])
+
+    def test_update_skips_scopes_that_are_not_loaded(self):
+        self.index.update('user-2', [('Sage', 1)])
+
+        self.assertEqual(self.complete('user-2', 's'), [('Salt', 2)])
+
+    def test_expired_trie_is_loaded_again(self):
+        self.complete('user-1', 't')
+        self.values['user-1'] = [('Thyme', 4)]
+
+        self.clock.now += 299
+        self.assertEqual(self.complete('user-1', 'th'), [])
+
+        self.clock.now += 1
+        self.assertEqual(self.complete('user-1', 'th'), [('Thyme', 4)])
+        self.assertEqual(self.loads, ['user-1', 'user-1'])
+
+    def test_invalidate(self):
+        self.complete('user-1', 't')
+        self.index.invalidate('user-1')
+        self.index.invalidate('user-2')
+
+        self.complete('user-1', 't')
+        self.assertEqual(self.loads, ['user-1', 'user-1'])
+
+    def test_least_recently_used_trie_is_dropped(self):
+        self.complete('user-1', 't')
+        self.complete('user-2', 's')
+        self.complete('user-1', 't')
+        self.complete('user-3', 's')
+
+        self.complete('user-1', 't')
+        self.complete('user-2', 's')
+        self.assertEqual(self.loads, ['user-1', 'user-2', 'user-3', 'user-2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
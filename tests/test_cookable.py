@@ -0,0 +1,158 @@
+"""
+    Inverted ingredient index of the cookable receipts
+
+Run with `python -m unittest discover tests`
+"""
+import unittest
+
+from uuid import UUID
+
+from src.search.ingredient_index import IngredientIndex, normalize_ingredient, DENSE_SHARE
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def receipt(number: int) -> UUID:
+    return UUID(int=number)
+
+
+class NormalizeIngredientTest(unittest.TestCase):
+
+    def test_case_and_whitespace(self):
+        self.assertEqual(normalize_ingredient('  Olive \t OIL\n'), 'olive oil')
+        self.assertEqual(normalize_ingredient('Weißbrot'), 'weissbrot')
+        self.assertEqual(normalize_ingredient('   '), '')
+
+
+class IngredientIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.loads = []
+        self.rows = {'user-1': [(receipt(1), 'Pasta'), (receipt(1), 'Tomato'), (receipt(1), 'Basil'),
+                                (receipt(2), 'pasta'), (receipt(2), 'TOMATO'),
+                                (receipt(3), 'Bread'), (receipt(3), 'Salt'), (receipt(3), 'salt'),
+                                (receipt(4), ' tomato ')],
+                     'user-2': [(receipt(5), 'Salt')],
+                     'user-3': [(receipt(6), 'Sugar')]}
+        self.index = IngredientIndex(max_users=2, ttl=300, clock=self.clock)
+
+    def match(self, user_id: str, on_hand, max_missing: int = 1, limit: int = 10):
+        def load():
+            self.loads.append(user_id)
+            return self.rows[user_id]
+
+        return self.index.match(user_id, on_hand, max_missing, limit, load=load)
+
+    def test_fewest_missing_then_coverage(self):
+        self.assertEqual(self.match('user-1', ['Tomato', 'Pasta']),
+                         [(receipt(2), 2, []), (receipt(4), 1, []), (receipt(1), 2, ['basil'])])
+        self.assertEqual(self.match('user-1', ['Tomato', 'Pasta'], max_missing=0),
+                         [(receipt(2), 2, []), (receipt(4), 1, [])])
+        self.assertEqual(self.match('user-1', ['Tomato', 'Pasta'], limit=1), [(receipt(2), 2, [])])
+        self.assertEqual(self.loads, ['user-1'])
+
+    def test_on_hand_is_normalized(self):
+        self.assertEqual(self.match('user-1', ['  TOMATO', 'pasta  ', 'Pasta']),
+                         self.match('user-1', ['tomato', 'pasta']))
+        self.assertEqual(self.match('user-1', ['salt', 'bread']), [(receipt(3), 2, [])])
+
+    def test_empty_and_unknown_ingredients(self):
+        self.assertEqual(self.match('user-1', []), [])
+        self.assertEqual(self.match('user-1', ['   ']), [])
+        self.assertEqual(self.match('user-1', ['saffron'], max_missing=3), [])
+
+    def test_update(self):
+        self.match('user-1', ['tomato'])
+        self.index.update('user-1', receipt(3), [('Tomato', 1)])
+        self.index.update('user-1', receipt(7), [('Saffron', 1)])
+
+        self.assertEqual(self.match('user-1', ['tomato', 'saffron'], max_missing=2),
+                         [(receipt(4), 1, []), (receipt(7), 1, []), (receipt(2), 1, ['pasta']),
+                          (receipt(1), 1, ['basil', 'pasta']), (receipt(3), 1, ['bread', 'salt'])])
+        self.assertEqual(self.loads, ['user-1'])
+
+    def test_remove_ingredients(self):
+        self.match('user-1', ['salt'])
+
+        # Two ingredients of receipt 3 are salt, the term is kept until both are removed
+        self.index.update('user-1', receipt(3), [('SALT', -1)])
+        self.assertEqual(self.match('user-1', ['salt', 'bread']), [(receipt(3), 2, [])])
+
+        self.index.update('user-1', receipt(3), [('Salt', -1)])
+        self.assertEqual(self.match('user-1', ['salt', 'bread']), [(receipt(3), 1, [])])
+
+        self.index.update('user-1', receipt(4), [('tomato', -1)])
+        self.assertEqual(self.match('user-1', ['tomato'], max_missing=0), [])
+
+    def test_remove_receipts(self):
+        self.match('user-1', ['tomato'])
+        self.index.remove_receipts('user-1', [receipt(2), receipt(4), receipt(9)])
+
+        self.assertEqual(self.match('user-1', ['tomato', 'pasta']), [(receipt(1), 2, ['basil'])])
+
+    def test_update_skips_users_that_are_not_loaded(self):
+        self.index.update('user-2', receipt(5), [('Pepper', 1)])
+
+        self.assertEqual(self.match('user-2', ['salt']), [(receipt(5), 1, [])])
+
+    def test_expired_index_is_loaded_again(self):
+        self.match('user-1', ['tomato'])
+        self.rows['user-1'] = [(receipt(8), 'Rice')]
+
+        self.clock.now += 299
+        self.assertEqual(self.match('user-1', ['rice']), [])
+
+        self.clock.now += 1
+        self.assertEqual(self.match('user-1', ['rice']), [(receipt(8), 1, [])])
+        self.assertEqual(self.loads, ['user-1', 'user-1'])
+
+    def test_invalidate(self):
+        self.match('user-1', ['tomato'])
+        self.index.invalidate('user-1')
+        self.index.invalidate('user-2')
+
+        self.match('user-1', ['tomato'])
+        self.assertEqual(self.loads, ['user-1', 'user-1'])
+
+    def test_least_recently_used_index_is_dropped(self):
+        self.match('user-1', ['tomato'])
+        self.match('user-2', ['salt'])
+        self.match('user-1', ['tomato'])
+        self.match('user-3', ['sugar'])
+
+        self.match('user-1', ['tomato'])
+        self.match('user-2', ['salt'])
+        self.assertEqual(self.loads, ['user-1', 'user-2', 'user-3', 'user-2'])
+
+    def test_dense_posting_lists(self):
+        # Salt is in every receipt, its posting list is a bitmask
+        count = DENSE_SHARE * 2
+        self.rows['user-1'] = ([(receipt(number), 'Salt') for number in range(1, count + 1)]
+                               + [(receipt(number), 'Pepper') for number in range(1, count + 1, 2)])
+
+        matches = self.match('user-1', ['salt'], limit=count)
+        self.assertEqual([receipt_id for receipt_id, _, _ in matches[:3]], [receipt(2), receipt(4), receipt(6)])
+        self.assertEqual(len(matches), count)
+        self.assertEqual(matches[-1], (receipt(count - 1), 1, ['pepper']))
+
+        self.index.update('user-1', receipt(2), [('salt', -1), ('Pepper', 1)])
+        self.index.update('user-1', receipt(3), [('Salt', -1)])
+        matches = self.match('user-1', ['salt', 'pepper'], limit=count)
+        self.assertEqual(len(matches), count)
+        self.assertEqual(matches[0], (receipt(1), 2, []))
+        # Receipts 2 and 3 have only pepper now, they are listed with the other receipts of one ingredient
+        self.assertEqual(matches[count // 2 - 1:count // 2 + 2],
+                         [(receipt(2), 1, []), (receipt(3), 1, []), (receipt(4), 1, [])])
+        self.assertEqual(matches[-1], (receipt(count), 1, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
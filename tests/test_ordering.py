@@ -0,0 +1,64 @@
+"""
+    Gap based order numbers of the worksteps
+
+Run with `python -m unittest discover tests`
+"""
+import unittest
+
+from typing import List, Optional
+
+from src.service.ordering import plan_order_numbers
+
+
+GAP = 1024
+
+
+class PlanOrderNumbersTest(unittest.TestCase):
+
+    def plan(self, current_order_numbers: List[Optional[int]]) -> List[int]:
+        order_numbers = plan_order_numbers(current_order_numbers, gap=GAP)
+
+        self.assertEqual(len(order_numbers), len(current_order_numbers))
+        self.assertTrue(all(low < high for low, high in zip(order_numbers, order_numbers[1:])), order_numbers)
+        return order_numbers
+
+    def test_unchanged_order_keeps_all_numbers(self):
+        self.assertEqual(self.plan([1024, 2048, 3072]), [1024, 2048, 3072])
+        self.assertEqual(self.plan([]), [])
+
+    def test_move_to_the_front(self):
+        # The last workstep moves before the first one and takes the middle of the gap to 0
+        self.assertEqual(self.plan([3072, 1024, 2048]), [512, 1024, 2048])
+
+    def test_move_to_the_end(self):
+        self.assertEqual(self.plan([2048, 3072, 1024]), [2048, 3072, 4096])
+
+    def test_move_between_neighbours(self):
+        self.assertEqual(self.plan([1024, 3072, 2048, 4096]), [1024, 1536, 2048, 4096])
+
+    def test_move_between_adjacent_numbers_rebalances(self):
+        # No number is left between 1 and 2, all worksteps are spread by the gap
+        self.assertEqual(self.plan([1, 3, 2]), [1024, 2048, 3072])
+
+    def test_new_worksteps_fill_the_gaps(self):
+        self.assertEqual(self.plan([None, 1024, None, None]), [512, 1024, 2048, 3072])
+        self.assertEqual(self.plan([1000, None, None, 1003]), [1000, 1001, 1002, 1003])
+        self.assertEqual(self.plan([None, None]), [1024, 2048])
+
+    def test_new_worksteps_without_room_rebalance(self):
+        self.assertEqual(self.plan([1000, None, None, 1002]), [1024, 2048, 3072, 4096])
+
+    def test_numbers_below_one_are_replaced(self):
+        self.assertEqual(self.plan([0, 1024]), [512, 1024])
+
+    def test_longest_increasing_run_is_kept(self):
+        current = [50, 10, 60, 20, 70, 30, 80]
+
+        order_numbers = self.plan(current)
+
+        self.assertEqual(order_numbers, [5, 10, 15, 20, 25, 30, 80])
+        self.assertEqual(sum(old == new for old, new in zip(current, order_numbers)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
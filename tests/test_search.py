@@ -0,0 +1,177 @@
+"""
+    In-memory receipt search (SEARCH_BACKEND=memory)
+
+Run with `python -m unittest discover tests`
+"""
+import unittest
+
+from src.search.inverted_index import InvertedIndex, SearchIndexCache, tokenize, HEADLINE_WORDS
+from src.service.pagination import encode_cursor, decode_cursor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TokenizeTest(unittest.TestCase):
+
+    def test_lower_case_words(self):
+        self.assertEqual(tokenize('Chop the TOMATOES, then simmer!'), ['chop', 'the', 'tomatoes', 'then', 'simmer'])
+
+    def test_unicode_and_numbers(self):
+        self.assertEqual(tokenize('Crème brûlée for 4-6 people'), ['crème', 'brûlée', 'for', '4', '6', 'people'])
+
+    def test_empty(self):
+        self.assertEqual(tokenize(''), [])
+        self.assertEqual(tokenize(' -- '), [])
+
+
+class InvertedIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.add('soup', ['Tomato soup', 'Classic', 'Tomato water salt', 'Simmer the tomato'])
+        self.index.add('salad', ['Salad', 'With tomato and basil', 'Tomato basil oil', 'Mix'])
+        self.index.add('bread', ['Bread', None, 'Flour water salt', 'Bake'])
+
+    def ids(self, query: str):
+        return [document_id for document_id, _, _ in self.index.search(query)]
+
+    def test_matches_all_words(self):
+        self.assertEqual(sorted(self.ids('tomato')), ['salad', 'soup'])
+        self.assertEqual(self.ids('tomato basil'), ['salad'])
+        self.assertEqual(self.ids('WATER, salt'), ['bread', 'soup'])
+        self.assertEqual(self.ids('tomato flour'), [])
+        self.assertEqual(self.ids('unknown'), [])
+
+    def test_empty_query(self):
+        self.assertEqual(self.index.search(''), [])
+        self.assertEqual(self.index.search('!?'), [])
+
+    def test_title_ranks_before_other_fields(self):
+        self.index.add('sauce', ['Sauce', 'Tomato', None, None])
+        self.index.add('stew', ['Stew', None, None, 'Add one tomato'])
+
+        self.assertEqual(self.ids('tomato'), ['soup', 'salad', 'sauce', 'stew'])
+
+    def test_equal_ranks_ordered_by_id(self):
+        matches = self.index.search('water salt')
+
+        self.assertEqual(matches[0][1], matches[1][1])
+        self.assertEqual([document_id for document_id, _, _ in matches], ['bread', 'soup'])
+
+    def test_repeated_query_words_do_not_change_rank(self):
+        self.assertEqual(self.index.search('tomato tomato'), self.index.search('tomato'))
+
+    def test_add_replaces_and_remove(self):
+        self.index.add('soup', ['Pumpkin soup', None, None, None])
+        self.assertEqual(self.ids('tomato'), ['salad'])
+        self.assertEqual(self.ids('pumpkin'), ['soup'])
+
+        self.index.remove('soup')
+        self.index.remove('unknown')
+        self.assertEqual(self.ids('pumpkin'), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_too_many_fields(self):
+        with self.assertRaises(ValueError):
+            self.index.add('pie', ['Pie', None, None, None, 'Fifth field'])
+
+    def test_headline_marks_matches(self):
+        _, _, headline = self.index.search('tomato')[0]
+
+        self.assertEqual(headline, '<b>Tomato</b> soup Classic <b>Tomato</b> water salt Simmer the <b>tomato</b>')
+
+    def test_headline_window_around_first_match(self):
+        words = [f'w{number}' for number in range(40)]
+        words[20] = 'Basil'
+        self.index.add('long', [' '.join(words)])
+
+        headline = self.index.headline('long', ['basil'])
+
+        self.assertEqual(headline.split(), words[15:20] + ['<b>Basil</b>'] + words[21:15 + HEADLINE_WORDS])
+        self.assertEqual(self.index.headline('unknown', ['basil']), '')
+
+    def test_cursor_paging(self):
+        for number in range(25):
+            self.index.add(f'receipt-{number:02}', ['Tomato' if number % 3 else 'Tomato tomato', None, None,
+                                                     'tomato' if number % 2 else None])
+        matches = self.index.search('tomato')
+
+        pages, cursor = [], None
+        while True:
+            after = None
+            if cursor:
+                rank, document_id = decode_cursor(cursor)
+                after = (float(rank), document_id)
+            page = self.index.search('tomato', after=after)[:4]
+            if not page:
+                break
+            pages.append(page)
+            cursor = encode_cursor([page[-1][1], page[-1][0]])
+
+        self.assertEqual([match for page in pages for match in page], matches)
+        self.assertEqual(len(pages), 7)
+
+
+class SearchIndexCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.loads = []
+        self.documents = {'user-1': [('soup', ['Tomato soup'])],
+                          'user-2': [('salad', ['Tomato salad'])],
+                          'user-3': [('bread', ['Bread'])]}
+        self.cache = SearchIndexCache(max_users=2, ttl=300, clock=self.clock)
+
+    def search(self, user_id: str, query: str):
+        def load():
+            self.loads.append(user_id)
+            return self.documents[user_id]
+
+        return [document_id for document_id, _, _ in self.cache.search(user_id, query, load=load)]
+
+    def test_index_is_built_once_per_user(self):
+        self.assertEqual(self.search('user-1', 'tomato'), ['soup'])
+        self.assertEqual(self.search('user-1', 'soup'), ['soup'])
+        self.assertEqual(self.search('user-2', 'tomato'), ['salad'])
+        self.assertEqual(self.loads, ['user-1', 'user-2'])
+
+    def test_expired_index_is_built_again(self):
+        self.search('user-1', 'tomato')
+        self.documents['user-1'] = [('soup', ['Pumpkin soup'])]
+
+        self.clock.now += 299
+        self.assertEqual(self.search('user-1', 'pumpkin'), [])
+
+        self.clock.now += 1
+        self.assertEqual(self.search('user-1', 'pumpkin'), ['soup'])
+        self.assertEqual(self.loads, ['user-1', 'user-1'])
+
+    def test_invalidate(self):
+        self.search('user-1', 'tomato')
+        self.documents['user-1'].append(('stew', ['Tomato stew']))
+
+        self.cache.invalidate('user-1')
+        self.cache.invalidate('user-2')
+        self.assertEqual(self.search('user-1', 'tomato'), ['soup', 'stew'])
+        self.assertEqual(self.loads, ['user-1', 'user-1'])
+
+    def test_least_recently_used_index_is_dropped(self):
+        self.search('user-1', 'tomato')
+        self.search('user-2', 'tomato')
+        self.search('user-1', 'tomato')
+        self.search('user-3', 'bread')
+
+        self.search('user-1', 'tomato')
+        self.search('user-2', 'tomato')
+        self.assertEqual(self.loads, ['user-1', 'user-2', 'user-3', 'user-2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+    Concurrent workstep appends against a migrated database
+
+Skipped without DATABASE_URI, the rows are removed afterwards. Run with `python -m unittest discover tests`
+"""
+import threading
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List
+from uuid import UUID, uuid4
+
+from src.settings import DATABASE_URI
+
+if DATABASE_URI:
+    # The engine is created on import, the service imports all database models
+    from sqlalchemy import delete, select
+
+    from src.api.models.auth import User
+    from src.api.models.worksteps import WorkstepCreate
+    from src.database.database import SessionLocal
+    from src.database.models.receipts import ReceiptDB
+    from src.database.models.worksteps import WorkstepDB
+    from src.service.worksteps import serv_create_workstep
+
+
+SESSIONS = 4
+APPENDS_PER_SESSION = 10
+
+
+@unittest.skipUnless(DATABASE_URI, 'needs a migrated database (DATABASE_URI)')
+class ConcurrentAppendTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.user = User(id=uuid4(), username='test', realm_roles=[], client_roles=[])
+        cls.receipt_id = uuid4()
+
+        with SessionLocal() as db_session:
+            db_session.add(ReceiptDB(id=cls.receipt_id, title='Appends', description='Concurrent appends',
+                                     user_id=cls.user.id))
+            db_session.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        with SessionLocal() as db_session:
+            db_session.execute(delete(WorkstepDB).where(WorkstepDB.receipt_id == cls.receipt_id))
+            db_session.execute(delete(ReceiptDB).where(ReceiptDB.id == cls.receipt_id))
+            db_session.commit()
+
+    def append_worksteps(self, start: threading.Barrier) -> List[UUID]:
+        start.wait()
+        workstep_ids = []
+        for _ in range(APPENDS_PER_SESSION):
+            # One session per append like a request, get_db commits after the service
+            with SessionLocal() as db_session:
+                response = serv_create_workstep(request=SimpleNamespace(method='POST'), db_session=db_session,
+                                                body=WorkstepCreate(workstep='Step', receipt_id=self.receipt_id),
+                                                user=self.user)
+                db_session.commit()
+            workstep_ids.append(response.items[0].id)
+
+        return workstep_ids
+
+    def test_parallel_appends_get_distinct_increasing_order_numbers(self):
+        start = threading.Barrier(SESSIONS)
+        with ThreadPoolExecutor(max_workers=SESSIONS) as executor:
+            appended = list(executor.map(lambda _: self.append_worksteps(start), range(SESSIONS)))
+
+        with SessionLocal() as db_session:
+            order_numbers = dict(db_session.execute(select(WorkstepDB.id, WorkstepDB.order_number)
+                                                    .where(WorkstepDB.receipt_id == self.receipt_id)).all())
+
+        self.assertEqual(len(order_numbers), SESSIONS * APPENDS_PER_SESSION)
+        self.assertEqual(len(set(order_numbers.values())), len(order_numbers))
+
+        # Every append goes after the worksteps committed before it
+        for workstep_ids in appended:
+            session_order_numbers = [order_numbers[workstep_id] for workstep_id in workstep_ids]
+            self.assertEqual(session_order_numbers, sorted(session_order_numbers))
+
+
+if __name__ == '__main__':
+    unittest.main()